@@ -2,10 +2,16 @@
 This module contains health check endpoints for the service.
 """
 
+import asyncio
+
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 from sqlalchemy.exc import SQLAlchemyError
-from sqlmodel import Session
+
+from app.core import http_client
+from app.core.executor import get_parse_executor
+from app.dependencies.repo import get_repo
+from app.services import warmup
 
 
 router = APIRouter(prefix="", tags=["health"])
@@ -22,6 +28,33 @@ async def healthz():
 @router.get("/readyz", include_in_schema=False)
 async def readyz():
     """
-    Readiness probe endpoint. 
+    Readiness probe endpoint.
+
+    The service is not ready while the startup warm-up runs, until its deadline. Open
+    circuit breakers are reported but do not make the service unready, since cached
+    data can still be served while an upstream is down.
     """
-    return JSONResponse(content={"status": "ok", "database": "not checked"}, status_code=200)
+    content = {
+        "status": "ok",
+        "database": "ok",
+        "warmup": warmup.warmup.snapshot() if warmup.warmup is not None else None,
+        "upstreams": http_client.upstream_states(),
+        "parser": get_parse_executor().stats(),
+    }
+    engine = getattr(get_repo(), "engine", None)
+    if engine is None:
+        content["database"] = "in-memory"
+    else:
+        # Imported here so the in-memory backend does not load the database module.
+        # pylint: disable=import-outside-toplevel
+        from app.core.database import check_database
+
+        try:
+            await asyncio.to_thread(check_database, engine)
+        except SQLAlchemyError:
+            content.update(status="error", database="unavailable")
+            return JSONResponse(content=content, status_code=503)
+    if warmup.warmup is not None and not warmup.warmup.ready:
+        content["status"] = "starting"
+        return JSONResponse(content=content, status_code=503)
+    return JSONResponse(content=content, status_code=200)
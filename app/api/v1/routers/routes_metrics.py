@@ -0,0 +1,110 @@
+"""
+This module contains the Prometheus metrics endpoint.
+
+Counters kept by the caches, rate limiters, circuit breakers, parse executor and
+prefetcher are read when the endpoint is scraped, next to the metrics recorded on the
+request path.
+"""
+
+from typing import Any, Dict, Iterator
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core import http_client
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from app.core.executor import get_parse_executor
+from app.core.metrics import MetricFamily, registry
+from app.services import prefetch, quote_stream
+from app.services.stock_service import marketwatch_cache, polygon_cache, polygon_grouped_cache
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter(prefix="", tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Expose the service metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
+def collect_caches() -> Iterator[MetricFamily]:
+    """
+    Collect the hit, miss and eviction counters of the upstream caches.
+    """
+    requests = MetricFamily("cache_requests_total", "counter", "Cache lookups by result.")
+    entries = MetricFamily("cache_entries", "gauge", "Entries held by the cache.")
+    evictions = MetricFamily("cache_evictions_total", "counter", "Entries evicted from the cache, by tier.")
+    for cache in (polygon_cache, polygon_grouped_cache, marketwatch_cache):
+        stats = cache.stats()
+        for result in ("hits", "stale", "misses", "expired", "negative"):
+            requests.add(stats[result], cache=cache.name, result=result)
+        entries.add(stats["size"], cache=cache.name)
+        for tier, count in _evictions(stats["backend"]).items():
+            evictions.add(count, cache=cache.name, tier=tier)
+    yield from (requests, entries, evictions)
+
+
+def collect_upstreams() -> Iterator[MetricFamily]:
+    """
+    Collect the circuit breaker states, rate-limiter and HTTP cache counters of the
+    upstreams.
+    """
+    state = MetricFamily("upstream_circuit_state", "gauge", "1 for the current circuit breaker state.")
+    opened = MetricFamily("upstream_circuit_opened_total", "counter", "Times the circuit breaker opened.")
+    queued = MetricFamily("upstream_rate_limit_queued", "gauge", "Calls waiting for a rate-limit token.")
+    throttled = MetricFamily(
+        "upstream_rate_limit_throttled_total", "counter", "Calls rejected after waiting for a rate-limit token."
+    )
+    waited = MetricFamily(
+        "upstream_rate_limit_wait_seconds_total", "counter", "Time spent waiting for rate-limit tokens."
+    )
+    for upstream, states in http_client.upstream_states().items():
+        breaker, limiter = states["breaker"], states["rate_limit"]
+        for name in (CLOSED, HALF_OPEN, OPEN):
+            state.add(int(breaker["state"] == name), upstream=upstream, state=name)
+        opened.add(breaker["times_opened"], upstream=upstream)
+        queued.add(limiter["queued"], upstream=upstream)
+        throttled.add(limiter["throttled"], upstream=upstream)
+        for priority, seconds in limiter["wait_seconds"].items():
+            waited.add(seconds, upstream=upstream, priority=priority)
+    yield from (state, opened, queued, throttled, waited)
+    http_cache = MetricFamily("upstream_http_cache_total", "counter", "Upstream HTTP cache activity by result.")
+    for upstream, transport in http_client.http_caches.items():
+        for result, count in transport.stats().items():
+            http_cache.add(count, upstream=upstream, result=result)
+    yield http_cache
+
+
+def collect_background() -> Iterator[MetricFamily]:
+    """
+    Collect the parse executor, prefetcher and quote stream counters.
+    """
+    parser = get_parse_executor().stats()
+    yield MetricFamily("parse_executor_pending", "gauge", "Parse jobs queued or running.").add(parser["pending"])
+    yield MetricFamily("parse_executor_completed_total", "counter", "Parse jobs completed.").add(
+        parser["completed"]
+    )
+    if prefetch.prefetcher is not None:
+        family = MetricFamily("prefetch_total", "counter", "Prefetcher activity by outcome.")
+        for outcome, count in prefetch.prefetcher.stats().items():
+            family.add(count, outcome=outcome)
+        yield family
+    hub = quote_stream.quote_hub
+    yield MetricFamily("stream_symbols", "gauge", "Symbols with a live quote refresh loop.").add(
+        len(hub.symbols) if hub is not None else 0
+    )
+
+
+def _evictions(stats: Dict[str, Any], tier: str = "memory") -> Dict[str, int]:
+    if "l1" in stats:
+        return {**_evictions(stats["l1"], "l1"), **_evictions(stats["l2"], "l2")}
+    return {tier: stats["evictions"]} if "evictions" in stats else {}
+
+
+registry.register_collector(collect_caches)
+registry.register_collector(collect_upstreams)
+registry.register_collector(collect_background)
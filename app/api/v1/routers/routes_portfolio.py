@@ -0,0 +1,29 @@
+"""
+This module contains the portfolio valuation endpoint.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header
+
+from app.core.serialization import json_response
+from app.dependencies.repo import get_repo
+from app.repositories.base_repo import StockRepoProtocol
+from app.services.portfolio import get_portfolio
+
+router = APIRouter(prefix="/portfolio", tags=["portfolio"])
+
+
+@router.get("")
+async def get_portfolio_endpoint(
+    repo: StockRepoProtocol = Depends(get_repo),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Value all held positions at their last known close.
+
+    The response carries the total value and day change, and columnar arrays of
+    symbol, amount, price, value, day change and exposure, one entry per position.
+    """
+    portfolio = await get_portfolio(repo)
+    return json_response(portfolio.render(), if_none_match)
@@ -2,36 +2,177 @@
 This module contains API endpoints for stock-related operations.
 """
 
-from fastapi import APIRouter, Body, Path, status, Depends
+from datetime import date
+from typing import FrozenSet, List, Optional, Tuple
 
-from app.models.stock import Stock, AmountPayload
-from app.services.stock_service import get_stock, update_amount
+from fastapi import APIRouter, Body, Header, HTTPException, Path, Query, status, Depends
+
+from app.core.config import get_settings
+from app.core.serialization import RenderedJSON, json_response
+from app.models.stock import Stock, AmountPayload, BatchResponse, SymbolsPayload
+from app.services.history_service import get_history
+from app.services.stock_service import (
+    get_partial_stock,
+    get_partial_stocks,
+    normalize_symbol,
+    render_batch,
+    render_stock,
+    select_sources,
+    update_amount,
+)
 from app.dependencies.repo import get_repo
-from app.repositories.stock_repo import StockRepo
+from app.repositories.base_repo import StockRepoProtocol
 
 router = APIRouter(prefix="/stock", tags=["stock"])
 
+settings = get_settings()
+
+INCLUDE_QUERY = Query(None, description="Comma-separated sources to fetch: prices, performance")
+FIELDS_QUERY = Query(None, description="Comma-separated stock fields to return, e.g. close,volume")
+
+
+def request_budget(
+    x_request_timeout: Optional[float] = Header(
+        None, gt=0, description="Seconds to wait for the upstreams; defaults to REQUEST_TIMEOUT"
+    ),
+) -> Optional[float]:
+    """
+    Get the latency budget of a request, capped at ``REQUEST_TIMEOUT_MAX``; None if the
+    header is absent and ``REQUEST_TIMEOUT`` is 0.
+    """
+    budget = x_request_timeout if x_request_timeout is not None else settings.REQUEST_TIMEOUT
+    return min(budget, settings.REQUEST_TIMEOUT_MAX) if budget > 0 else None
+
+
+@router.get("", response_model=BatchResponse)
+async def get_stocks_endpoint(
+    symbols: str = Query(..., description="Comma-separated ticker symbols"),
+    include: Optional[str] = INCLUDE_QUERY,
+    fields: Optional[str] = FIELDS_QUERY,
+    repo: StockRepoProtocol = Depends(get_repo),
+    budget: Optional[float] = Depends(request_budget),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Get stock information for several symbols at once.
+    """
+    return json_response(await _get_batch(symbols.split(","), repo, include, fields, budget), if_none_match)
+
+
+@router.post("", response_model=BatchResponse)
+async def post_stocks_endpoint(
+    payload: SymbolsPayload = Body(..., example={"symbols": ["AAPL", "IBM"]}),
+    include: Optional[str] = INCLUDE_QUERY,
+    fields: Optional[str] = FIELDS_QUERY,
+    repo: StockRepoProtocol = Depends(get_repo),
+    budget: Optional[float] = Depends(request_budget),
+):
+    """
+    Get stock information for several symbols at once, with the symbols in the body.
+    """
+    return json_response(await _get_batch(payload.symbols, repo, include, fields, budget))
+
 
 @router.get("/{symbol}", response_model=Stock)
 async def get_stock_endpoint(
     symbol: str = Path(..., description="Ticker symbol"),
-    repo: StockRepo = Depends(get_repo),
+    include: Optional[str] = INCLUDE_QUERY,
+    fields: Optional[str] = FIELDS_QUERY,
+    repo: StockRepoProtocol = Depends(get_repo),
+    budget: Optional[float] = Depends(request_budget),
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Get stock information by its symbol.
+
+    Only the upstream sources named in ``include``, or those providing the ``fields``
+    asked for, are fetched; ``include=prices`` skips the MarketWatch scrape. Fields of
+    sources left out hold their last known values.
+
+    The upstreams are waited for at most ``X-Request-Timeout`` seconds, or
+    ``REQUEST_TIMEOUT``. A source that has not answered by then is listed under
+    ``missing`` and its fields are null; it is still fetched into the cache. A source
+    that failed is listed the same way, with its error under ``errors``. If no source
+    answered, the response carries the first error, or is 504 Gateway Timeout.
+
+    The response carries an ``ETag``; a request whose ``If-None-Match`` holds the current
+    tag is answered with 304 Not Modified and no body.
     """
-    return await get_stock(symbol, repo)
+    sources, selected = _selection(include, fields)
+    stock, missing = await get_partial_stock(symbol, repo, sources, budget)
+    return json_response(render_stock(stock, selected, missing), if_none_match)
+
+
+@router.get("/{symbol}/history")
+async def get_history_endpoint(
+    symbol: str = Path(..., description="Ticker symbol"),
+    start: Optional[date] = Query(None, alias="from", description="First date, inclusive"),
+    end: Optional[date] = Query(None, alias="to", description="Last date, inclusive"),
+    indicators: Optional[str] = Query(
+        None, description="Comma-separated indicators, e.g. returns,sma_50,volatility_20"
+    ),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Get the daily open, high, low, close and volume of a stock for a date range.
+
+    The response is columnar: ``dates`` and each price field are arrays of the same
+    length, and each requested indicator is an array aligned with them.
+    """
+    specs = [spec for spec in (indicators or "").split(",") if spec.strip()]
+    try:
+        history = await get_history(normalize_symbol(symbol), start, end, specs)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return json_response(RenderedJSON.from_data(history), if_none_match)
 
 
 @router.post("/{symbol}", response_model=Stock, status_code=status.HTTP_202_ACCEPTED)
 async def update_amount_endpoint(
     symbol: str = Path(...),
     payload: AmountPayload = Body(..., example={"amount": 10}),
-    repo: StockRepo = Depends(get_repo),
+    repo: StockRepoProtocol = Depends(get_repo),
 ):
     """
     Update the amount of a stock.
     """
 
     delta = payload.amount
-    return await update_amount(symbol, delta, repo)
+    stock = await update_amount(symbol, delta, repo)
+    return json_response(render_stock(stock), status_code=status.HTTP_202_ACCEPTED)
+
+
+def _split(value: Optional[str]) -> Optional[List[str]]:
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _selection(include: Optional[str], fields: Optional[str]) -> Tuple[FrozenSet[str], Optional[List[str]]]:
+    """
+    Parse the ``include`` and ``fields`` query parameters, rejecting unknown names.
+    """
+    try:
+        return select_sources(_split(include), _split(fields))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+async def _get_batch(
+    symbols: List[str],
+    repo: StockRepoProtocol,
+    include: Optional[str] = None,
+    fields: Optional[str] = None,
+    budget: Optional[float] = None,
+) -> RenderedJSON:
+    """
+    Resolve a batch of symbols, reporting per-symbol errors inside the response.
+    """
+    if len(symbols) > settings.BATCH_MAX_SYMBOLS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_MAX_SYMBOLS} symbols per request",
+        )
+    sources, selected = _selection(include, fields)
+    results, missing = await get_partial_stocks(symbols, repo, sources, budget)
+    return render_batch(results, selected, missing)
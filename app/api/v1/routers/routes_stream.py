@@ -0,0 +1,93 @@
+"""
+This module contains streaming endpoints for live stock quotes.
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, List
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import get_settings
+from app.services.quote_stream import get_quote_hub
+from app.services.stock_service import normalize_symbol
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+settings = get_settings()
+
+
+@router.get("/stocks")
+async def stream_stocks_sse(symbols: str = Query(..., description="Comma-separated ticker symbols")):
+    """
+    Stream quote changes of several symbols as Server-Sent Events.
+
+    Each ``quote`` event carries the symbol and the fields that changed since the
+    previous event for that symbol; the first event of a symbol carries all fields.
+    """
+    return StreamingResponse(
+        _sse_events(_parse_symbols(symbols)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/stocks/ws")
+async def stream_stocks_ws(websocket: WebSocket, symbols: str = Query(...)):
+    """
+    Stream quote changes of several symbols over a WebSocket.
+
+    Each message is a JSON object mapping symbols to their changed fields.
+    """
+    try:
+        symbol_list = _parse_symbols(symbols)
+    except HTTPException as exc:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
+        return
+    await websocket.accept()
+    async with get_quote_hub().subscription(symbol_list) as subscription:
+        # Incoming messages are ignored; reading them is how a disconnect is noticed.
+        receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+        try:
+            while True:
+                changes = asyncio.ensure_future(subscription.next())
+                done, _ = await asyncio.wait({changes, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if receiver in done:
+                    changes.cancel()
+                    break
+                await websocket.send_json(changes.result())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            receiver.cancel()
+
+
+async def _sse_events(symbols: List[str]) -> AsyncIterator[str]:
+    async with get_quote_hub().subscription(symbols) as subscription:
+        while True:
+            try:
+                changes = await asyncio.wait_for(subscription.next(), settings.STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            for symbol, fields in changes.items():
+                yield f"event: quote\ndata: {json.dumps({'symbol': symbol, **fields})}\n\n"
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+def _parse_symbols(symbols: str) -> List[str]:
+    symbol_list = list(dict.fromkeys(normalize_symbol(s) for s in symbols.split(",") if s.strip()))
+    if not symbol_list or len(symbol_list) > settings.STREAM_MAX_SYMBOLS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Between 1 and {settings.STREAM_MAX_SYMBOLS} symbols per stream",
+        )
+    return symbol_list
@@ -0,0 +1,245 @@
+"""
+This module provides a stale-while-revalidate cache for upstream results.
+"""
+
+import asyncio
+import contextvars
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple, Type
+
+import cachetools
+
+from app.core.cache_backends import CacheBackend, CacheEntry, MemoryBackend
+from app.core.logging_config import get_logger
+from app.core.rate_limit import BACKGROUND, request_priority
+from app.core.singleflight import SingleFlight
+
+logger = get_logger(__name__)
+
+
+class SWRCache:
+    """
+    Cache that serves fresh entries, serves stale entries while refreshing them in the
+    background, and fetches missing or expired entries.
+
+    An entry is fresh for ``fresh_ttl`` seconds after it is stored, then stale for a
+    further ``stale_ttl`` seconds. Fetches for the same key are coalesced. Entries are
+    held by ``backend``, an in-process LRU of ``maxsize`` entries by default. Lookups and
+    stores do the backend's I/O off the event loop; ``in``, ``peek`` and ``ttl_remaining``
+    only look at what the backend holds in process, and count no lookup.
+
+    If fetching an expired key raises one of the ``serve_expired_on`` exceptions, the
+    expired value is served instead, e.g. while the upstream's circuit breaker is open.
+
+    If fetching a key raises one of the ``negative_on`` exceptions, the exception is
+    cached in process for ``negative_ttl`` seconds and raised again without fetching,
+    e.g. for unknown symbols. ``get_many`` leaves such keys out of its result.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fresh_ttl: float,
+        stale_ttl: float = 0,
+        maxsize: int = 1024,
+        clock: Callable[[], float] = time.time,
+        backend: Optional[CacheBackend] = None,
+        serve_expired_on: Tuple[Type[BaseException], ...] = (),
+        negative_ttl: float = 0,
+        negative_on: Tuple[Type[BaseException], ...] = (),
+    ):
+        self.name = name
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self._entries = backend if backend is not None else MemoryBackend(maxsize)
+        self._serve_expired_on = serve_expired_on
+        self._negative_on = negative_on if negative_ttl > 0 else ()
+        self._negative = cachetools.TTLCache(maxsize=maxsize, ttl=max(negative_ttl, 0.001), timer=clock)
+        self._clock = clock
+        self._inflight = SingleFlight()
+        self._refreshes: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.expired_hits = 0
+        self.negative_hits = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._entries.peek(key) is not None
+
+    async def get(self, key: Hashable, fetch: Callable[[Hashable], Awaitable[Any]]) -> Any:
+        """
+        Get a value from the cache, fetching it if needed.
+
+        Args:
+            key (Hashable): The cache key.
+            fetch (Callable): Coroutine function called with the key to load the value.
+
+        Returns:
+            Any: The cached or freshly fetched value.
+        """
+        entry = await self._entries.get_async(key)
+        if entry is not None:
+            age = self._clock() - entry.stored_at
+            if age < self.fresh_ttl:
+                self.hits += 1
+                return entry.value
+            if age < self.fresh_ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._refresh_in_background(key, fetch)
+                return entry.value
+        error = self._negative.get(key)
+        if error is not None:
+            self.negative_hits += 1
+            raise error.with_traceback(None)
+
+        self.misses += 1
+        try:
+            return await self._inflight.do(key, lambda: self._load(key, fetch))
+        except self._serve_expired_on:
+            if entry is None:
+                raise
+            self.expired_hits += 1
+            return entry.value
+
+    async def get_many(
+        self,
+        keys: Iterable[Hashable],
+        fetch_many: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+    ) -> Dict[Hashable, Any]:
+        """
+        Get several values from the cache, fetching all misses with one call.
+
+        Stale keys are served from the cache and refreshed together in the background.
+        Keys that ``fetch_many`` leaves out of its result are left out of the result too.
+
+        Args:
+            keys (Iterable[Hashable]): The cache keys.
+            fetch_many (Callable): Coroutine function called with the list of missing keys,
+                returning a mapping of key to value.
+
+        Returns:
+            Dict[Hashable, Any]: The values found, keyed by cache key.
+        """
+        results = {}
+        missing = []
+        stale = []
+        now = self._clock()
+        for key in keys:
+            entry = await self._entries.get_async(key)
+            age = now - entry.stored_at if entry is not None else None
+            if age is not None and age < self.fresh_ttl:
+                self.hits += 1
+                results[key] = entry.value
+            elif age is not None and age < self.fresh_ttl + self.stale_ttl:
+                self.stale_hits += 1
+                results[key] = entry.value
+                if key not in self._inflight:
+                    stale.append(key)
+            elif key in self._negative:
+                self.negative_hits += 1
+            else:
+                self.misses += 1
+                missing.append(key)
+
+        if stale:
+            self._spawn(self._load_many(stale, fetch_many))
+        if missing:
+            results.update(await self._load_many(missing, fetch_many))
+        return results
+
+    async def refresh(self, key: Hashable, fetch: Callable[[Hashable], Awaitable[Any]]) -> Any:
+        """
+        Fetch a value and store it, whether or not the cached one is still fresh.
+        """
+        return await self._inflight.do(key, lambda: self._load(key, fetch))
+
+    def peek(self, key: Hashable) -> Any:
+        """
+        Get the cached value of a key without loading it or counting a lookup.
+
+        Returns:
+            Any: The value if it is fresh or stale, or None if it is missing or expired.
+        """
+        entry = self._entries.peek(key)
+        if entry is None or self._clock() - entry.stored_at >= self.fresh_ttl + self.stale_ttl:
+            return None
+        return entry.value
+
+    def ttl_remaining(self, key: Hashable) -> Optional[float]:
+        """
+        Get the number of seconds a key stays fresh, or None if it is not cached.
+        """
+        entry = self._entries.peek(key)
+        if entry is None:
+            return None
+        return self.fresh_ttl - (self._clock() - entry.stored_at)
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Store a value in the cache as fresh.
+        """
+        self._negative.pop(key, None)
+        self._entries.set(key, CacheEntry(value, self._clock()))
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+        self._entries.clear()
+        self._negative.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the hit, stale and miss counters of the cache and those of its backend.
+        """
+        return {
+            "hits": self.hits,
+            "stale": self.stale_hits,
+            "misses": self.misses,
+            "expired": self.expired_hits,
+            "negative": self.negative_hits,
+            "size": len(self._entries),
+            "backend": self._entries.stats(),
+        }
+
+    async def _load(self, key: Hashable, fetch: Callable[[Hashable], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch(key)
+        except self._negative_on as exc:
+            self._negative[key] = exc
+            raise
+        await self._store(key, value)
+        return value
+
+    async def _load_many(
+        self,
+        keys: List[Hashable],
+        fetch_many: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+    ) -> Dict[Hashable, Any]:
+        values = await fetch_many(keys)
+        for key, value in values.items():
+            await self._store(key, value)
+        return values
+
+    async def _store(self, key: Hashable, value: Any):
+        self._negative.pop(key, None)
+        await self._entries.set_async(key, CacheEntry(value, self._clock()))
+
+    def _refresh_in_background(self, key: Hashable, fetch: Callable[[Hashable], Awaitable[Any]]):
+        if key in self._inflight:
+            return
+        self._spawn(self._inflight.do(key, lambda: self._load(key, fetch)))
+
+    def _spawn(self, coro: Awaitable[Any]):
+        # Background refreshes queue behind interactive callers at the rate limiters.
+        context = contextvars.copy_context()
+        context.run(request_priority.set, BACKGROUND)
+        task = asyncio.create_task(coro, context=context)
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background refresh failed", cache=self.name, error=str(task.exception()))
@@ -0,0 +1,436 @@
+"""
+This module contains the storage backends of the upstream result cache.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Protocol
+
+import cachetools
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass
+class CacheEntry:
+    """
+    A cached value and the wall-clock time it was stored at.
+    """
+
+    value: Any
+    stored_at: float
+
+
+class CacheBackend(Protocol):
+    """
+    Protocol for cache storage backends.
+    """
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key, or None.
+        """
+
+    def set(self, key: Hashable, entry: CacheEntry):
+        """
+        Store the entry of a key.
+        """
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key held in process, without I/O or counting a lookup.
+        """
+
+    async def get_async(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key, doing any I/O off the event loop.
+        """
+
+    async def set_async(self, key: Hashable, entry: CacheEntry):
+        """
+        Store the entry of a key, doing any I/O off the event loop.
+        """
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+
+    def __len__(self) -> int:
+        """
+        The number of entries held.
+        """
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the counters of the backend.
+        """
+
+
+class _CountingLRUCache(cachetools.LRUCache):
+    """
+    LRU cache counting the entries evicted to make room for new ones; removals by
+    ``clear`` are not evictions.
+    """
+
+    evictions = 0
+    _making_room = False
+
+    def __setitem__(self, key, value):
+        self._making_room = True
+        try:
+            super().__setitem__(key, value)
+        finally:
+            self._making_room = False
+
+    def popitem(self):
+        if self._making_room:
+            self.evictions += 1
+        return super().popitem()
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process LRU backend bounded by number of entries.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self._entries = _CountingLRUCache(maxsize=maxsize)
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key, or None.
+        """
+        return self._entries.get(key)
+
+    def set(self, key: Hashable, entry: CacheEntry):
+        """
+        Store the entry of a key.
+        """
+        self._entries[key] = entry
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key, or None.
+        """
+        return self._entries.get(key)
+
+    async def get_async(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key, or None.
+        """
+        return self._entries.get(key)
+
+    async def set_async(self, key: Hashable, entry: CacheEntry):
+        """
+        Store the entry of a key.
+        """
+        self._entries[key] = entry
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """
+        The number of entries held.
+        """
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the counters of the backend.
+        """
+        return {"entries": len(self._entries), "evictions": self._entries.evictions}
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=_tag).encode("utf-8")
+
+
+def _decode(data: bytes) -> Any:
+    return json.loads(data, object_hook=_untag)
+
+
+def _tag(value: Any) -> Any:
+    # Dates, as in Polygon results, are tagged so they are read back as dates.
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _untag(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        if "$date" in obj:
+            return date.fromisoformat(obj["$date"])
+        if "$datetime" in obj:
+            return datetime.fromisoformat(obj["$datetime"])
+    return obj
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Backend storing entries as JSON in a local SQLite file shared by all workers.
+
+    Values must be JSON-compatible; dates are kept as dates. Nothing read from the file
+    is executed, so a process that can write to it cannot run code in this one. Rows
+    that cannot be decoded, such as those of older versions, count as missing.
+
+    The store is bounded by the total size of the serialized values: once more than a
+    tenth of ``max_bytes`` has been written since the last check, the oldest entries are
+    deleted until the newest ones fit in ``max_bytes``. The size is kept as a running
+    count, recounted at each check to include the writes of other workers.
+    """
+
+    def __init__(self, path: str, namespace: str, max_bytes: int):
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self._written = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=1000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, stored_at REAL NOT NULL,"
+            " size INTEGER NOT NULL, value BLOB NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        self._bytes = self._count_bytes()
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key, or None.
+        """
+        entry = self._read(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key without counting a lookup. This backend holds nothing in
+        process, so the file is read.
+        """
+        return self._read(key)
+
+    async def get_async(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key in a worker thread.
+        """
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key: Hashable, entry: CacheEntry):
+        """
+        Store the entry of a key in a worker thread.
+        """
+        await asyncio.to_thread(self.set, key, entry)
+
+    def set(self, key: Hashable, entry: CacheEntry):
+        """
+        Store the entry of a key.
+        """
+        value = _encode(entry.value)
+        with self._lock:
+            replaced = self._conn.execute(
+                "SELECT size FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, str(key))
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, str(key), entry.stored_at, len(value), value),
+            )
+            self._bytes += len(value) - (replaced[0] if replaced is not None else 0)
+            self._written += len(value)
+            if self._written > self.max_bytes // 10:
+                self._written = 0
+                self._evict()
+                self._bytes = self._count_bytes()
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        """
+        The number of entries held.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+
+    def total_bytes(self) -> int:
+        """
+        The total size of the serialized values of this namespace, as last counted.
+        """
+        return self._bytes
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the counters of the backend.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes": self.total_bytes(),
+        }
+
+    def _read(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, str(key)),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return CacheEntry(_decode(row[0]), row[1])
+        except ValueError:
+            return None
+
+    def _count_bytes(self) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+
+    def _evict(self):
+        cursor = self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY stored_at DESC) AS running"
+            " FROM cache_entries WHERE namespace = ?) WHERE running > ?)",
+            (self.namespace, self.namespace, self.max_bytes),
+        )
+        self.evictions += cursor.rowcount
+
+
+class TwoTierBackend(CacheBackend):
+    """
+    Backend with an in-process first tier in front of a shared second tier.
+
+    Reads are served by the first tier. A key missing from it, or whose entry is older
+    than ``recheck_after`` seconds, is looked up in the second tier, and a newer entry
+    written there by another worker is copied into the first tier.
+
+    ``get_async`` and ``set_async`` run the second-tier I/O in a worker thread, and
+    ``peek`` only looks at the first tier.
+    """
+
+    def __init__(
+        self,
+        l1: CacheBackend,
+        l2: CacheBackend,
+        recheck_after: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.l1 = l1
+        self.l2 = l2
+        self.recheck_after = recheck_after
+        self._clock = clock
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key from the first tier, or else the second.
+        """
+        entry = self.l1.get(key)
+        if entry is not None and self._clock() - entry.stored_at < self.recheck_after:
+            return entry
+        return self._newer(key, entry, self.l2.get(key))
+
+    def set(self, key: Hashable, entry: CacheEntry):
+        """
+        Store the entry of a key.
+        """
+        self.l1.set(key, entry)
+        self.l2.set(key, entry)
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key from the first tier.
+        """
+        return self.l1.peek(key)
+
+    async def get_async(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the entry of a key as ``get`` does, reading the second tier in a thread.
+        """
+        entry = self.l1.peek(key)
+        if entry is not None and self._clock() - entry.stored_at < self.recheck_after:
+            return entry
+        return self._newer(key, entry, await self.l2.get_async(key))
+
+    async def set_async(self, key: Hashable, entry: CacheEntry):
+        """
+        Store the entry of a key, writing the second tier in a thread.
+        """
+        self.l1.set(key, entry)
+        await self.l2.set_async(key, entry)
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        self.l1.clear()
+        self.l2.clear()
+
+    def __len__(self) -> int:
+        """
+        The number of entries held.
+        """
+        return len(self.l1)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the counters of the backend.
+        """
+        return {"l1": self.l1.stats(), "l2": self.l2.stats()}
+
+    def _newer(self, key: Hashable, entry: Optional[CacheEntry], shared: Optional[CacheEntry]) -> Optional[CacheEntry]:
+        if shared is not None and (entry is None or shared.stored_at > entry.stored_at):
+            self.l1.set(key, shared)
+            return shared
+        return entry
+
+
+def create_cache_backend(namespace: str, maxsize: int, recheck_after: float) -> CacheBackend:
+    """
+    Create the cache backend selected by the ``CACHE_BACKEND`` setting.
+
+    Args:
+        namespace (str): The name of the cache, used to separate keys in shared storage.
+        maxsize (int): The maximum number of entries of the in-process tier.
+        recheck_after (float): Age after which a first-tier entry is checked against the
+            shared tier.
+
+    Returns:
+        CacheBackend: An in-process LRU, or a two-tier backend in ``"two-tier"`` mode.
+    """
+    memory = MemoryBackend(maxsize)
+    if settings.CACHE_BACKEND != "two-tier":
+        return memory
+    shared = SQLiteBackend(settings.CACHE_SHARED_PATH, namespace, settings.CACHE_SHARED_MAX_BYTES)
+    return TwoTierBackend(memory, shared, recheck_after)
@@ -0,0 +1,90 @@
+"""
+This module contains a circuit breaker for upstream calls.
+"""
+
+import time
+from typing import Any, Callable, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker that stops calls to an upstream after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and calls fail
+    fast. Once ``recovery_time`` seconds have passed, one trial call is let through
+    (half-open): its success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_time: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_running = False
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may be made now.
+
+        Returns:
+            bool: False while the breaker is open, or half-open with a trial running.
+        """
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if self._clock() - self.opened_at < self.recovery_time:
+                return False
+            self.state = HALF_OPEN
+        if self._trial_running:
+            return False
+        self._trial_running = True
+        return True
+
+    def record_success(self):
+        """
+        Record a successful call.
+        """
+        self.state = CLOSED
+        self.failures = 0
+        self._trial_running = False
+
+    def record_failure(self):
+        """
+        Record a failed call, opening the breaker if needed.
+        """
+        self.failures += 1
+        self._trial_running = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = self._clock()
+
+    def release(self):
+        """
+        Release a call that ended without a result, e.g. because it was cancelled.
+        """
+        self._trial_running = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the state of the breaker.
+        """
+        snapshot = {"state": self.state, "failures": self.failures, "times_opened": self.times_opened}
+        if self.state == OPEN:
+            snapshot["retry_in"] = round(max(0.0, self.recovery_time - (self._clock() - self.opened_at)), 3)
+        return snapshot
@@ -3,6 +3,7 @@ This module contains the configuration settings for the application.
 """
 
 from functools import lru_cache
+from typing import Literal, Optional
 
 from pydantic import ConfigDict, Field
 from pydantic_settings import BaseSettings
@@ -16,9 +17,88 @@ class Settings(BaseSettings):
     POLYGON_API_KEY: str = Field(..., min_length=32, description="API Key for Polygon")
     DEBUG: bool = False
     HTTP_TIMEOUT: int = 10
+    HTTP2: bool = True
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_RETRIES: int = 2
+    HTTP_RETRY_BACKOFF: float = 0.2
+    POLYGON_MAX_CONNECTIONS: int = 50
+    POLYGON_MAX_KEEPALIVE: int = 20
+    POLYGON_CONNECT_TIMEOUT: float = 3.0
+    POLYGON_READ_TIMEOUT: float = 5.0
+    MWATCH_MAX_CONNECTIONS: int = 20
+    MWATCH_MAX_KEEPALIVE: int = 10
+    MWATCH_CONNECT_TIMEOUT: float = 3.0
+    MWATCH_READ_TIMEOUT: float = 5.0
+    POLYGON_RATE_PER_MINUTE: float = 0
+    POLYGON_RATE_BURST: int = 5
+    MWATCH_RATE_PER_MINUTE: float = 0
+    MWATCH_RATE_BURST: int = 10
+    RATE_LIMIT_MAX_WAIT: float = 5.0
+    HEDGE_ENABLED: bool = False
+    HEDGE_PERCENTILE: float = 95
+    HEDGE_MIN_DELAY: float = 0.05
+    HEDGE_BUDGET_RATIO: float = 0.1
+    HEDGE_BUDGET_BURST: float = 10
+    HEDGE_WINDOW: int = 500
+    HEDGE_MIN_SAMPLES: int = 20
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_RECOVERY_TIME: float = 30.0
     CACHE_TTL: int = 60
+    CACHE_STALE_TTL: int = 300
+    CACHE_MAXSIZE: int = 1024
+    CACHE_BACKEND: Literal["memory", "two-tier"] = "memory"
+    CACHE_SHARED_PATH: str = "./.cache/shared_cache.db"
+    CACHE_SHARED_MAX_BYTES: int = 64 * 1024 * 1024
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_PATH: str = "./.cache/http_cache.db"
+    HTTP_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    HTTP_CACHE_MAX_BODY: int = 8 * 1024 * 1024
+    POLYGON_CACHE_TTL: int = 3600
+    POLYGON_CACHE_STALE_TTL: int = 86400
+    NEGATIVE_CACHE_TTL: int = 60
+    MARKET_SETTLE_MINUTES: int = 30
     POLYGON_URL: str
     MWATCH_URL: str
+    POLYGON_GROUPED_URL: str = (
+        "https://api.polygon.io/v2/aggs/grouped/locale/us/market/stocks/{last_trade_day}"
+        "?adjusted=true&apiKey={key}"
+    )
+    POLYGON_RANGE_URL: str = (
+        "https://api.polygon.io/v2/aggs/ticker/{symbol}/range/1/day/{start}/{end}"
+        "?adjusted=true&sort=asc&limit=50000&apiKey={key}"
+    )
+    HISTORY_DIR: str = "./.cache/history"
+    HISTORY_DEFAULT_DAYS: int = 365
+    HISTORY_MAX_DAYS: int = 365 * 20
+    PREFETCH_ENABLED: bool = True
+    PREFETCH_WATCHLIST: str = ""
+    PREFETCH_INTERVAL: float = 5.0
+    PREFETCH_LEAD_TIME: float = 15.0
+    PREFETCH_TOP_N: int = 50
+    PREFETCH_MIN_HITS: float = 2
+    PREFETCH_CONCURRENCY: int = 4
+    PREFETCH_MAX_CALLS: int = 20
+    WARMUP_ENABLED: bool = True
+    WARMUP_SYMBOLS: str = ""
+    WARMUP_DEADLINE: float = 20.0
+    WARMUP_CONNECTIONS: int = 2
+    STREAM_INTERVAL: float = 1.0
+    STREAM_KEEPALIVE: float = 15.0
+    STREAM_MAX_SYMBOLS: int = 50
+    PARSE_EXECUTOR: Literal["inline", "thread", "process"] = "thread"
+    PARSE_WORKERS: Optional[int] = None
+    REPO_BACKEND: Literal["sqlite", "memory"] = "sqlite"
+    DATABASE_URL: str = "sqlite:///./stocks.db"
+    DB_POOL_SIZE: int = 5
+    DB_BUSY_TIMEOUT_MS: int = 5000
+    DB_FLUSH_INTERVAL: float = 1.0
+    DB_FLUSH_MAX: int = 500
+    POSITION_REFRESH_INTERVAL: float = 5.0
+    BATCH_MAX_SYMBOLS: int = 500
+    BATCH_CONCURRENCY: int = 16
+    BATCH_GROUPED_MIN: int = 5
+    REQUEST_TIMEOUT: float = 5.0
+    REQUEST_TIMEOUT_MAX: float = 30.0
     model_config = ConfigDict(env_file=".env")
 
     # pylint: disable=R0903
@@ -0,0 +1,71 @@
+"""
+This module manages the application's database engine.
+"""
+
+from sqlalchemy import Engine, event, text
+from sqlmodel import SQLModel, create_engine
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+engine: Engine | None = None
+
+
+def _set_sqlite_pragmas(dbapi_connection, _):
+    """
+    Enable WAL mode so readers are not blocked by the batched writer.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.DB_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def create_db_engine(url: str) -> Engine:
+    """
+    Create a SQLite engine with a connection pool and create the SQLModel tables.
+
+    Args:
+        url (str): The SQLAlchemy database URL.
+
+    Returns:
+        Engine: The database engine.
+    """
+    # Import the models so their tables are registered on the SQLModel metadata.
+    import app.models.stock  # pylint: disable=import-outside-toplevel,unused-import
+
+    db_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=settings.DB_POOL_SIZE,
+        pool_pre_ping=True,
+    )
+    event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    SQLModel.metadata.create_all(db_engine)
+    return db_engine
+
+
+def get_engine() -> Engine:
+    """
+    Get the process-wide database engine, creating it on first use.
+
+    Returns:
+        Engine: The database engine.
+    """
+    global engine  # pylint: disable=global-statement
+    if engine is None:
+        engine = create_db_engine(settings.DATABASE_URL)
+    return engine
+
+
+def check_database(db_engine: Engine) -> None:
+    """
+    Run a trivial query to check that the database is reachable.
+
+    Raises:
+        SQLAlchemyError: If the database cannot be queried.
+    """
+    with db_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
@@ -16,6 +16,47 @@ class ExternalAPIError(HTTPException):
         super().__init__(status_code=status.HTTP_502_BAD_GATEWAY, detail=detail)
 
 
+class NoDataError(ExternalAPIError):
+    """
+    Exception raised when an upstream has no data for a symbol, e.g. an unknown symbol.
+    """
+
+    def __init__(self, detail: str = "No data found"):
+        super().__init__(detail=detail)
+        self.status_code = status.HTTP_404_NOT_FOUND
+
+
+class UpstreamUnavailableError(ExternalAPIError):
+    """
+    Exception raised without calling an upstream whose circuit breaker is open.
+    """
+
+    def __init__(self, upstream: str):
+        super().__init__(detail=f"{upstream} is temporarily unavailable")
+        self.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        self.upstream = upstream
+
+
+class UpstreamThrottledError(UpstreamUnavailableError):
+    """
+    Exception raised when no upstream rate-limit token became available in time.
+    """
+
+    def __init__(self, upstream: str):
+        super().__init__(upstream)
+        self.detail = f"{upstream} rate limit reached, try again later"
+
+
+class DeadlineExceededError(ExternalAPIError):
+    """
+    Exception raised when no upstream answered within the latency budget of a request.
+    """
+
+    def __init__(self, detail: str = "No upstream answered within the request budget"):
+        super().__init__(detail=detail)
+        self.status_code = status.HTTP_504_GATEWAY_TIMEOUT
+
+
 async def external_api_error_handler(_: Request, exc: ExternalAPIError):
     """
     Exception handler for ExternalAPIError.
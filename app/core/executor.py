@@ -0,0 +1,111 @@
+"""
+This module manages the executor that runs CPU-bound HTML parsing.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.metrics import PARSE_DURATION
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+class ParseExecutor:
+    """
+    Runs parse functions inline on the event loop, in a thread pool, or in a process pool.
+
+    Process workers are spawned rather than forked, so they do not inherit the state of
+    the running event loop, and only import the module of the function they run.
+    """
+
+    def __init__(self, mode: str = "inline", workers: Optional[int] = None):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown parse executor mode {mode!r}, expected one of {EXECUTOR_MODES}")
+        self.mode = mode
+        self.workers = workers
+        self._pool: Optional[Executor] = None
+        if mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse")
+        elif mode == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        self.pending = 0
+        self.max_pending = 0
+        self.submitted = 0
+        self.completed = 0
+
+    @property
+    def inline(self) -> bool:
+        """
+        Whether functions run directly on the event loop.
+        """
+        return self._pool is None
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a function with the executor.
+
+        Args:
+            fn (Callable): The function; it must be picklable in process mode.
+            *args: Positional arguments for the function.
+
+        Returns:
+            Any: The result of the function.
+        """
+        self.submitted += 1
+        started = time.perf_counter()
+        if self._pool is None:
+            try:
+                return fn(*args)
+            finally:
+                self.completed += 1
+                PARSE_DURATION.observe(time.perf_counter() - started, self.mode)
+
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+            # Includes the time queued for a worker, which is what callers wait for.
+            PARSE_DURATION.observe(time.perf_counter() - started, self.mode)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the mode and queue-depth counters of the executor.
+        """
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+        }
+
+    def shutdown(self):
+        """
+        Shut down the worker pool, cancelling work that has not started.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+parse_executor: ParseExecutor | None = None
+_inline_executor = ParseExecutor("inline")
+
+
+def get_parse_executor() -> ParseExecutor:
+    """
+    Get the parse executor.
+
+    Returns:
+        ParseExecutor: The executor created in the application lifespan, or an inline
+        executor if none has been created.
+    """
+    return parse_executor or _inline_executor
@@ -0,0 +1,218 @@
+"""
+This module contains request hedging for idempotent upstream calls.
+
+A request that has not answered after a high percentile of the upstream's recent
+latency is sent a second time; the first response is used and the other request is
+cancelled. A budget bounds hedges to a fraction of requests, so a slow upstream is not
+sent twice the load.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+import httpx
+
+from app.core.metrics import UPSTREAM_HEDGES
+
+
+class LatencyTracker:
+    """
+    Sliding window of recent latencies, with percentile estimates.
+
+    The sorted window is rebuilt after every ``window // 20`` new samples rather than on
+    every read, which keeps estimates cheap on the request path.
+    """
+
+    def __init__(self, window: int = 500, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._sorted: List[float] = []
+        self._rebuild_every = max(1, window // 20)
+        self._since_rebuild = 0
+
+    def record(self, seconds: float):
+        """
+        Add the latency of a request, or a lower bound of it for a cancelled one.
+        """
+        self._samples.append(seconds)
+        self._since_rebuild += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Get the ``q``-th percentile of the window, or None with too few samples.
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        if self._since_rebuild >= self._rebuild_every or not self._sorted:
+            self._sorted = sorted(self._samples)
+            self._since_rebuild = 0
+        index = min(len(self._sorted) - 1, int(len(self._sorted) * q / 100))
+        return self._sorted[index]
+
+
+class HedgeBudget:
+    """
+    Allows hedges as a fraction of requests.
+
+    Every request adds ``ratio`` of a token, up to ``burst`` tokens, and every hedge
+    takes a whole token, so at most ``ratio`` of requests are hedged over time.
+    """
+
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = float(burst)
+
+    def deposit(self):
+        """
+        Credit the budget for one request.
+        """
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def available(self) -> bool:
+        """
+        Check whether a hedge may be sent.
+        """
+        return self.tokens >= 1
+
+    def spend(self):
+        """
+        Take the token of one hedge.
+        """
+        self.tokens -= 1
+
+
+class Hedger:
+    """
+    Sends a request, and a hedge of it once it has been outstanding for longer than the
+    ``percentile`` of recent latencies, but at least ``min_delay`` seconds.
+
+    No hedge is sent until ``min_samples`` latencies have been seen, when the budget is
+    spent, or when ``allow`` refuses it, e.g. because the breaker is not closed.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        percentile: float = 95,
+        min_delay: float = 0.05,
+        budget_ratio: float = 0.1,
+        budget_burst: float = 10,
+        window: int = 500,
+        min_samples: int = 20,
+    ):
+        self.upstream = upstream
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.tracker = LatencyTracker(window, min_samples)
+        self.budget = HedgeBudget(budget_ratio, budget_burst)
+        self.requests = 0
+        self.fired = 0
+        self.won = 0
+        self.denied = 0
+        self._closing: Set[asyncio.Future] = set()
+
+    def delay(self) -> Optional[float]:
+        """
+        Get how long a request may be outstanding before it is hedged, or None.
+        """
+        latency = self.tracker.percentile(self.percentile)
+        return None if latency is None else max(self.min_delay, latency)
+
+    async def run(
+        self, send: Callable[[], Awaitable[httpx.Response]], allow: Callable[[], bool] = lambda: True
+    ) -> httpx.Response:
+        """
+        Send a request, hedging it if it is slow.
+
+        Args:
+            send (Callable): Coroutine function that sends the request once.
+            allow (Callable): Called before a hedge is sent; a hedge is skipped if it
+                returns False.
+
+        Raises:
+            Exception: The error of the first request, if no request got a response.
+
+        Returns:
+            httpx.Response: The first response received.
+        """
+        self.requests += 1
+        self.budget.deposit()
+        tasks = [asyncio.ensure_future(self._timed(send))]
+        try:
+            delay = self.delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    if self.budget.available() and allow():
+                        self.budget.spend()
+                        self.fired += 1
+                        UPSTREAM_HEDGES.inc(self.upstream, "fired")
+                        tasks.append(asyncio.ensure_future(self._timed(send)))
+                    else:
+                        self.denied += 1
+                        UPSTREAM_HEDGES.inc(self.upstream, "denied")
+            return await self._first_response(tasks)
+        finally:
+            for task in tasks:
+                self._discard(task)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """
+        Get the hedge counters, the current hedge delay and the budget left.
+        """
+        delay = self.delay()
+        return {
+            "requests": self.requests,
+            "fired": self.fired,
+            "won": self.won,
+            "denied": self.denied,
+            "delay_seconds": round(delay, 6) if delay is not None else None,
+            "budget": round(self.budget.tokens, 3),
+        }
+
+    async def _timed(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await send()
+        except asyncio.CancelledError:
+            # A cancelled loser took at least this long; leaving it out would skew the
+            # window toward the fast requests and hedge too early.
+            self.tracker.record(time.perf_counter() - started)
+            raise
+        # Answers from the HTTP cache say nothing about the upstream's latency.
+        if not response.extensions.get("from_cache"):
+            self.tracker.record(time.perf_counter() - started)
+        return response
+
+    async def _first_response(self, tasks: List[asyncio.Future]) -> httpx.Response:
+        pending = set(tasks)
+        errors: Dict[int, BaseException] = {}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for i, task in enumerate(tasks):
+                if task not in done:
+                    continue
+                if task.exception() is not None:
+                    errors[i] = task.exception()
+                    continue
+                if i > 0:
+                    self.won += 1
+                    UPSTREAM_HEDGES.inc(self.upstream, "won")
+                tasks.pop(i)
+                return task.result()
+        raise errors[min(errors)]
+
+    def _discard(self, task: asyncio.Future):
+        # The losing request is cancelled; if it already has a response, it is closed
+        # without reading the rest of its body, so the HTTP cache does not store it.
+        if task.done():
+            if not task.cancelled() and task.exception() is None:
+                closing = asyncio.ensure_future(task.result().aclose())
+                self._closing.add(closing)
+                closing.add_done_callback(self._closing.discard)
+        else:
+            task.cancel()
+            task.add_done_callback(self._discard)
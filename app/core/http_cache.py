@@ -0,0 +1,353 @@
+"""
+This module contains an HTTP caching transport for upstream responses.
+
+It follows the private-cache rules of RFC 9111: responses are stored unless
+``no-store`` forbids it, served while fresh by ``max-age``, ``Expires`` or the
+``Last-Modified`` heuristic, and revalidated with ``If-None-Match`` and
+``If-Modified-Since`` once stale, so an unchanged page costs a 304. Bodies are stored
+as received, still compressed, base64-encoded in a JSON document.
+"""
+
+import asyncio
+import base64
+import time
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from app.core.cache_backends import CacheBackend, CacheEntry
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Statuses that are cacheable by default (RFC 9110, section 15.1).
+CACHEABLE_STATUSES = {200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501}
+# Heuristic freshness: a tenth of the time since the last modification, at most a day.
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX = 86400.0
+# Headers of a 304 that must not replace the stored ones.
+_NOT_UPDATED = {"content-length", "content-encoding", "transfer-encoding"}
+# Query parameters carrying credentials, left out of cache keys so they are not stored.
+CREDENTIAL_PARAMS = {"apikey", "api_key", "key", "token", "access_token"}
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    Parse a ``Cache-Control`` header into its directives.
+
+    Args:
+        value (str, optional): The header value.
+
+    Returns:
+        Dict[str, Optional[str]]: The lower-cased directive names and their arguments.
+    """
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else None
+    return directives
+
+
+def cache_key(url: httpx.URL) -> str:
+    """
+    Get the cache key of a URL: the URL without its credential query parameters.
+
+    Args:
+        url (httpx.URL): The request URL.
+
+    Returns:
+        str: The URL to store the response under.
+    """
+    params = [(name, value) for name, value in url.params.multi_items() if name.lower() not in CREDENTIAL_PARAMS]
+    return str(url.copy_with(params=params))
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """
+    A stored upstream response and the times of the exchange that produced it.
+    """
+
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    vary: Dict[str, Optional[str]]
+    request_time: float
+    response_time: float
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        Get the response as a JSON-serializable dict, with the body in base64.
+        """
+        return {
+            "status_code": self.status_code,
+            "headers": [list(header) for header in self.headers],
+            "body": base64.b64encode(self.body).decode("ascii"),
+            "vary": self.vary,
+            "request_time": self.request_time,
+            "response_time": self.response_time,
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "StoredResponse":
+        """
+        Rebuild a response from the dict of ``to_json``.
+        """
+        return cls(
+            data["status_code"],
+            [(name, value) for name, value in data["headers"]],
+            base64.b64decode(data["body"]),
+            data["vary"],
+            data["request_time"],
+            data["response_time"],
+        )
+
+    def header(self, name: str) -> Optional[str]:
+        """
+        Get the value of a stored header, or None.
+        """
+        name = name.lower()
+        return next((value for key, value in self.headers if key.lower() == name), None)
+
+    def freshness_lifetime(self) -> float:
+        """
+        Get the number of seconds the response is fresh for after it was generated.
+        """
+        directives = parse_cache_control(self.header("cache-control"))
+        if "no-cache" in directives:
+            return 0.0
+        max_age = _seconds(directives.get("max-age"))
+        if max_age is not None:
+            return max_age
+        date = _http_date(self.header("date")) or self.response_time
+        expires = self.header("expires")
+        if expires is not None:
+            expires_at = _http_date(expires)
+            return max(0.0, expires_at - date) if expires_at is not None else 0.0
+        last_modified = _http_date(self.header("last-modified"))
+        if last_modified is not None:
+            return min(max(0.0, date - last_modified) * HEURISTIC_FRACTION, HEURISTIC_MAX)
+        return 0.0
+
+    def age(self, now: float) -> float:
+        """
+        Get the current age of the response, as in RFC 9111, section 4.2.3.
+        """
+        date = _http_date(self.header("date"))
+        apparent_age = max(0.0, self.response_time - date) if date is not None else 0.0
+        corrected_age = (_seconds(self.header("age")) or 0.0) + self.response_time - self.request_time
+        return max(apparent_age, corrected_age) + now - self.response_time
+
+    def is_fresh(self, now: float) -> bool:
+        """
+        Check whether the response can be served without contacting the upstream.
+        """
+        return self.age(now) < self.freshness_lifetime()
+
+    def matches(self, request: httpx.Request) -> bool:
+        """
+        Check whether the request headers selected by ``Vary`` are the stored ones.
+        """
+        return all(request.headers.get(name) == value for name, value in self.vary.items())
+
+    def revalidated(self, headers: httpx.Headers, request_time: float, response_time: float) -> "StoredResponse":
+        """
+        Get the response updated with the headers of a 304 Not Modified.
+        """
+        updated = {name.lower() for name in headers if name.lower() not in _NOT_UPDATED}
+        merged = [(k, v) for k, v in self.headers if k.lower() not in updated]
+        merged += [(k, v) for k, v in headers.multi_items() if k.lower() in updated]
+        return replace(self, headers=merged, request_time=request_time, response_time=response_time)
+
+
+class _TeeStream(httpx.AsyncByteStream):
+    """
+    Passes a response body through while keeping a copy, which is stored once the body
+    has been received in full.
+
+    A body closed before its end is not stored. Its rest is not read either, so a
+    reader that stops early frees the connection at once.
+    """
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_complete: Callable[[bytes], None], max_body: int):
+        self._stream = stream
+        self._on_complete = on_complete
+        self._max_body = max_body
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self._done = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            self._keep(chunk)
+            yield chunk
+        self._finish()
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+    def _keep(self, chunk: bytes):
+        self._size += len(chunk)
+        if self._size <= self._max_body:
+            self._chunks.append(chunk)
+        else:
+            self._chunks = []
+
+    def _finish(self):
+        if not self._done and self._size <= self._max_body:
+            self._done = True
+            self._on_complete(b"".join(self._chunks))
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """
+    Transport that answers GETs from stored responses while they are fresh, and
+    revalidates stale ones with the upstream.
+
+    Responses are stored by URL, without credentials, in ``backend``, usually the
+    SQLite backend so they survive restarts and are shared by workers; one variant is
+    kept per URL. Only bodies read to the end are stored; bodies larger than
+    ``max_body`` bytes are passed through without being stored.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        backend: CacheBackend,
+        max_body: int = 8 * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._transport = transport
+        self._backend = backend
+        self.max_body = max_body
+        self._clock = clock
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stored = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """
+        Answer a request from the cache, after revalidating if needed, or the upstream.
+        """
+        if request.method != "GET" or "no-store" in parse_cache_control(request.headers.get("cache-control")):
+            return await self._transport.handle_async_request(request)
+        key = cache_key(request.url)
+        entry = await asyncio.to_thread(self._backend.get, key)
+        stored = StoredResponse.from_json(entry.value) if entry is not None else None
+        if stored is not None and not stored.matches(request):
+            stored = None
+
+        if stored is not None:
+            if "no-cache" not in parse_cache_control(request.headers.get("cache-control")) and stored.is_fresh(
+                self._clock()
+            ):
+                self.hits += 1
+                return self._replay(stored, request)
+            etag, last_modified = stored.header("etag"), stored.header("last-modified")
+            if etag is not None:
+                request.headers["If-None-Match"] = etag
+            if last_modified is not None:
+                request.headers["If-Modified-Since"] = last_modified
+
+        request_time = self._clock()
+        response = await self._transport.handle_async_request(request)
+        response_time = self._clock()
+        if stored is not None and response.status_code == 304:
+            await response.aclose()
+            self.revalidated += 1
+            stored = stored.revalidated(response.headers, request_time, response_time)
+            self._spawn(self._store(key, stored))
+            return self._replay(stored, request)
+
+        self.misses += 1
+        if not self._storable(response):
+            return response
+        vary = {
+            name.strip().lower(): request.headers.get(name.strip())
+            for name in response.headers.get("vary", "").split(",") if name.strip()
+        }
+
+        def complete(body: bytes):
+            stored = StoredResponse(
+                response.status_code, response.headers.multi_items(), body, vary, request_time, response_time
+            )
+            self._spawn(self._store(key, stored))
+
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_TeeStream(response.stream, complete, self.max_body),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        """
+        Wait for pending stores and close the wrapped transport.
+        """
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._transport.aclose()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the hit, revalidation, miss and store counters.
+        """
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses, "stored": self.stored}
+
+    def _storable(self, response: httpx.Response) -> bool:
+        if response.status_code not in CACHEABLE_STATUSES or response.headers.get("vary", "").strip() == "*":
+            return False
+        directives = parse_cache_control(response.headers.get("cache-control"))
+        if "no-store" in directives:
+            return False
+        # Without explicit freshness or a validator the response could never be reused.
+        return bool(
+            {"max-age", "public"} & directives.keys()
+            or {"expires", "etag", "last-modified"} & {name.lower() for name in response.headers}
+        )
+
+    def _replay(self, stored: StoredResponse, request: httpx.Request) -> httpx.Response:
+        headers = [(k, v) for k, v in stored.headers if k.lower() != "age"]
+        headers.append(("Age", str(int(stored.age(self._clock())))))
+        return httpx.Response(
+            stored.status_code,
+            headers=headers,
+            stream=httpx.ByteStream(stored.body),
+            request=request,
+            extensions={"from_cache": True},
+        )
+
+    async def _store(self, key: str, stored: StoredResponse):
+        await asyncio.to_thread(self._backend.set, key, CacheEntry(stored.to_json(), stored.response_time))
+        self.stored += 1
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("HTTP cache store failed", error=str(task.exception()))
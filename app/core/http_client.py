@@ -1,23 +1,275 @@
 """
-This module manages the application's HTTP client.
+This module manages the application's HTTP clients.
+
+Each upstream gets its own client, with its own connection limits and timeouts, and its
+own circuit breaker and rate limiter. ``get`` and ``stream`` send idempotent GETs
+through the breaker and the limiter, and retry transient failures with jittered
+exponential backoff. With ``HEDGE_ENABLED``, slow requests are hedged. Polygon
+responses go through the HTTP cache of ``app.core.http_cache`` when it is enabled.
 """
 
 # app/core/http_client.py
+import asyncio
+import importlib.util
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+from urllib.parse import urlsplit
+
+import httpx
 from httpx import AsyncClient
 
+from app.core.cache_backends import SQLiteBackend
+from app.core.circuit_breaker import CLOSED, CircuitBreaker
+from app.core.config import get_settings
+from app.core.errors import UpstreamUnavailableError
+from app.core.hedging import Hedger
+from app.core.http_cache import CachingTransport
+from app.core.logging_config import get_logger
+from app.core.metrics import UPSTREAM_REQUEST_DURATION, UPSTREAM_RESPONSES
+from app.core.rate_limit import TokenBucket
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+POLYGON = "polygon"
+MARKETWATCH = "marketwatch"
+UPSTREAMS = (POLYGON, MARKETWATCH)
+
+RETRY_STATUSES = {500, 502, 503, 504}
+
 async_client: AsyncClient | None = None
+clients: Dict[str, AsyncClient] = {}
+http_caches: Dict[str, CachingTransport] = {}
+breakers: Dict[str, CircuitBreaker] = {
+    upstream: CircuitBreaker(
+        upstream,
+        failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+        recovery_time=settings.BREAKER_RECOVERY_TIME,
+    )
+    for upstream in UPSTREAMS
+}
+limiters: Dict[str, TokenBucket] = {
+    POLYGON: TokenBucket(
+        POLYGON, settings.POLYGON_RATE_PER_MINUTE / 60, settings.POLYGON_RATE_BURST, settings.RATE_LIMIT_MAX_WAIT
+    ),
+    MARKETWATCH: TokenBucket(
+        MARKETWATCH, settings.MWATCH_RATE_PER_MINUTE / 60, settings.MWATCH_RATE_BURST, settings.RATE_LIMIT_MAX_WAIT
+    ),
+}
+
 
+hedgers: Dict[str, Hedger] = {
+    upstream: Hedger(
+        upstream,
+        percentile=settings.HEDGE_PERCENTILE,
+        min_delay=settings.HEDGE_MIN_DELAY,
+        budget_ratio=settings.HEDGE_BUDGET_RATIO,
+        budget_burst=settings.HEDGE_BUDGET_BURST,
+        window=settings.HEDGE_WINDOW,
+        min_samples=settings.HEDGE_MIN_SAMPLES,
+    )
+    for upstream in UPSTREAMS
+} if settings.HEDGE_ENABLED else {}
 
-def get_client() -> AsyncClient:
+
+def get_client(upstream: str | None = None) -> AsyncClient:
     """
     Get the HTTP client.
 
+    Args:
+        upstream (str, optional): The upstream to get the dedicated client of.
+
     Raises:
         RuntimeError: If the client is not initialized.
 
     Returns:
-        AsyncClient: The HTTP client instance.
+        AsyncClient: The client of the upstream, or the shared client if the upstream
+        has none.
     """
-    if async_client is None:
+    client = clients.get(upstream) or async_client
+    if client is None:
         raise RuntimeError("Client not initialized!")
-    return async_client
+    return client
+
+
+def create_client(upstream: str) -> AsyncClient:
+    """
+    Create the HTTP client of an upstream from its settings.
+
+    HTTP/2 is used when enabled and the ``h2`` package is installed. With
+    ``HTTP_CACHE_ENABLED``, Polygon responses are cached on disk in ``HTTP_CACHE_PATH``.
+    MarketWatch pages are not: they are parsed while streaming and rarely read to the
+    end, so ``fetch_marketwatch`` keeps the parsed table with the page validators
+    instead. httpx asks for gzip and deflate bodies, and brotli or zstd when their
+    decoders are installed; they are cached compressed.
+
+    Args:
+        upstream (str): The upstream name, e.g. ``"polygon"``.
+
+    Returns:
+        AsyncClient: The configured client.
+    """
+    prefix = "POLYGON" if upstream == POLYGON else "MWATCH"
+    limits = httpx.Limits(
+        max_connections=getattr(settings, f"{prefix}_MAX_CONNECTIONS"),
+        max_keepalive_connections=getattr(settings, f"{prefix}_MAX_KEEPALIVE"),
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        settings.HTTP_TIMEOUT,
+        connect=getattr(settings, f"{prefix}_CONNECT_TIMEOUT"),
+        read=getattr(settings, f"{prefix}_READ_TIMEOUT"),
+    )
+    http2 = settings.HTTP2 and importlib.util.find_spec("h2") is not None
+    transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+    if settings.HTTP_CACHE_ENABLED and upstream != MARKETWATCH:
+        backend = SQLiteBackend(settings.HTTP_CACHE_PATH, upstream, settings.HTTP_CACHE_MAX_BYTES)
+        transport = http_caches[upstream] = CachingTransport(transport, backend, settings.HTTP_CACHE_MAX_BODY)
+    return AsyncClient(timeout=timeout, transport=transport)
+
+
+def open_clients():
+    """
+    Create the client of every upstream.
+    """
+    for upstream in UPSTREAMS:
+        clients[upstream] = create_client(upstream)
+
+
+async def preconnect(upstream: str, connections: int = 1):
+    """
+    Open connections to an upstream ahead of its first request.
+
+    ``HEAD`` requests are sent to the root of the upstream's host, bypassing the circuit
+    breaker and the rate limiter; their status is ignored, and the connections are kept
+    in the client's pool.
+
+    Args:
+        upstream (str): The upstream name.
+        connections (int): The number of concurrent requests, and so of HTTP/1.1
+            connections. HTTP/2 multiplexes them over one connection.
+
+    Raises:
+        httpx.HTTPError: If the upstream could not be reached.
+    """
+    url = urlsplit(settings.POLYGON_URL if upstream == POLYGON else settings.MWATCH_URL)
+    client = get_client(upstream)
+    await asyncio.gather(*(client.head(f"{url.scheme}://{url.netloc}/") for _ in range(connections)))
+
+
+async def close_clients():
+    """
+    Close the client of every upstream.
+    """
+    for client in clients.values():
+        await client.aclose()
+    clients.clear()
+    http_caches.clear()
+
+
+async def get(upstream: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Send a GET request to an upstream, with retries and circuit breaking.
+
+    Args:
+        upstream (str): The upstream name.
+        url (str): The request URL.
+        **kwargs: Extra arguments for ``AsyncClient.build_request``.
+
+    Raises:
+        UpstreamUnavailableError: If the circuit breaker of the upstream is open, or no
+            rate-limit token became available in time.
+        httpx.HTTPError: If the request still fails after all retries.
+
+    Returns:
+        httpx.Response: The response, with its body read.
+    """
+    return await _send(upstream, url, stream_body=False, **kwargs)
+
+
+@asynccontextmanager
+async def stream(upstream: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+    """
+    Send a GET request to an upstream and stream the response body.
+
+    Retries and circuit breaking apply until the response headers arrive; the body
+    is closed when the context exits, even if it was not read to the end.
+    """
+    response = await _send(upstream, url, stream_body=True, **kwargs)
+    try:
+        yield response
+    finally:
+        await response.aclose()
+
+
+def upstream_states() -> Dict[str, Dict]:
+    """
+    Get the circuit breaker state and rate-limiter counters of every upstream, and the
+    hedging counters when hedging is enabled.
+    """
+    states = {
+        upstream: {"breaker": breakers[upstream].snapshot(), "rate_limit": limiters[upstream].stats()}
+        for upstream in UPSTREAMS
+    }
+    for upstream, hedger in hedgers.items():
+        states[upstream]["hedging"] = hedger.stats()
+    return states
+
+
+async def _send(upstream: str, url: str, stream_body: bool, **kwargs) -> httpx.Response:
+    client = get_client(upstream)
+    breaker = breakers[upstream]
+    # Checked before queueing for a rate-limit token, so calls that fail fast spend none.
+    # The breaker sees one result per call, after its retries, not one per attempt.
+    if not breaker.allow():
+        raise UpstreamUnavailableError(upstream)
+    attempt = 0
+    settled = False
+    try:
+        while True:
+            await limiters[upstream].acquire()
+            started = time.perf_counter()
+            try:
+                response = await _dispatch(upstream, client, url, stream_body, kwargs)
+            except httpx.TransportError as exc:
+                UPSTREAM_RESPONSES.inc(upstream, "error")
+                if attempt >= settings.HTTP_RETRIES:
+                    settled = True
+                    breaker.record_failure()
+                    raise
+                logger.warning("Upstream request failed, retrying", upstream=upstream, error=repr(exc))
+            else:
+                UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - started, upstream)
+                UPSTREAM_RESPONSES.inc(upstream, str(response.status_code))
+                if response.status_code not in RETRY_STATUSES:
+                    settled = True
+                    breaker.record_success()
+                    return response
+                if attempt >= settings.HTTP_RETRIES:
+                    settled = True
+                    breaker.record_failure()
+                    return response
+                await response.aclose()
+                logger.warning(
+                    "Upstream returned an error, retrying", upstream=upstream, status_code=response.status_code
+                )
+            attempt += 1
+            # Full jitter: sleep a random time up to the exponential backoff.
+            await asyncio.sleep(random.uniform(0, settings.HTTP_RETRY_BACKOFF * 2 ** (attempt - 1)))
+    finally:
+        # Ended without a result, e.g. cancelled or throttled: free a half-open trial.
+        if not settled:
+            breaker.release()
+
+
+async def _dispatch(upstream: str, client: AsyncClient, url: str, stream_body: bool, kwargs: Dict) -> httpx.Response:
+    def send():
+        return client.send(client.build_request("GET", url, **kwargs), stream=stream_body)
+
+    hedger = hedgers.get(upstream)
+    if hedger is None:
+        return await send()
+    # A hedge needs a closed breaker and a rate-limit token it does not have to wait for.
+    return await hedger.run(send, lambda: breakers[upstream].state == CLOSED and limiters[upstream].try_acquire())
@@ -7,7 +7,8 @@ import time
 import uuid
 
 import structlog.contextvars
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.logging_config import get_logger
 
@@ -15,28 +16,39 @@ logger = get_logger("request")
 
 
 # pylint: disable=R0903
-class LoggingMiddleware(BaseHTTPMiddleware):
+class LoggingMiddleware:
     """
-    Middleware for logging HTTP requests.
+    Pure ASGI middleware for logging HTTP requests.
+
+    The request ID is bound to the log context and set on the response start message;
+    the response body is passed through untouched, so streaming responses are not
+    buffered or wrapped.
     """
 
-    async def dispatch(self, request, call_next):
-        start_time = time.time()
-        response = None
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
         status_code = 500  # Default if an error occurred
 
-        request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+        request_id = Headers(scope=scope).get("x-request-id") or str(uuid.uuid4())
         structlog.contextvars.bind_contextvars(request_id=request_id)
 
+        async def send_with_request_id(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
         try:
-            response = await call_next(request)
-            status_code = response.status_code
-            response.headers["X-Request-ID"] = request_id
-        except Exception as exc:
-            raise exc
+            await self.app(scope, receive, send_with_request_id)
         finally:
-            process_time = (time.time() - start_time) * 1000
+            process_time = (time.perf_counter() - start_time) * 1000
             level = logging.INFO if status_code < 500 else logging.ERROR
             structlog.get_logger().log(level, "request completed", status_code=status_code, duration=process_time)
-
-        return response
@@ -0,0 +1,153 @@
+"""
+This module contains the NYSE trading calendar: full-day holidays, early closes, and
+the resolution of the last trading session.
+
+The holidays follow the exchange's rules since 2000, plus its unscheduled closures.
+Tables for ``PRECOMPUTED_YEARS`` are built at import; other years are built on first
+use.
+"""
+
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import FrozenSet, Optional
+from zoneinfo import ZoneInfo
+
+EXCHANGE_TZ = ZoneInfo("America/New_York")
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+PRECOMPUTED_YEARS = range(2000, 2041)
+
+# Closures outside the yearly rules: 9/11, national days of mourning, Hurricane Sandy.
+SPECIAL_CLOSURES = frozenset({
+    date(2001, 9, 11), date(2001, 9, 12), date(2001, 9, 13), date(2001, 9, 14),
+    date(2004, 6, 11), date(2007, 1, 2), date(2012, 10, 29), date(2012, 10, 30),
+    date(2018, 12, 5), date(2025, 1, 9),
+})
+
+
+def _easter(year: int) -> date:
+    # Anonymous Gregorian algorithm.
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    return date(year, month, (h + l - 7 * m + 33 * month + 19) % 32)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _last_weekday(year: int, month: int, weekday: int) -> date:
+    last = date(year, month + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    # Saturday holidays move to Friday, Sunday holidays to Monday.
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def _holidays(year: int) -> FrozenSet[date]:
+    days = {
+        _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _last_weekday(year, 5, 0),  # Memorial Day
+        _observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25)),
+    }
+    # New Year's Day on a Saturday is not observed on the Friday before.
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    days.update(day for day in SPECIAL_CLOSURES if day.year == year)
+    return frozenset(days)
+
+
+@lru_cache(maxsize=None)
+def _early_closes(year: int) -> FrozenSet[date]:
+    candidates = {
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),  # Day after Thanksgiving
+        date(year, 12, 24),
+    }
+    # July 3 closes early when Independence Day falls on Tuesday to Friday.
+    if date(year, 7, 4).weekday() in (1, 2, 3, 4):
+        candidates.add(date(year, 7, 3))
+    return frozenset(day for day in candidates if day.weekday() < 5 and day not in _holidays(year))
+
+
+for _year in PRECOMPUTED_YEARS:
+    _holidays(_year)
+    _early_closes(_year)
+
+
+def is_holiday(day: date) -> bool:
+    """
+    Check whether the exchange is closed all day on a weekday.
+    """
+    return day in _holidays(day.year)
+
+
+def is_trading_day(day: date) -> bool:
+    """
+    Check whether the exchange holds a session on a day.
+    """
+    return day.weekday() < 5 and not is_holiday(day)
+
+
+def is_early_close(day: date) -> bool:
+    """
+    Check whether the session of a day closes at 1 p.m. Eastern.
+    """
+    return day in _early_closes(day.year)
+
+
+def session_close(day: date) -> datetime:
+    """
+    Get the closing time of the session of a trading day, in Eastern time.
+    """
+    return datetime.combine(day, EARLY_CLOSE if is_early_close(day) else REGULAR_CLOSE, EXCHANGE_TZ)
+
+
+def previous_trading_day(day: date) -> date:
+    """
+    Get the last trading day before a day.
+    """
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def last_session(now: Optional[datetime] = None, settle: timedelta = timedelta(0)) -> date:
+    """
+    Get the latest trading session whose daily data is complete.
+
+    Args:
+        now (datetime, optional): The current time, timezone-aware. Defaults to now.
+        settle (timedelta): Time after the close before a session's data is final.
+
+    Returns:
+        date: The date of the session.
+    """
+    now = (now or datetime.now(EXCHANGE_TZ)).astimezone(EXCHANGE_TZ)
+    today = now.date()
+    if is_trading_day(today) and now >= session_close(today) + settle:
+        return today
+    return previous_trading_day(today)
+
@@ -0,0 +1,246 @@
+"""
+This module contains a small in-process metrics registry with Prometheus text output.
+
+Metrics are recorded from the event loop thread only, so updates are plain dict and list
+operations without locks. State owned by other components (cache counters, queue
+depths, breaker states) is read by collectors when ``/metrics`` is scraped, which costs
+nothing on the request path.
+"""
+
+import bisect
+import math
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class MetricFamily:
+    """
+    A metric and its samples, as produced by a collector.
+    """
+
+    name: str
+    type: str
+    help: str
+    samples: List[Tuple[Dict[str, str], float]] = field(default_factory=list)
+
+    def add(self, value: float, **labels: str) -> "MetricFamily":
+        """
+        Add a sample with the given labels.
+        """
+        self.samples.append((labels, value))
+        return self
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _render_samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """
+        Render the metric in the Prometheus text format.
+        """
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._render_samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing counter.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        """
+        Increase the counter of the given label values.
+        """
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def _render_samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down.
+    """
+
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        """
+        Decrease the gauge of the given label values.
+        """
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str):
+        """
+        Set the gauge of the given label values.
+        """
+        self.values[labels] = value
+
+
+class Histogram(_Metric):
+    """
+    Histogram with fixed upper bucket bounds.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: a count per bucket (the last one is +Inf), and the sum.
+        self.counts: Dict[LabelValues, List[int]] = {}
+        self.sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, *labels: str):
+        """
+        Record an observation for the given label values.
+        """
+        counts = self.counts.get(labels)
+        if counts is None:
+            counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            self.sums[labels] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def _render_samples(self) -> Iterable[str]:
+        for labels, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else _number(bound)
+                yield f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(self.sums[labels])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    """
+    Holds metrics and scrape-time collectors, and renders them together.
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        """
+        Create and register a counter.
+        """
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """
+        Create and register a gauge.
+        """
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """
+        Create and register a histogram.
+        """
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        """
+        Register a function called on every scrape to produce metric families.
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+        """
+        parts = [metric.render() for metric in self._metrics]
+        for collector in self._collectors:
+            for family in collector():
+                lines = [f"# HELP {family.name} {family.help}", f"# TYPE {family.name} {family.type}"]
+                lines.extend(
+                    f"{family.name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}"
+                    for labels, value in family.samples
+                )
+                parts.append("\n".join(lines))
+        return "\n".join(parts) + "\n"
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = Registry()
+
+UPSTREAM_REQUEST_DURATION = registry.histogram(
+    "upstream_request_duration_seconds", "Duration of upstream requests until response headers.", ["upstream"]
+)
+UPSTREAM_RESPONSES = registry.counter(
+    "upstream_responses_total", "Upstream responses by status code, or error for transport errors.",
+    ["upstream", "status"],
+)
+UPSTREAM_HEDGES = registry.counter(
+    "upstream_hedges_total", "Hedged upstream requests: fired, won, or denied by the budget or breaker.",
+    ["upstream", "outcome"],
+)
+UPSTREAM_DEADLINE_MISSES = registry.counter(
+    "upstream_deadline_misses_total", "Sources left out of a response because they missed its budget.", ["source"]
+)
+PARSE_DURATION = registry.histogram(
+    "parse_duration_seconds", "Time spent parsing MarketWatch performance tables.", ["mode"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5),
+)
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "Handled requests by route, method and status code.", ["route", "method", "status"]
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Duration of handled requests, by route.", ["route"]
+)
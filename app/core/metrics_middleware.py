@@ -0,0 +1,98 @@
+"""
+This module contains the middleware that records per-route request metrics.
+"""
+
+import time
+from typing import Dict, Iterator
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, MetricFamily, registry
+
+UNMATCHED_ROUTE = "unmatched"
+
+# Scopes of the requests being handled, keyed by id; their routes are read when scraped.
+_in_flight: Dict[int, Scope] = {}
+
+
+# pylint: disable=R0903
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware that counts in-flight and handled requests per route.
+
+    Requests are labelled with the path template of the matching route, e.g.
+    ``/stock/{symbol}``, so the number of label values stays bounded by the routes.
+    The route is the one the router stored in the scope, read once the request has
+    been handled, or when in-flight requests are scraped.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start_time = time.perf_counter()
+        _in_flight[id(scope)] = scope
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            del _in_flight[id(scope)]
+            route = route_template(scope)
+            HTTP_REQUESTS.inc(route, scope["method"], str(status_code))
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start_time, route)
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Get the path template of the route that handles a request.
+
+    FastAPI routes store themselves in ``scope["route"]`` when the router matches
+    them, including on a method mismatch, which the router answers with a 405. Other
+    routes, such as the documentation pages, are matched against the router again.
+
+    Args:
+        scope (Scope): The ASGI scope of the request, after routing.
+
+    Returns:
+        str: The route path, or ``"unmatched"`` if no route matched.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", UNMATCHED_ROUTE)
+    if "endpoint" not in scope:
+        return UNMATCHED_ROUTE
+    router = getattr(scope.get("app"), "router", None)
+    for candidate in getattr(router, "routes", ()):
+        match, _ = candidate.matches(scope)
+        if match == Match.FULL:
+            return getattr(candidate, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+def collect_in_flight() -> Iterator[MetricFamily]:
+    """
+    Collect the number of requests being handled, by route.
+    """
+    counts: Dict[str, int] = {}
+    for scope in list(_in_flight.values()):
+        route = route_template(scope)
+        counts[route] = counts.get(route, 0) + 1
+    family = MetricFamily("http_requests_in_flight", "gauge", "Requests being handled, by route.")
+    for route, count in counts.items():
+        family.add(count, route=route)
+    yield family
+
+
+registry.register_collector(collect_in_flight)
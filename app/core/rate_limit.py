@@ -0,0 +1,163 @@
+"""
+This module contains a token-bucket rate limiter with priority queueing for upstream calls.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.errors import UpstreamThrottledError
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+request_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(value: int) -> Iterator[None]:
+    """
+    Run the enclosed upstream calls with the given priority.
+
+    Calls coalesced by ``SingleFlight`` run with the priority of the caller that started
+    them: an interactive request that joins a fetch started by a batch or a background
+    refresh waits at background priority.
+    """
+    token = request_priority.set(value)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Token bucket that queues callers instead of rejecting them.
+
+    Tokens are added at ``rate`` per second up to ``burst``. A caller that finds no token
+    waits in a queue ordered by priority, then arrival, until a token is available or its
+    deadline passes. A ``rate`` of 0 disables the limit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_wait: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_wait = max_wait
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.acquired = 0
+        self.throttled = 0
+        self.wait_seconds = {name: 0.0 for name in PRIORITY_NAMES.values()}
+        self.waits = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.max_wait_seconds = 0.0
+
+    async def acquire(self, priority: Optional[int] = None, deadline: Optional[float] = None):
+        """
+        Take a token, waiting for one if needed.
+
+        Args:
+            priority (int, optional): The caller priority; lower is served first.
+                Defaults to the priority of the current context.
+            deadline (float, optional): Latest ``clock()`` time to wait until. Defaults
+                to ``max_wait`` seconds from now.
+
+        Raises:
+            UpstreamThrottledError: If no token is available before the deadline.
+        """
+        if self.rate <= 0:
+            return
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            self.acquired += 1
+            return
+
+        priority = request_priority.get() if priority is None else priority
+        start = self._clock()
+        deadline = start + self.max_wait if deadline is None else deadline
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._schedule()
+        try:
+            await asyncio.wait_for(future, max(0.0, deadline - start))
+        except asyncio.TimeoutError:
+            self.throttled += 1
+            raise UpstreamThrottledError(self.name) from None
+        finally:
+            waited = self._clock() - start
+            label = PRIORITY_NAMES.get(priority, str(priority))
+            self.waits[label] = self.waits.get(label, 0) + 1
+            self.wait_seconds[label] = self.wait_seconds.get(label, 0.0) + waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.acquired += 1
+
+    def try_acquire(self) -> bool:
+        """
+        Take a token if one is available right away, without queueing.
+
+        Returns:
+            bool: True if a token was taken.
+        """
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self._waiters or self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self.acquired += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the queue and wait-time counters of the bucket.
+        """
+        return {
+            "rate_per_second": self.rate,
+            "queued": sum(1 for _, _, f in self._waiters if not f.done()),
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "waits": dict(self.waits),
+            "wait_seconds": {k: round(v, 6) for k, v in self.wait_seconds.items()},
+            "max_wait_seconds": round(self.max_wait_seconds, 6),
+        }
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _schedule(self):
+        if self._timer is not None or not self._waiters:
+            return
+        delay = max(0.0, (1 - self._tokens) / self.rate)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _dispatch(self):
+        self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        self._schedule()
@@ -0,0 +1,106 @@
+"""
+This module contains JSON serialization of pre-rendered response bodies.
+
+orjson is used when installed; the standard library encoder is used otherwise, with the
+same compact output as Starlette's ``JSONResponse``.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    """
+    Serialize JSON-compatible data to compact UTF-8 JSON.
+
+    Args:
+        data (Any): Data made of dicts, lists, strings, numbers, booleans, None and
+            one-dimensional NumPy arrays.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        data, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+def _default(value: Any) -> Any:
+    # NumPy arrays and scalars, with NaN written as null as orjson does.
+    if hasattr(value, "tolist"):
+        value = value.tolist()
+        if isinstance(value, list):
+            return [None if isinstance(x, float) and x != x else x for x in value]
+        return None if isinstance(value, float) and value != value else value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+@dataclass(frozen=True)
+class RenderedJSON:
+    """
+    A serialized JSON body and its entity tag.
+    """
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_bytes(cls, body: bytes) -> "RenderedJSON":
+        """
+        Wrap a serialized body, tagging it with a hash of its content.
+        """
+        return cls(body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+    @classmethod
+    def from_data(cls, data: Any) -> "RenderedJSON":
+        """
+        Serialize data and tag it with a hash of the content.
+        """
+        return cls.from_bytes(dumps(data))
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """
+        Check an ``If-None-Match`` header against the entity tag.
+
+        Weak comparison is used, as RFC 9110 requires for ``If-None-Match``.
+
+        Args:
+            if_none_match (str, optional): The header value.
+
+        Returns:
+            bool: True if the client already holds this representation.
+        """
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        return any(tag.strip().removeprefix("W/") == self.etag for tag in if_none_match.split(","))
+
+
+def json_response(rendered: RenderedJSON, if_none_match: Optional[str] = None, status_code: int = 200) -> Response:
+    """
+    Send a pre-serialized body with its ETag, or 304 if the client already has it.
+
+    Args:
+        rendered (RenderedJSON): The body and its entity tag.
+        if_none_match (str, optional): The ``If-None-Match`` header of the request.
+        status_code (int): The status code of a full response.
+
+    Returns:
+        Response: The response.
+    """
+    headers = {"ETag": rendered.etag}
+    if status_code == 200 and rendered.matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(rendered.body, status_code=status_code, media_type="application/json", headers=headers)
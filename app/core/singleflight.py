@@ -0,0 +1,54 @@
+"""
+This module provides single-flight coalescing of concurrent async calls.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Registry of in-flight calls, keyed so that concurrent callers share one result.
+
+    The first caller for a key starts the call as a task; every caller that arrives
+    while it is running awaits the same task. A waiter that gets cancelled is detached
+    through ``asyncio.shield`` and does not cancel the shared call, and an exception
+    raised by the call reaches every waiter.
+
+    The shared task runs in the context of the first caller, so context variables such
+    as the request priority of later callers do not apply to it.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` once for all concurrent callers of the same key.
+
+        Args:
+            key (Hashable): The coalescing key.
+            fn (Callable): A zero-argument coroutine function performing the call.
+
+        Returns:
+            Any: The result of the shared call.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled.
+        if not task.cancelled():
+            task.exception()
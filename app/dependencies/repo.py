@@ -1,4 +1,54 @@
+"""
+This module provides the process-wide stock repository.
+"""
+
+from app.core.config import get_settings
+from app.repositories.base_repo import StockRepoProtocol
 from app.repositories.stock_repo import StockRepo
 
-def get_repo() -> StockRepo:
-    return StockRepo() 
\ No newline at end of file
+settings = get_settings()
+
+_repo: StockRepoProtocol | None = None
+
+
+def get_repo() -> StockRepoProtocol:
+    """
+    Get the stock repository shared by all requests, creating it on first use.
+
+    Returns:
+        StockRepoProtocol: The SQLite repository, or the in-memory one when
+        ``REPO_BACKEND`` is ``"memory"``.
+    """
+    global _repo  # pylint: disable=global-statement
+    if _repo is None:
+        if settings.REPO_BACKEND == "memory":
+            _repo = StockRepo()
+        else:
+            # Imported here so the in-memory backend does not set up a database engine.
+            # pylint: disable=import-outside-toplevel
+            from app.core.database import get_engine
+            from app.repositories.sqlite_repo import SQLiteStockRepo
+
+            _repo = SQLiteStockRepo(
+                get_engine(),
+                flush_interval=settings.DB_FLUSH_INTERVAL,
+                flush_max=settings.DB_FLUSH_MAX,
+            )
+    return _repo
+
+
+def start_repo():
+    """
+    Start the background work of the repository, if it has any.
+    """
+    repo = get_repo()
+    if hasattr(repo, "start"):
+        repo.start()
+
+
+async def close_repo():
+    """
+    Stop the repository and write any pending changes.
+    """
+    if hasattr(_repo, "stop"):
+        await _repo.stop()
@@ -0,0 +1,371 @@
+"""
+This module contains the offline bulk refresh of stocks from the upstreams.
+
+Symbols are fetched with the same ``fetch_polygon`` and ``fetch_marketwatch`` calls as
+the API, bypassing its caches, with a bounded number in flight and an optional target
+rate. Results are merged with the stored stocks and written in batches with
+``upsert_quotes``, which leaves stored amounts as they are. Every written symbol is
+appended to a checkpoint file, so an interrupted run resumes where it stopped; the file
+is removed once a run completes.
+
+Usage:
+    python -m app.ingest (--symbols AAPL,MSFT | --symbols-file FILE) [--include SOURCES]
+        [--concurrency N] [--rate PER_SECOND] [--batch-size N] [--checkpoint FILE]
+        [--restart] [--progress-interval SECONDS]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, TextIO, Tuple
+
+from app.core import executor, http_client
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.core.rate_limit import BACKGROUND, priority
+from app.dependencies.repo import close_repo, get_repo
+from app.models.stock import QuoteSnapshot
+from app.repositories.base_repo import StockRepoProtocol
+from app.services import stock_service
+
+settings = get_settings()
+
+DEFAULT_CHECKPOINT = "./.cache/ingest.checkpoint"
+
+
+def read_symbols(lines: Iterable[str]) -> List[str]:
+    """
+    Parse a symbol list: symbols separated by commas or newlines, with ``#`` comments.
+
+    Returns:
+        List[str]: The normalized symbols, without duplicates, in their first order.
+    """
+    symbols: Dict[str, None] = {}
+    for line in lines:
+        for symbol in line.split("#", 1)[0].split(","):
+            symbol = stock_service.normalize_symbol(symbol)
+            if symbol:
+                symbols[symbol] = None
+    return list(symbols)
+
+
+class Checkpoint:
+    """
+    The symbols written by previous runs, one per line in ``path``.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def load(self) -> Set[str]:
+        """
+        Get the symbols already written, or an empty set if there is no checkpoint.
+        """
+        if not self.path.exists():
+            return set()
+        return set(self.path.read_text(encoding="utf-8").split())
+
+    def record(self, symbols: Iterable[str]):
+        """
+        Append written symbols.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as file:
+            file.writelines(f"{symbol}\n" for symbol in symbols)
+
+    def clear(self):
+        """
+        Remove the checkpoint.
+        """
+        self.path.unlink(missing_ok=True)
+
+
+class Pacer:
+    """
+    Spaces the starts of fetches to at most ``rate`` per second; 0 means unlimited.
+
+    Each caller is given the next free start slot, so the rate holds however many
+    workers are waiting, and a worker that falls behind does not cause a burst.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        """
+        Wait for the next start slot.
+        """
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+@dataclass
+class IngestStats:
+    """
+    The progress of an ingest run.
+    """
+
+    total: int
+    skipped: int = 0
+    ok: int = 0
+    failed: int = 0
+    written: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+    latencies: List[float] = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def done(self) -> int:
+        """
+        The number of symbols fetched, or that failed, in this run.
+        """
+        return self.ok + self.failed
+
+    def rate(self) -> float:
+        """
+        Get the symbols done per second since the start of the run.
+        """
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def progress(self) -> str:
+        """
+        Get a one-line progress report.
+        """
+        remaining = self.total - self.skipped - self.done
+        rate = self.rate()
+        eta = f"{remaining / rate:.0f}s" if rate else "-"
+        return (
+            f"{self.skipped + self.done}/{self.total} symbols, {self.ok} ok, {self.failed} failed, "
+            f"{self.written} written, {rate:.1f}/s, eta {eta}"
+        )
+
+    def summary(self) -> str:
+        """
+        Get the final report: counts, elapsed time, rate and fetch latencies.
+        """
+        latencies = sorted(self.latencies)
+        lines = [
+            f"{self.ok} ok, {self.failed} failed, {self.skipped} skipped from checkpoint, "
+            f"{self.written} written in {time.monotonic() - self.started:.1f}s ({self.rate():.1f}/s)"
+        ]
+        if latencies:
+            p50 = latencies[len(latencies) // 2]
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            lines.append(f"fetch latency p50 {p50 * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms")
+        lines.extend(f"  {symbol}: {error}" for symbol, error in sorted(self.errors.items()))
+        return "\n".join(lines)
+
+
+async def fetch_symbol(symbol: str, sources: FrozenSet[str]) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """
+    Fetch the wanted sources of a symbol directly from the upstreams.
+
+    Returns:
+        Tuple[Optional[Dict], Optional[Dict]]: The Polygon and MarketWatch results, None
+        for a source that is not wanted.
+    """
+    async def fetch_if(source: str, fetch) -> Optional[Dict]:
+        return await fetch(symbol) if source in sources else None
+
+    polygon_data, perf_data = await asyncio.gather(
+        fetch_if("prices", stock_service.fetch_polygon), fetch_if("performance", stock_service.fetch_marketwatch)
+    )
+    return polygon_data, perf_data
+
+
+def write_batch(repo: StockRepoProtocol, results: List[Tuple[str, Optional[Dict], Optional[Dict]]]) -> int:
+    """
+    Merge fetched results with the stored stocks, and write their market data.
+
+    Amounts are not written back: one changed by the API while the batch was being
+    merged is kept.
+
+    Returns:
+        int: The number of stocks written.
+    """
+    stored = repo.get_many(symbol for symbol, _, _ in results)
+    stocks = []
+    for symbol, polygon_data, perf_data in results:
+        current = stored.get(symbol)
+        base = QuoteSnapshot.from_stock(current) if current is not None else QuoteSnapshot(symbol=symbol)
+        snapshot = stock_service.apply_sources(base, polygon_data, perf_data)
+        stocks.append(snapshot.to_stock(0))
+    return len(repo.upsert_quotes(stocks))
+
+
+async def ingest(
+    symbols: List[str],
+    repo: StockRepoProtocol,
+    checkpoint: Checkpoint,
+    sources: FrozenSet[str] = stock_service.ALL_SOURCES,
+    concurrency: int = 16,
+    rate: float = 0.0,
+    batch_size: int = 200,
+    progress_interval: float = 2.0,
+    out: TextIO = sys.stderr,
+) -> IngestStats:
+    """
+    Fetch and store the symbols that are not in the checkpoint.
+
+    Failed symbols are reported and left out of the checkpoint, so the next run retries
+    them. Fetched results are written, and checkpointed, even if the run is interrupted.
+
+    Args:
+        symbols (List[str]): The normalized symbols.
+        repo (StockRepoProtocol): The repository to write to.
+        checkpoint (Checkpoint): The symbols written by previous runs.
+        sources (FrozenSet[str]): The upstream sources to fetch.
+        concurrency (int): The number of symbols fetched at once.
+        rate (float): The number of fetches started per second, or 0 for no limit.
+        batch_size (int): The number of stocks per write.
+        progress_interval (float): Seconds between progress lines, or 0 for none.
+        out (TextIO): Where progress is printed.
+
+    Returns:
+        IngestStats: The counters of the run.
+    """
+    done = checkpoint.load()
+    todo = [symbol for symbol in symbols if symbol not in done]
+    stats = IngestStats(total=len(symbols), skipped=len(symbols) - len(todo))
+    queue: asyncio.Queue = asyncio.Queue()
+    for symbol in todo:
+        queue.put_nowait(symbol)
+    pacer = Pacer(rate)
+    pending: List[Tuple[str, Optional[Dict], Optional[Dict]]] = []
+    write_lock = asyncio.Lock()
+
+    async def flush():
+        async with write_lock:
+            batch = pending[:]
+            del pending[:len(batch)]
+            if not batch:
+                return
+            try:
+                stats.written += await asyncio.to_thread(write_batch, repo, batch)
+            except Exception:
+                pending[:0] = batch
+                raise
+            checkpoint.record(symbol for symbol, _, _ in batch)
+
+    async def worker():
+        while not queue.empty():
+            symbol = queue.get_nowait()
+            await pacer.wait()
+            started = time.monotonic()
+            try:
+                polygon_data, perf_data = await fetch_symbol(symbol, sources)
+            except Exception as exc:  # pylint: disable=broad-except
+                stats.failed += 1
+                stats.errors[symbol] = str(exc) or type(exc).__name__
+                continue
+            stats.latencies.append(time.monotonic() - started)
+            stats.ok += 1
+            pending.append((symbol, polygon_data, perf_data))
+            if len(pending) >= batch_size:
+                await flush()
+
+    async def report():
+        while True:
+            await asyncio.sleep(progress_interval)
+            print(stats.progress(), file=out, flush=True)
+
+    reporter = asyncio.create_task(report()) if progress_interval > 0 else None
+    try:
+        with priority(BACKGROUND):
+            await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(todo))))))
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        await asyncio.shield(flush())
+    if not stats.failed:
+        checkpoint.clear()
+    return stats
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse the command line.
+    """
+    parser = argparse.ArgumentParser(prog="python -m app.ingest", description=__doc__.split("\n\n")[0])
+    given = parser.add_mutually_exclusive_group(required=True)
+    given.add_argument("--symbols", help="comma-separated symbols")
+    given.add_argument("--symbols-file", help="file of symbols, one per line or comma-separated; - for stdin")
+    parser.add_argument("--include", default=None, help="sources to fetch: prices, performance (default: both)")
+    parser.add_argument("--concurrency", type=int, default=settings.BATCH_CONCURRENCY, help="symbols fetched at once")
+    parser.add_argument("--rate", type=float, default=0.0, help="fetches started per second, 0 for no limit")
+    parser.add_argument("--batch-size", type=int, default=200, help="stocks per repository write")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="file of symbols already written")
+    parser.add_argument("--restart", action="store_true", help="ignore and remove an existing checkpoint")
+    parser.add_argument("--progress-interval", type=float, default=2.0, help="seconds between progress lines")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> int:
+    """
+    Run an ingest with parsed arguments.
+
+    Returns:
+        int: The exit status: 0 if every symbol was written, 1 otherwise.
+    """
+    if args.symbols is not None:
+        symbols = read_symbols([args.symbols])
+    elif args.symbols_file == "-":
+        symbols = read_symbols(sys.stdin)
+    else:
+        with open(args.symbols_file, encoding="utf-8") as file:
+            symbols = read_symbols(file)
+    try:
+        sources, _ = stock_service.select_sources(args.include.split(",") if args.include else None)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.restart:
+        checkpoint.clear()
+    http_client.open_clients()
+    executor.parse_executor = executor.ParseExecutor(settings.PARSE_EXECUTOR, settings.PARSE_WORKERS)
+    try:
+        stats = await ingest(
+            symbols,
+            get_repo(),
+            checkpoint,
+            sources=sources,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            batch_size=args.batch_size,
+            progress_interval=args.progress_interval,
+        )
+    finally:
+        await close_repo()
+        executor.parse_executor.shutdown()
+        executor.parse_executor = None
+        await http_client.close_clients()
+    print(stats.summary(), file=sys.stderr)
+    return 1 if stats.failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point of ``python -m app.ingest``.
+    """
+    setup_logging()
+    try:
+        return asyncio.run(run(parse_args(argv)))
+    except KeyboardInterrupt:
+        print("Interrupted; run again to resume from the checkpoint", file=sys.stderr)
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,17 +6,20 @@ This file creates and configures the FastAPI application.
 
 from contextlib import asynccontextmanager
 
-import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from httpx import AsyncClient
 
-from app.api.v1.routers import routes_health, routes_stock
-from app.core import http_client
+from app.api.v1.routers import routes_health, routes_metrics, routes_portfolio, routes_stock, routes_stream
+from app.core import executor, http_client
 from app.core.config import get_settings
 from app.core.errors import ExternalAPIError, external_api_error_handler
 from app.core.logging_config import setup_logging
 from app.core.logging_middleware import LoggingMiddleware
+from app.core.metrics_middleware import MetricsMiddleware
+from app.dependencies.repo import close_repo, start_repo
+from app.services.prefetch import start_prefetcher, stop_prefetcher
+from app.services.quote_stream import close_quote_hub
+from app.services.warmup import start_warmup, stop_warmup
 
 setup_logging()
 
@@ -27,11 +30,23 @@ settings = get_settings()
 async def lifespan(_: FastAPI):
     """
     Asynchronous context manager for the application's lifespan.
-    Initializes and closes the HTTP client.
+    Initializes and closes the HTTP clients, the parse executor, the stock repository,
+    the prefetcher and the quote streams, and starts the warm-up that ``/readyz``
+    waits for.
     """
-    http_client.async_client = AsyncClient(timeout=settings.HTTP_TIMEOUT)
+    http_client.open_clients()
+    executor.parse_executor = executor.ParseExecutor(settings.PARSE_EXECUTOR, settings.PARSE_WORKERS)
+    start_repo()
+    start_prefetcher()
+    start_warmup()
     yield
-    await http_client.async_client.aclose()
+    await stop_warmup()
+    await close_quote_hub()
+    await stop_prefetcher()
+    await close_repo()
+    executor.parse_executor.shutdown()
+    executor.parse_executor = None
+    await http_client.close_clients()
 
 
 def create_app() -> FastAPI:
@@ -45,6 +60,7 @@ def create_app() -> FastAPI:
         title="DBISRAEL Stocks API", lifespan=lifespan, version="1.0.0"
     )
     app_instance.add_middleware(LoggingMiddleware)
+    app_instance.add_middleware(MetricsMiddleware)
 
     if settings.DEBUG:
         app_instance.add_middleware(
@@ -55,7 +71,10 @@ def create_app() -> FastAPI:
         )
 
     app_instance.include_router(routes_stock.router)
+    app_instance.include_router(routes_portfolio.router)
+    app_instance.include_router(routes_stream.router)
     app_instance.include_router(routes_health.router)
+    app_instance.include_router(routes_metrics.router)
 
     app_instance.add_exception_handler(ExternalAPIError, external_api_error_handler)
     return app_instance
@@ -65,4 +84,7 @@ app = create_app()
 
 
 if __name__ == "__main__":
+    # Imported here: servers that import this module already run uvicorn or their own.
+    import uvicorn  # pylint: disable=import-outside-toplevel
+
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=settings.DEBUG)
@@ -3,10 +3,10 @@ This module defines the Stock model for the application.
 """
 
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 import json
 
-from pydantic import field_validator, BaseModel
+from pydantic import ConfigDict, field_validator, BaseModel
 from sqlmodel import TEXT, Column, Field, SQLModel
 
 
@@ -70,8 +70,66 @@ class Stock(SQLModel, table=True):
         self.performance = json.dumps(value) if value is not None else None
 
 
+class QuoteSnapshot(BaseModel):
+    """
+    Immutable market data of a stock at one point in time.
+
+    Snapshots hold no holdings, so they can be shared by any number of readers and are
+    replaced, never changed, when the market data is refreshed.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    symbol: str
+    afterHours: Optional[float] = None
+    close: Optional[float] = None
+    from_date: Optional[date] = None
+    high: Optional[float] = None
+    low: Optional[float] = None
+    open: Optional[float] = None
+    preMarket: Optional[float] = None
+    status: Optional[str] = None
+    volume: Optional[int] = None
+    performance: Optional[str] = None
+
+    @classmethod
+    def from_stock(cls, stock: "Stock") -> "QuoteSnapshot":
+        """
+        Take the market data of a stored stock.
+        """
+        return cls.model_construct(**{name: getattr(stock, name) for name in cls.model_fields})
+
+    def to_stock(self, amount: int) -> Stock:
+        """
+        Combine the market data with a holding amount into a stock.
+        """
+        return Stock(**dict(self), amount=amount)
+
+
 class AmountPayload(BaseModel):
     """
     Payload model for updating stock amount via the API.
     """
     amount: int = Field(..., ge=0)
+
+
+class SymbolsPayload(BaseModel):
+    """
+    Payload model for requesting several stocks at once via the API.
+    """
+    symbols: List[str] = Field(..., min_length=1)
+
+
+class BatchItem(BaseModel):
+    """
+    Result for one symbol of a batch request: either the stock or an error.
+    """
+    symbol: str
+    stock: Optional[Stock] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    """
+    Response model for batch stock requests.
+    """
+    results: List[BatchItem]
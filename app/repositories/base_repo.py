@@ -2,7 +2,7 @@
 This module contains the base protocol for the stock repository.
 """
 
-from typing import Protocol, Optional
+from typing import Dict, Iterable, List, Protocol, Optional
 from app.models.stock import Stock
 
 class StockRepoProtocol(Protocol):
@@ -18,3 +18,34 @@ class StockRepoProtocol(Protocol):
         """
         Upsert a stock into the repository.
         """
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Stock]:
+        """
+        Get the stocks of several symbols, keyed by symbol.
+        """
+
+    def upsert_many(self, stocks: Iterable[Stock]) -> List[Stock]:
+        """
+        Upsert several stocks into the repository.
+        """
+
+    def upsert_quote(self, stock: Stock) -> Stock:
+        """
+        Upsert the market data of a stock, leaving a stored amount as it is.
+        """
+
+    def upsert_quotes(self, stocks: Iterable[Stock]) -> List[Stock]:
+        """
+        Upsert the market data of several stocks, leaving stored amounts as they are.
+        """
+
+    def add_amount(self, symbol: str, delta: int) -> int:
+        """
+        Atomically change the amount held of a stock, creating it if needed, and get the
+        new amount. Raises ValueError if the amount would become negative.
+        """
+
+    def get_held(self) -> List[Stock]:
+        """
+        Get every stock with a positive amount.
+        """
@@ -0,0 +1,191 @@
+"""
+This module contains the columnar store of daily OHLCV history.
+
+Each symbol has a directory with one raw little-endian file per column and a small JSON
+file with the date range covered. Columns are opened as read-only memory maps, so
+slices handed to readers are views into the page cache, not copies. Writes never
+change a mapped file in place: new days are appended, and older days are merged into
+new files that replace the old ones atomically. A reader holding an earlier
+``PriceSeries`` keeps a consistent view of the data it started with.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DAY = "day"
+COLUMNS = {
+    DAY: np.dtype("<i8"),  # days since 1970-01-01
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+}
+META_FILE = "meta.json"
+# Bars of the last days may not be published yet; days without a bar this recent only
+# count as fetched once a later bar has been returned.
+UNSETTLED_DAYS = 7
+
+_SAFE_SYMBOL = re.compile(r"^[A-Z0-9.\-^]{1,20}$")
+
+
+@dataclass(frozen=True)
+class PriceSeries:
+    """
+    Daily bars of a symbol as read-only columns, and the dates they cover.
+
+    ``covered`` is the range of dates that has been fetched, including days without a
+    bar, such as weekends and holidays; it is None if nothing has been fetched.
+    """
+
+    symbol: str
+    covered: Optional[Tuple[date, date]]
+    columns: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.columns[DAY])
+
+    @property
+    def days(self) -> np.ndarray:
+        """
+        The bar dates as ``datetime64[D]``.
+        """
+        return self.columns[DAY].view("datetime64[D]")
+
+    def covers(self, start: date, end: date) -> bool:
+        """
+        Whether every date from ``start`` to ``end`` has been fetched.
+        """
+        return self.covered is not None and self.covered[0] <= start and end <= self.covered[1]
+
+    def bounds(self, start: date, end: date) -> Tuple[int, int]:
+        """
+        Get the index range of the bars from ``start`` to ``end``, inclusive.
+        """
+        days = self.columns[DAY]
+        lo = int(np.searchsorted(days, _day_number(start), side="left"))
+        hi = int(np.searchsorted(days, _day_number(end), side="right"))
+        return lo, hi
+
+
+class HistoryStore:
+    """
+    Memory-mapped columnar store of daily bars, one directory per symbol.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._series: Dict[str, PriceSeries] = {}
+
+    def load(self, symbol: str) -> PriceSeries:
+        """
+        Get the stored bars of a symbol.
+
+        Args:
+            symbol (str): The normalized stock symbol.
+
+        Raises:
+            ValueError: If the symbol cannot be used as a directory name.
+
+        Returns:
+            PriceSeries: The bars, possibly empty.
+        """
+        series = self._series.get(symbol)
+        if series is None:
+            series = self._series[symbol] = self._open(symbol)
+        return series
+
+    def write(self, symbol: str, bars: Dict[str, np.ndarray], covered: Tuple[date, date]) -> PriceSeries:
+        """
+        Add fetched bars to the store and extend the covered range.
+
+        Bars for dates after the last stored one are appended to the column files.
+        Otherwise the columns are merged, a fetched bar replacing a stored one of the
+        same date, and written to new files. Within the last ``UNSETTLED_DAYS`` days,
+        the covered range ends at the last fetched bar, so days whose bars were not
+        published yet are fetched again.
+
+        Args:
+            symbol (str): The normalized stock symbol.
+            bars (Dict[str, np.ndarray]): The fetched columns, sorted by ``day``.
+            covered (Tuple[date, date]): The date range the bars were fetched for.
+
+        Returns:
+            PriceSeries: The updated bars.
+        """
+        current = self.load(symbol)
+        path = self._path(symbol)
+        path.mkdir(parents=True, exist_ok=True)
+        new_days = np.asarray(bars[DAY], dtype=COLUMNS[DAY])
+        stored_days = current.columns[DAY]
+        if len(stored_days) == 0 or len(new_days) == 0 or new_days[0] > stored_days[-1]:
+            for name, dtype in COLUMNS.items():
+                with open(path / f"{name}.bin", "ab") as f:
+                    f.write(np.ascontiguousarray(bars[name], dtype=dtype).tobytes())
+        else:
+            merged_days = np.concatenate([new_days, stored_days])
+            # np.unique keeps the first occurrence, so fetched bars win over stored ones.
+            _, keep = np.unique(merged_days, return_index=True)
+            for name, dtype in COLUMNS.items():
+                merged = np.concatenate([np.asarray(bars[name], dtype=dtype), current.columns[name]])[keep]
+                tmp = path / f"{name}.bin.tmp"
+                tmp.write_bytes(merged.tobytes())
+                os.replace(tmp, path / f"{name}.bin")
+
+        settled = date.today() - timedelta(days=UNSETTLED_DAYS)
+        if covered[1] > settled:
+            last_bar = day_from_number(new_days[-1]) if len(new_days) else settled
+            covered = (covered[0], min(covered[1], max(settled, last_bar)))
+        if current.covered is not None:
+            covered = (min(covered[0], current.covered[0]), max(covered[1], current.covered[1]))
+        elif covered[1] < covered[0]:
+            # Nothing settled was fetched; there is no range to record yet.
+            return current
+        tmp = path / f"{META_FILE}.tmp"
+        tmp.write_text(json.dumps({"from": covered[0].isoformat(), "to": covered[1].isoformat()}))
+        os.replace(tmp, path / META_FILE)
+        series = self._series[symbol] = self._open(symbol)
+        return series
+
+    def _path(self, symbol: str) -> Path:
+        if not _SAFE_SYMBOL.match(symbol):
+            raise ValueError(f"Invalid symbol {symbol!r}")
+        return self.directory / symbol
+
+    def _open(self, symbol: str) -> PriceSeries:
+        path = self._path(symbol)
+        meta_path = path / META_FILE
+        if not meta_path.exists():
+            return PriceSeries(symbol, None, {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()})
+        meta = json.loads(meta_path.read_text())
+        covered = (date.fromisoformat(meta["from"]), date.fromisoformat(meta["to"]))
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            file = path / f"{name}.bin"
+            size = file.stat().st_size if file.exists() else 0
+            columns[name] = (
+                np.memmap(file, dtype=dtype, mode="r") if size else np.empty(0, dtype)
+            )
+        # A crash between column appends leaves columns of different lengths; use the
+        # bars that every column has.
+        length = min(len(column) for column in columns.values())
+        columns = {name: np.asarray(column[:length]) for name, column in columns.items()}
+        return PriceSeries(symbol, covered, columns)
+
+
+def _day_number(day: date) -> int:
+    return (day - date(1970, 1, 1)).days
+
+
+def day_from_number(number: int) -> date:
+    """
+    Convert a stored day number to a date.
+    """
+    return date(1970, 1, 1) + timedelta(days=int(number))
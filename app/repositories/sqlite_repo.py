@@ -0,0 +1,349 @@
+"""
+This module contains the SQLiteStockRepo class for persisting stock data in SQLite.
+"""
+
+import asyncio
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import Engine, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+
+from app.core.logging_config import get_logger
+from ..models.stock import Stock
+from .base_repo import StockRepoProtocol
+
+logger = get_logger(__name__)
+
+_WRITE_CHUNK = 500
+
+
+class SQLiteStockRepo(StockRepoProtocol):
+    """
+    SQLite repository for stock data.
+
+    ``upsert`` only records the latest state of a symbol in memory; pending writes are
+    coalesced per symbol and written in one transaction by ``flush``, which runs
+    periodically once ``start`` is called. When ``flush_max`` writes are pending, the
+    background flusher is woken at once, so callers on the event loop never wait for
+    the transaction; before ``start``, they are flushed by the caller. Reads see
+    pending writes.
+
+    ``upsert_quote`` queues market data only: its row leaves the stored amount as it
+    is, so quote refreshes never overwrite amounts changed by ``add_amount``, which
+    writes at once and atomically in the database.
+    """
+
+    def __init__(self, engine: Engine, flush_interval: float = 1.0, flush_max: int = 500):
+        self._engine = engine
+        self._flush_interval = flush_interval
+        self._flush_max = flush_max
+        self._pending: Dict[str, dict] = {}
+        self._quotes_only: Set[str] = set()
+        self._lock = threading.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def engine(self) -> Engine:
+        """
+        The database engine of the repository.
+        """
+        return self._engine
+
+    def get(self, symbol: str) -> Optional[Stock]:
+        """
+        Get a stock by its symbol.
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            row = self._pending.get(symbol)
+            quotes_only = symbol in self._quotes_only
+        if row is not None and not quotes_only:
+            return Stock.model_validate(row)
+        with Session(self._engine, expire_on_commit=False) as session:
+            stored = session.get(Stock, symbol)
+        if row is not None:
+            return _with_amount(row, stored)
+        return stored
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Stock]:
+        """
+        Get the stocks of several symbols with one query.
+
+        Returns:
+            Dict[str, Stock]: The stocks found, keyed by symbol.
+        """
+        symbols = {s.upper() for s in symbols}
+        result = {}
+        quotes = {}
+        with self._lock:
+            for symbol in symbols:
+                if symbol in self._quotes_only:
+                    quotes[symbol] = self._pending[symbol]
+                elif symbol in self._pending:
+                    result[symbol] = Stock.model_validate(self._pending[symbol])
+        remaining = symbols - result.keys()
+        if remaining:
+            with Session(self._engine, expire_on_commit=False) as session:
+                for stock in session.exec(select(Stock).where(Stock.symbol.in_(remaining))):
+                    result[stock.symbol] = stock
+        for symbol, row in quotes.items():
+            result[symbol] = _with_amount(row, result.get(symbol))
+        return result
+
+    def get_held(self) -> List[Stock]:
+        """
+        Get every stock with a positive amount, with one query.
+        """
+        with self._lock:
+            pending = dict(self._pending)
+            quotes_only = set(self._quotes_only)
+        with Session(self._engine, expire_on_commit=False) as session:
+            held = {stock.symbol: stock for stock in session.exec(select(Stock).where(Stock.amount > 0))}
+        for symbol, row in pending.items():
+            if symbol in quotes_only:
+                if symbol in held:
+                    held[symbol] = _with_amount(row, held[symbol])
+            elif row["amount"] > 0:
+                held[symbol] = Stock.model_validate(row)
+            else:
+                held.pop(symbol, None)
+        return list(held.values())
+
+    def upsert(self, stock: Stock) -> Stock:
+        """
+        Queue a stock to be written on the next flush.
+        """
+        row = _to_row(stock)
+        with self._lock:
+            self._pending[row["symbol"]] = row
+            self._quotes_only.discard(row["symbol"])
+            pending = len(self._pending)
+        if pending >= self._flush_max:
+            self._flush_soon()
+        return stock
+
+    def upsert_quote(self, stock: Stock) -> Stock:
+        """
+        Queue the market data of a stock to be written on the next flush, leaving the
+        stored amount as it is.
+        """
+        row = _to_row(stock)
+        symbol = row["symbol"]
+        with self._lock:
+            if symbol in self._pending and symbol not in self._quotes_only:
+                # A full row is pending; its amount is still the one to write.
+                row["amount"] = self._pending[symbol]["amount"]
+            else:
+                self._quotes_only.add(symbol)
+            self._pending[symbol] = row
+            pending = len(self._pending)
+        if pending >= self._flush_max:
+            self._flush_soon()
+        return stock
+
+    def upsert_many(self, stocks: Iterable[Stock]) -> List[Stock]:
+        """
+        Write several stocks in one transaction.
+
+        Older pending writes of the same symbols are dropped, so neither reads nor the
+        next flush see them over the new rows.
+        """
+        stocks = list(stocks)
+        rows = [_to_row(stock) for stock in stocks]
+        replaced = self._take_pending(row["symbol"] for row in rows)
+        try:
+            self._write(rows)
+        except Exception:
+            self._requeue(replaced)
+            raise
+        return stocks
+
+    def upsert_quotes(self, stocks: Iterable[Stock]) -> List[Stock]:
+        """
+        Write the market data of several stocks in one transaction, leaving the stored
+        amounts as they are. New stocks are inserted with their amounts.
+        """
+        stocks = list(stocks)
+        rows = [_to_row(stock) for stock in stocks]
+        replaced = self._take_pending(row["symbol"] for row in rows)
+        full = []
+        quotes = []
+        for row in rows:
+            previous = replaced.get(row["symbol"])
+            if previous is not None and not previous[1]:
+                # A full row was pending; its amount is still the one to write.
+                full.append({**row, "amount": previous[0]["amount"]})
+            else:
+                quotes.append(row)
+        try:
+            self._write(full, quotes)
+        except Exception:
+            self._requeue(replaced)
+            raise
+        return stocks
+
+    def add_amount(self, symbol: str, delta: int) -> int:
+        """
+        Atomically change the amount held of a stock in the database, inserting it if
+        needed, together with its pending write.
+
+        Raises:
+            ValueError: If the amount would become negative.
+
+        Returns:
+            int: The new amount.
+        """
+        symbol = symbol.upper()
+        replaced = self._take_pending([symbol])
+        rows = [row for row, quotes_only in replaced.values() if not quotes_only]
+        quotes = [row for row, quotes_only in replaced.values() if quotes_only]
+        try:
+            with Session(self._engine) as session:
+                self._write_rows(session, rows, quotes)
+                if delta >= 0:
+                    stmt = insert(Stock).values(symbol=symbol, amount=delta)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["symbol"], set_={"amount": Stock.amount + delta}
+                    )
+                else:
+                    stmt = (
+                        update(Stock)
+                        .where(Stock.symbol == symbol, Stock.amount + delta >= 0)
+                        .values(amount=Stock.amount + delta)
+                    )
+                amount = session.exec(stmt.returning(Stock.amount)).scalar()
+                if amount is None:
+                    raise ValueError("amount must be >= 0")
+                session.commit()
+        except Exception:
+            self._requeue(replaced)
+            raise
+        return amount
+
+    def flush(self) -> int:
+        """
+        Write all pending upserts in one transaction.
+
+        Returns:
+            int: The number of rows written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            quotes_only, self._quotes_only = self._quotes_only, set()
+        rows = [row for symbol, row in pending.items() if symbol not in quotes_only]
+        quotes = [row for symbol, row in pending.items() if symbol in quotes_only]
+        try:
+            self._write(rows, quotes)
+        except Exception:
+            self._requeue({symbol: (row, symbol in quotes_only) for symbol, row in pending.items()})
+            raise
+        return len(pending)
+
+    def start(self):
+        """
+        Start flushing pending upserts periodically in the background.
+        """
+        if self._flusher is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """
+        Stop the background flusher and write what is still pending.
+        """
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await asyncio.to_thread(self.flush)
+
+    def _flush_soon(self):
+        """
+        Have the pending writes flushed: by the background flusher if it runs, which
+        may be woken from any thread, or else right away.
+        """
+        if self._flusher is None:
+            self.flush()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _flush_periodically(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error("Stock flush failed", error=str(exc))
+
+    def _take_pending(self, symbols: Iterable[str]) -> Dict[str, tuple]:
+        """
+        Remove the pending writes of symbols about to be written, with their kind.
+        """
+        with self._lock:
+            return {
+                symbol: (self._pending.pop(symbol), symbol in self._quotes_only)
+                for symbol in symbols
+                if symbol in self._pending
+            }
+
+    def _requeue(self, taken: Dict[str, tuple]):
+        """
+        Put back writes that failed, unless a newer write for the symbol arrived meanwhile.
+        """
+        with self._lock:
+            for symbol, (row, quotes_only) in taken.items():
+                if symbol not in self._pending:
+                    self._pending[symbol] = row
+                    if quotes_only:
+                        self._quotes_only.add(symbol)
+                    else:
+                        self._quotes_only.discard(symbol)
+
+    def _write(self, rows: Sequence[dict], quotes: Sequence[dict] = ()):
+        if not rows and not quotes:
+            return
+        with Session(self._engine) as session:
+            self._write_rows(session, rows, quotes)
+            session.commit()
+
+    @staticmethod
+    def _write_rows(session: Session, rows: Sequence[dict], quotes: Sequence[dict] = ()):
+        """
+        Upsert full rows, and rows whose conflict update leaves the amount as it is.
+        """
+        for batch, keep in ((rows, ("symbol",)), (quotes, ("symbol", "amount"))):
+            # Chunked to stay under SQLite's limit on bound parameters per statement.
+            for start in range(0, len(batch), _WRITE_CHUNK):
+                stmt = insert(Stock).values(batch[start:start + _WRITE_CHUNK])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["symbol"],
+                    set_={c: stmt.excluded[c] for c in batch[0] if c not in keep},
+                )
+                session.exec(stmt)
+
+
+def _with_amount(row: dict, stored: Optional[Stock]) -> Stock:
+    """
+    Get a pending market-data row as a stock with the stored amount, if there is one.
+    """
+    if stored is None:
+        return Stock.model_validate(row)
+    return Stock.model_validate({**row, "amount": stored.amount})
+
+
+def _to_row(stock: Stock) -> dict:
+    row = stock.model_dump()
+    row["symbol"] = row["symbol"].upper()
+    return row
@@ -2,7 +2,8 @@
 This module contains the StockRepo class for interacting with the stock data in memory (in-memory implementation).
 """
 
-from typing import Optional, Dict
+import threading
+from typing import Dict, Iterable, List, Optional
 from ..models.stock import Stock
 from .base_repo import StockRepoProtocol
 
@@ -12,6 +13,7 @@ class StockRepo(StockRepoProtocol):
     """
     def __init__(self):
         self._stocks: Dict[str, Stock] = {}
+        self._lock = threading.Lock()
 
     def get(self, symbol: str) -> Optional[Stock]:
         """
@@ -25,3 +27,57 @@ class StockRepo(StockRepoProtocol):
         """
         self._stocks[stock.symbol.upper()] = stock
         return stock
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Stock]:
+        """
+        Get the stocks of several symbols, keyed by symbol.
+        """
+        result = {}
+        for symbol in symbols:
+            stock = self.get(symbol)
+            if stock is not None:
+                result[stock.symbol.upper()] = stock
+        return result
+
+    def upsert_many(self, stocks: Iterable[Stock]) -> List[Stock]:
+        """
+        Upsert several stocks.
+        """
+        return [self.upsert(stock) for stock in stocks]
+
+    def upsert_quote(self, stock: Stock) -> Stock:
+        """
+        Upsert the market data of a stock, keeping a stored amount.
+        """
+        symbol = stock.symbol.upper()
+        with self._lock:
+            stored = self._stocks.get(symbol)
+            amount = stored.amount if stored is not None else stock.amount
+            self._stocks[symbol] = stock.model_copy(update={"amount": amount})
+        return stock
+
+    def upsert_quotes(self, stocks: Iterable[Stock]) -> List[Stock]:
+        """
+        Upsert the market data of several stocks, keeping the stored amounts.
+        """
+        return [self.upsert_quote(stock) for stock in stocks]
+
+    def add_amount(self, symbol: str, delta: int) -> int:
+        """
+        Atomically change the amount held of a stock, creating it if needed.
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            stored = self._stocks.get(symbol)
+            amount = (stored.amount if stored is not None else 0) + delta
+            if amount < 0:
+                raise ValueError("amount must be >= 0")
+            base = stored if stored is not None else Stock(symbol=symbol)
+            self._stocks[symbol] = base.model_copy(update={"amount": amount})
+        return amount
+
+    def get_held(self) -> List[Stock]:
+        """
+        Get every stock with a positive amount.
+        """
+        return [stock for stock in self._stocks.values() if stock.amount > 0]
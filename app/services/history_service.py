@@ -0,0 +1,189 @@
+"""
+This module contains the daily price history of symbols: fetching date ranges from
+Polygon into the columnar history store, and serving slices with indicators.
+"""
+
+import asyncio
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core import http_client, market_calendar
+from app.core.config import get_settings
+from app.core.errors import ExternalAPIError
+from app.core.logging_config import get_logger
+from app.core.singleflight import SingleFlight
+from app.repositories.history_repo import COLUMNS, DAY, HistoryStore, PriceSeries
+from app.services import indicators
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+MS_PER_DAY = 86_400_000
+
+history_store: HistoryStore | None = None
+_updates = SingleFlight()
+
+
+def get_history_store() -> HistoryStore:
+    """
+    Get the process-wide history store, creating it on first use.
+    """
+    global history_store  # pylint: disable=global-statement
+    if history_store is None:
+        history_store = HistoryStore(settings.HISTORY_DIR)
+    return history_store
+
+
+def last_complete_day() -> date:
+    """
+    The latest trading session whose daily bar is final.
+    """
+    return market_calendar.last_session(settle=timedelta(minutes=settings.MARKET_SETTLE_MINUTES))
+
+
+async def fetch_polygon_range(symbol: str, start: date, end: date) -> Dict[str, np.ndarray]:
+    """
+    Fetch the daily bars of a symbol for a date range from Polygon.
+
+    Args:
+        symbol (str): The normalized stock symbol.
+        start (date): The first date, inclusive.
+        end (date): The last date, inclusive.
+
+    Raises:
+        ExternalAPIError: If the API call fails.
+
+    Returns:
+        Dict[str, np.ndarray]: The ``day``, ``open``, ``high``, ``low``, ``close`` and
+        ``volume`` columns, sorted by day.
+    """
+    logger.info("Fetching polygon history", symbol=symbol, start=str(start), end=str(end))
+    url = settings.POLYGON_RANGE_URL.format(
+        symbol=symbol, start=start.isoformat(), end=end.isoformat(), key=settings.POLYGON_API_KEY
+    )
+    r = await http_client.get(http_client.POLYGON, url)
+    if r.status_code != 200:
+        logger.error("Polygon API error", status_code=r.status_code, symbol=symbol)
+        raise ExternalAPIError(f"Polygon returned {r.status_code}")
+    data = r.json()
+    if data.get("status") not in ("OK", "DELAYED"):
+        raise ExternalAPIError("No history from Polygon")
+
+    results = data.get("results") or []
+    columns = {
+        DAY: np.fromiter((bar["t"] // MS_PER_DAY for bar in results), COLUMNS[DAY], len(results)),
+    }
+    for name, key in (("open", "o"), ("high", "h"), ("low", "l"), ("close", "c"), ("volume", "v")):
+        columns[name] = np.fromiter(
+            (bar.get(key, np.nan) for bar in results), COLUMNS[name], len(results)
+        )
+    order = np.argsort(columns[DAY], kind="stable")
+    return {name: column[order] for name, column in columns.items()}
+
+
+async def ensure_history(symbol: str, start: date, end: date) -> PriceSeries:
+    """
+    Make sure the store holds the bars of a symbol from ``start`` to ``end``.
+
+    Only the dates outside the range already fetched are requested, and concurrent
+    updates of the same symbol are coalesced into one. The range is fetched at most
+    once per call: recent days without a bar stay uncovered, and are requested again
+    by the next call rather than in a loop.
+
+    Args:
+        symbol (str): The normalized stock symbol.
+        start (date): The first date, inclusive.
+        end (date): The last date, inclusive.
+
+    Returns:
+        PriceSeries: The stored bars of the symbol.
+    """
+    store = get_history_store()
+    updated = False
+
+    async def update():
+        nonlocal updated
+        updated = True
+        await _update(symbol, start, end)
+
+    while True:
+        series = store.load(symbol)
+        if updated or end < start or series.covers(start, end):
+            return series
+        # A coalesced update may have been for another range; wait for one of ours.
+        await _updates.do(symbol, update)
+
+
+async def get_history(
+    symbol: str, start: Optional[date], end: Optional[date], indicator_specs: List[str]
+) -> Dict[str, Any]:
+    """
+    Get the daily bars of a symbol for a date range, with indicators.
+
+    The price columns are views into the store. Indicators are computed over the range
+    plus enough earlier bars for their windows, so their first values are complete.
+
+    Args:
+        symbol (str): The normalized stock symbol.
+        start (date, optional): The first date. Defaults to ``HISTORY_DEFAULT_DAYS``
+            before ``end``.
+        end (date, optional): The last date. Defaults to the last complete day.
+        indicator_specs (List[str]): Indicators such as ``sma_50`` or ``volatility_20``.
+
+    Raises:
+        ValueError: If the range or an indicator is invalid.
+
+    Returns:
+        Dict[str, Any]: The dates, the OHLCV columns and the indicators.
+    """
+    end = min(end or last_complete_day(), last_complete_day())
+    start = start or end - timedelta(days=settings.HISTORY_DEFAULT_DAYS)
+    if start > end:
+        raise ValueError("'from' must not be after 'to'")
+    if (end - start).days > settings.HISTORY_MAX_DAYS:
+        raise ValueError(f"At most {settings.HISTORY_MAX_DAYS} days per request")
+    parsed = indicators.parse_specs(indicator_specs)
+    window = indicators.lookback(parsed) if parsed else 0
+    # Trading days are about 5/7 of calendar days; a week more covers long holidays.
+    fetch_start = start - timedelta(days=window * 7 // 5 + 7) if window else start
+
+    series = await ensure_history(symbol, fetch_start, end)
+    lo, hi = series.bounds(start, end)
+    body: Dict[str, Any] = {
+        "symbol": symbol,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "count": hi - lo,
+        "dates": np.datetime_as_string(series.days[lo:hi], unit="D").tolist(),
+    }
+    for name in COLUMNS:
+        if name != DAY:
+            body[name] = series.columns[name][lo:hi]
+    if parsed:
+        first = max(0, lo - window)
+        values = indicators.compute(series.columns["close"][first:hi], parsed)
+        body["indicators"] = {spec: column[lo - first:] for spec, column in values.items()}
+    return body
+
+
+def _missing_ranges(series: PriceSeries, start: date, end: date) -> List[Tuple[date, date]]:
+    if series.covered is None:
+        return [(start, end)]
+    covered_from, covered_to = series.covered
+    ranges = []
+    # Ranges are extended to touch the covered one, so coverage stays contiguous.
+    if start < covered_from:
+        ranges.append((start, covered_from - timedelta(days=1)))
+    if end > covered_to:
+        ranges.append((covered_to + timedelta(days=1), end))
+    return ranges
+
+
+async def _update(symbol: str, start: date, end: date):
+    store = get_history_store()
+    for range_start, range_end in _missing_ranges(store.load(symbol), start, end):
+        bars = await fetch_polygon_range(symbol, range_start, range_end)
+        await asyncio.to_thread(store.write, symbol, bars, (range_start, range_end))
+        logger.info("History updated", symbol=symbol, bars=len(bars[DAY]), start=str(range_start))
@@ -0,0 +1,113 @@
+"""
+This module contains vectorized technical indicators over daily price columns.
+
+Every indicator returns an array aligned with its input, with NaN where there are not
+enough earlier values; rolling windows are computed from cumulative sums, so the cost
+does not depend on the window length.
+"""
+
+import re
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+
+_SPEC = re.compile(r"^(returns|log_returns|sma|volatility)(?:_(\d{1,4}))?$")
+
+
+def returns(close: np.ndarray) -> np.ndarray:
+    """
+    Simple daily returns.
+    """
+    out = np.full(len(close), np.nan)
+    if len(close) > 1:
+        out[1:] = close[1:] / close[:-1] - 1
+    return out
+
+
+def log_returns(close: np.ndarray) -> np.ndarray:
+    """
+    Logarithmic daily returns.
+    """
+    out = np.full(len(close), np.nan)
+    if len(close) > 1:
+        out[1:] = np.diff(np.log(close))
+    return out
+
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Simple moving average over ``window`` values.
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+
+def volatility(close: np.ndarray, window: int) -> np.ndarray:
+    """
+    Annualized rolling standard deviation of daily log returns over ``window`` days.
+    """
+    r = log_returns(close)
+    out = np.full(len(close), np.nan)
+    if len(close) > window:
+        x = r[1:]
+        s1 = np.cumsum(np.concatenate(([0.0], x)))
+        s2 = np.cumsum(np.concatenate(([0.0], x * x)))
+        n = window
+        mean = (s1[n:] - s1[:-n]) / n
+        var = ((s2[n:] - s2[:-n]) - n * mean * mean) / (n - 1)
+        out[n:] = np.sqrt(np.maximum(var, 0.0) * TRADING_DAYS_PER_YEAR)
+    return out
+
+
+_INDICATORS: Dict[str, Tuple[Callable[..., np.ndarray], int]] = {
+    # name: (function of close [, window], default window)
+    "returns": (lambda close, _: returns(close), 0),
+    "log_returns": (lambda close, _: log_returns(close), 0),
+    "sma": (sma, 20),
+    "volatility": (volatility, 20),
+}
+
+
+def parse_specs(specs: List[str]) -> List[Tuple[str, str, int]]:
+    """
+    Parse indicator specs such as ``sma_50`` or ``returns``.
+
+    Args:
+        specs (List[str]): The requested indicators.
+
+    Raises:
+        ValueError: If a spec is unknown or has a window below 2.
+
+    Returns:
+        List[Tuple[str, str, int]]: The spec, indicator name and window of each.
+    """
+    parsed = []
+    for spec in specs:
+        match = _SPEC.match(spec.strip().lower())
+        if match is None:
+            raise ValueError(f"Unknown indicator {spec!r}")
+        name = match.group(1)
+        window = int(match.group(2)) if match.group(2) else _INDICATORS[name][1]
+        if _INDICATORS[name][1] and window < 2:
+            raise ValueError(f"Window of {spec!r} must be at least 2")
+        parsed.append((spec.strip().lower(), name, window))
+    return parsed
+
+
+def lookback(parsed: List[Tuple[str, str, int]]) -> int:
+    """
+    The number of bars needed before the first output value of every indicator.
+    """
+    return max([window for _, _, window in parsed] + [1])
+
+
+def compute(close: np.ndarray, parsed: List[Tuple[str, str, int]]) -> Dict[str, np.ndarray]:
+    """
+    Compute parsed indicators over a close price column.
+    """
+    return {spec: _INDICATORS[name][0](close, window) for spec, name, window in parsed}
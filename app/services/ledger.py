@@ -0,0 +1,134 @@
+"""
+This module contains the position ledger that holds the amount owned of each stock.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Set, Tuple
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.repositories.base_repo import StockRepoProtocol
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+
+class PositionLedger:
+    """
+    Amounts held per symbol, kept apart from market data.
+
+    The repository is the source of truth: increments are applied there atomically, so
+    updates from the event loop, from worker threads and from other processes are all
+    counted. The ledger keeps the amounts it has seen in memory and serves reads from
+    there. An amount older than ``refresh_interval`` seconds is loaded again in a
+    worker thread, so changes made by other workers show up on later reads.
+    """
+
+    def __init__(self, refresh_interval: float = settings.POSITION_REFRESH_INTERVAL):
+        self._amounts: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._refresh_interval = refresh_interval
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._generation = 0
+        self.updates = 0
+
+    def get(self, symbol: str, repo: StockRepoProtocol) -> int:
+        """
+        Get the amount held of a symbol from memory.
+
+        On the event loop, an amount that is not loaded yet or is older than
+        ``refresh_interval`` is loaded in the background, and the known amount, or 0,
+        is returned meanwhile. Elsewhere it is loaded before returning.
+
+        Args:
+            symbol (str): The normalized stock symbol.
+            repo (StockRepoProtocol): The repository to load the amount from.
+
+        Returns:
+            int: The amount held.
+        """
+        cached = self._amounts.get(symbol)
+        if cached is not None and time.monotonic() - cached[1] < self._refresh_interval:
+            return cached[0]
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self._load(symbol, repo, self._generation)
+        if symbol not in self._refreshing:
+            self._refreshing.add(symbol)
+            task = asyncio.create_task(self._refresh(symbol, repo, self._generation))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return cached[0] if cached is not None else 0
+
+    def loaded(self, symbol: str, amount: int, loaded_at: float):
+        """
+        Record an amount read from the repository, unless a newer one is known.
+
+        Args:
+            symbol (str): The normalized stock symbol.
+            amount (int): The amount read.
+            loaded_at (float): The ``time.monotonic()`` time the read started at.
+        """
+        self._record(symbol, amount, loaded_at, self._generation)
+
+    def add(self, symbol: str, delta: int, repo: StockRepoProtocol) -> int:
+        """
+        Atomically change the amount held of a symbol in the repository.
+
+        Args:
+            symbol (str): The normalized stock symbol.
+            delta (int): The change in amount.
+            repo (StockRepoProtocol): The repository holding the amount.
+
+        Raises:
+            ValueError: If the amount would become negative.
+
+        Returns:
+            int: The new amount.
+        """
+        # Held across the write, so cached amounts never go back to an older result.
+        with self._lock:
+            amount = repo.add_amount(symbol, delta)
+            self._amounts[symbol] = (amount, time.monotonic())
+            self.updates += 1
+        return amount
+
+    def clear(self):
+        """
+        Forget the loaded amounts; they are loaded from the repository again on next use.
+        """
+        with self._lock:
+            self._amounts.clear()
+            self._refreshing.clear()
+            # Loads still running belong to the old generation and are dropped.
+            self._generation += 1
+
+    async def _refresh(self, symbol: str, repo: StockRepoProtocol, generation: int):
+        try:
+            await asyncio.to_thread(self._load, symbol, repo, generation)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Position refresh failed", symbol=symbol, error=str(exc))
+        finally:
+            if generation == self._generation:
+                self._refreshing.discard(symbol)
+
+    def _load(self, symbol: str, repo: StockRepoProtocol, generation: int) -> int:
+        loaded_at = time.monotonic()
+        stored = repo.get(symbol)
+        return self._record(symbol, stored.amount if stored is not None else 0, loaded_at, generation)
+
+    def _record(self, symbol: str, amount: int, loaded_at: float, generation: int) -> int:
+        with self._lock:
+            cached = self._amounts.get(symbol)
+            # An increment applied while the repository was read is newer; keep it.
+            if generation != self._generation or (cached is not None and cached[1] > loaded_at):
+                return cached[0] if cached is not None else amount
+            self._amounts[symbol] = (amount, loaded_at)
+        return amount
+
+
+ledger = PositionLedger()
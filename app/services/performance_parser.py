@@ -0,0 +1,225 @@
+"""
+This module contains an incremental parser for the MarketWatch performance table.
+"""
+
+import re
+import time
+from typing import AsyncIterable, Dict, Optional, Union
+
+from lxml import etree
+
+from app.core.metrics import PARSE_DURATION
+
+TABLE_CLASSES = {"element--table", "performance"}
+VALUE_CLASSES = ["content__item", "value", "ignore-color"]
+
+
+class PerformanceParser:
+    """
+    Incremental parser that extracts the performance table from a MarketWatch page.
+
+    Chunks of the page are fed as they arrive; ``feed`` returns True once the first
+    ``div.element--table.performance`` has closed, after which the rest of the page can be
+    discarded without being downloaded or parsed. Elements before the table are cleared as
+    soon as they close, so memory stays bounded by the table, not the page.
+    """
+
+    def __init__(self):
+        self._parser = etree.HTMLPullParser(events=("start", "end"))
+        self._table = None
+        self._result: Dict[str, str] = {}
+        self.done = False
+
+    def feed(self, data: Union[bytes, str]) -> bool:
+        """
+        Feed the next chunk of the page.
+
+        Args:
+            data (Union[bytes, str]): The next chunk of HTML.
+
+        Returns:
+            bool: True once the performance table has been fully parsed.
+        """
+        if not self.done:
+            self._parser.feed(data)
+            self._read_events()
+        return self.done
+
+    def close(self) -> Dict[str, str]:
+        """
+        Finish parsing and get the performance data.
+
+        Returns:
+            Dict[str, str]: The performance values, keyed by period label.
+        """
+        if not self.done:
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError:
+                # Raised for empty documents; there is no table to read then.
+                pass
+            self._read_events()
+            self.done = True
+        return self._result
+
+    def _read_events(self):
+        for event, elem in self._parser.read_events():
+            if self._table is None:
+                if event == "start" and elem.tag == "div" and TABLE_CLASSES <= _classes(elem):
+                    self._table = elem
+                elif event == "end":
+                    elem.clear()
+            elif event == "end":
+                if elem is self._table:
+                    self.done = True
+                    return
+                if elem.tag == "tr" and "table__row" in _classes(elem):
+                    self._read_row(elem)
+
+    def _read_row(self, row):
+        cells = [td for td in row.iter("td") if "table__cell" in _classes(td)]
+        if len(cells) != 2:
+            return
+        for li in cells[1].iter("li"):
+            if li.get("class", "").split() == VALUE_CLASSES:
+                self._result[_text(cells[0])] = _text(li)
+                return
+
+
+class PerformanceSlicer:
+    """
+    Cheap byte scanner that cuts the performance table out of a streamed page.
+
+    Only the ``div.element--table.performance`` markup is kept, so it can be handed to a
+    worker without sending the whole page. ``feed`` returns True once the div has closed.
+    """
+
+    # Tag and attribute names in any case, the class list in double or single quotes;
+    # class names are matched exactly, as the parser does.
+    _START = re.compile(
+        rb"<(?i:div)\b[^>]*\b(?i:class)\s*=\s*(?:"
+        rb'"(?=[^"]*\belement--table\b)(?=[^"]*\bperformance\b)[^"]*"'
+        rb"|'(?=[^']*\belement--table\b)(?=[^']*\bperformance\b)[^']*')"
+    )
+    _DIV = re.compile(rb"<(/?)div\b", re.IGNORECASE)
+    # Bytes kept while looking for the table, enough to hold an opening div tag.
+    _KEEP = 2048
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._started = False
+        self._pos = 0
+        self._depth = 0
+        self.slice: Optional[bytes] = None
+
+    def feed(self, data: bytes) -> bool:
+        """
+        Feed the next chunk of the page.
+
+        Args:
+            data (bytes): The next chunk of HTML.
+
+        Returns:
+            bool: True once the performance table has been cut out.
+        """
+        if self.slice is not None:
+            return True
+        self._buf += data
+        if not self._started:
+            match = self._START.search(self._buf)
+            if match is None:
+                del self._buf[:-self._KEEP]
+                return False
+            del self._buf[:match.start()]
+            self._started = True
+        for match in self._DIV.finditer(self._buf, self._pos):
+            self._depth += -1 if match.group(1) else 1
+            self._pos = match.end()
+            if self._depth == 0:
+                end = self._buf.find(b">", match.end())
+                if end < 0:
+                    self._pos = match.start()
+                    self._depth += 1
+                    break
+                self.slice = bytes(self._buf[:end + 1])
+                return True
+        return False
+
+    def close(self) -> Optional[bytes]:
+        """
+        Finish reading and get the table markup.
+
+        Returns:
+            Optional[bytes]: The markup of the performance table, what was read of it if
+            the page ended before it closed, or None if the page has no table.
+        """
+        if self.slice is None and self._started:
+            self.slice = bytes(self._buf)
+        return self.slice
+
+
+def _classes(elem) -> set:
+    return set(elem.get("class", "").split())
+
+
+def _text(elem) -> str:
+    return "".join(s.strip() for s in elem.itertext())
+
+
+def parse_performance(html: Union[bytes, str]) -> dict:
+    """
+    Parse the performance data from the MarketWatch HTML.
+
+    Args:
+        html (Union[bytes, str]): The HTML content of the MarketWatch page.
+
+    Returns:
+        dict: A dictionary containing the performance data.
+    """
+    parser = PerformanceParser()
+    parser.feed(html)
+    return parser.close()
+
+
+async def parse_performance_stream(chunks: AsyncIterable[bytes]) -> dict:
+    """
+    Parse the performance data from a streamed MarketWatch page, stopping early.
+
+    Iteration over ``chunks`` stops as soon as the performance table has closed.
+
+    Args:
+        chunks (AsyncIterable[bytes]): The page body, e.g. ``response.aiter_bytes()``.
+
+    Returns:
+        dict: A dictionary containing the performance data.
+    """
+    parser = PerformanceParser()
+    elapsed = 0.0
+    async for chunk in chunks:
+        started = time.perf_counter()
+        done = parser.feed(chunk)
+        elapsed += time.perf_counter() - started
+        if done:
+            break
+    started = time.perf_counter()
+    result = parser.close()
+    # Only the time spent in the parser counts, not the time waiting for chunks.
+    PARSE_DURATION.observe(elapsed + time.perf_counter() - started, "stream")
+    return result
+
+
+async def read_performance_slice(chunks: AsyncIterable[bytes]) -> Optional[bytes]:
+    """
+    Read a streamed MarketWatch page up to the end of the performance table.
+
+    Args:
+        chunks (AsyncIterable[bytes]): The page body, e.g. ``response.aiter_bytes()``.
+
+    Returns:
+        Optional[bytes]: The markup of the performance table, or None if the page has none.
+    """
+    slicer = PerformanceSlicer()
+    async for chunk in chunks:
+        if slicer.feed(chunk):
+            break
+    return slicer.close()
@@ -0,0 +1,222 @@
+"""
+This module contains the portfolio valuation of the held positions.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.serialization import RenderedJSON
+from app.models.stock import Stock
+from app.repositories.base_repo import StockRepoProtocol
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+
+class Portfolio:
+    """
+    Positions held, as parallel arrays of amount, price and value.
+
+    A change of one symbol's price or amount updates its row and the running totals in
+    constant time. Per-position exposure is derived with array math when the portfolio
+    is rendered, and the rendered body is reused until a position changes.
+
+    The day change of a position is its amount times the move from the open to the
+    close of the last session, since Polygon's open-close data has no previous close.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._index: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._amount = np.zeros(capacity)
+        self._close = np.zeros(capacity)
+        self._open = np.zeros(capacity)
+        self._value = np.zeros(capacity)
+        self._change = np.zeros(capacity)
+        self.total_value = 0.0
+        self.total_change = 0.0
+        self.version = 0
+        self._rendered: Optional[RenderedJSON] = None
+        self._rendered_version = -1
+
+    def __len__(self) -> int:
+        """
+        The number of symbols with a row, including closed positions.
+        """
+        return len(self._symbols)
+
+    def load(self, stocks: Iterable[Stock]):
+        """
+        Add the positions of stocks that have no row yet, in one vectorized pass.
+
+        Rows updated while the stocks were being read are newer and are kept.
+        """
+        stocks = [stock for stock in stocks if stock.symbol not in self._index]
+        if not stocks:
+            return
+        start = len(self._symbols)
+        end = start + len(stocks)
+        self._reserve(end)
+        rows = slice(start, end)
+        # One pass over the models; attribute access is the slow part.
+        columns = np.array([(s.amount, s.close, s.open) for s in stocks], dtype=float).reshape(-1, 3)
+        columns[:, 1] = np.nan_to_num(columns[:, 1])
+        columns[:, 2] = np.where(np.isnan(columns[:, 2]), columns[:, 1], columns[:, 2])
+        self._amount[rows], self._close[rows], self._open[rows] = columns.T
+        self._value[rows] = self._amount[rows] * self._close[rows]
+        self._change[rows] = self._amount[rows] * (self._close[rows] - self._open[rows])
+        for i, stock in enumerate(stocks, start):
+            self._index[stock.symbol] = i
+            self._symbols.append(stock.symbol)
+        self.total_value += float(self._value[rows].sum())
+        self.total_change += float(self._change[rows].sum())
+        self.version += 1
+
+    def update(self, stock: Stock):
+        """
+        Apply a new price or amount of one symbol, adjusting the totals by the difference.
+
+        A symbol without a row gets one even when nothing is held, so a position closed
+        while the portfolio is loading is not brought back by ``load``.
+        """
+        i = self._index.get(stock.symbol)
+        if i is None:
+            i = len(self._symbols)
+            self._reserve(i + 1)
+            self._index[stock.symbol] = i
+            self._symbols.append(stock.symbol)
+        close = _price(stock.close)
+        value = stock.amount * close
+        change = stock.amount * (close - _price(stock.open, stock.close))
+        self.total_value += value - self._value[i]
+        self.total_change += change - self._change[i]
+        self._amount[i], self._close[i], self._open[i] = stock.amount, close, _price(stock.open, stock.close)
+        self._value[i], self._change[i] = value, change
+        self.version += 1
+
+    def render(self) -> RenderedJSON:
+        """
+        Get the serialized valuation: totals, and the columns of every open position.
+        """
+        if self._rendered is not None and self._rendered_version == self.version:
+            return self._rendered
+        n = len(self._symbols)
+        held = np.flatnonzero(self._amount[:n] > 0)
+        value = self._value[held]
+        total = self.total_value
+        body: Dict[str, Any] = {
+            "total_value": round(total, 6),
+            "day_change": round(self.total_change, 6),
+            "day_change_pct": round(self.total_change / (total - self.total_change) * 100, 6)
+            if total != self.total_change else None,
+            "positions": len(held),
+            "symbols": [self._symbols[i] for i in held.tolist()],
+            "amount": self._amount[held],
+            "price": self._close[held],
+            "value": value,
+            "day_change_by_position": self._change[held],
+            "exposure": value / total if total else np.zeros(len(held)),
+        }
+        self._rendered = RenderedJSON.from_data(body)
+        self._rendered_version = self.version
+        return self._rendered
+
+    def _reserve(self, size: int):
+        capacity = len(self._amount)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("_amount", "_close", "_open", "_value", "_change"):
+            grown = np.zeros(capacity)
+            old = getattr(self, name)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+
+def _price(value: Optional[float], default: Optional[float] = None) -> float:
+    if value is not None:
+        return float(value)
+    return float(default) if default is not None else 0.0
+
+
+portfolio: Portfolio | None = None
+_loading: Optional[asyncio.Task] = None
+_loaded_at = 0.0
+# Changes observed while a load runs, applied on top of the loaded positions.
+_observed: Optional[Dict[str, Stock]] = None
+
+
+def observe(stock: Stock):
+    """
+    Record a changed price or amount of a stock in the portfolio, if it is loaded.
+    """
+    if portfolio is not None:
+        portfolio.update(stock)
+    if _observed is not None:
+        _observed[stock.symbol] = stock
+
+
+async def get_portfolio(repo: StockRepoProtocol) -> Portfolio:
+    """
+    Get the process-wide portfolio, loading the held positions on first use.
+
+    Once the positions are older than ``POSITION_REFRESH_INTERVAL`` seconds, they are
+    loaded again in the background, so changes made by other workers show up. The new
+    arrays are built in a worker thread, the changes observed meanwhile are applied on
+    top, and they replace the current ones, which are served until then.
+    """
+    global _loading, _loaded_at, _observed  # pylint: disable=global-statement
+    while True:
+        if _loading is None and (
+            portfolio is None or time.monotonic() - _loaded_at >= settings.POSITION_REFRESH_INTERVAL
+        ):
+            _loaded_at = time.monotonic()
+            _observed = {}
+            _loading = asyncio.ensure_future(_reload(repo))
+            _loading.add_done_callback(_log_failure)
+        if portfolio is not None:
+            return portfolio
+        # Loops if the portfolio was reset while loading.
+        await asyncio.shield(_loading)
+
+
+def reset_portfolio():
+    """
+    Drop the loaded portfolio; it is loaded from the repository again on next use.
+    """
+    global portfolio, _loading, _observed  # pylint: disable=global-statement
+    portfolio, _loading, _observed = None, None, None
+
+
+async def _reload(repo: StockRepoProtocol):
+    global portfolio, _loading, _observed  # pylint: disable=global-statement
+    task = asyncio.current_task()
+    try:
+        fresh = await asyncio.to_thread(_build, repo)
+    except Exception:
+        if _loading is task:
+            _loading, _observed = None, None
+        raise
+    # Dropped by reset_portfolio meanwhile.
+    if _loading is not task:
+        return
+    for stock in _observed.values():
+        fresh.update(stock)
+    portfolio, _loading, _observed = fresh, None, None
+
+
+def _build(repo: StockRepoProtocol) -> Portfolio:
+    fresh = Portfolio()
+    fresh.load(repo.get_held())
+    return fresh
+
+
+def _log_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Portfolio load failed", error=str(task.exception()))
@@ -0,0 +1,191 @@
+"""
+This module contains the background prefetcher that keeps hot symbols in the cache.
+"""
+
+import asyncio
+import heapq
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.rate_limit import BACKGROUND, priority
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+
+class AccessTracker:
+    """
+    Decaying per-symbol access counter.
+
+    ``record`` is a dict increment, cheap enough for the request path. Counts are scaled
+    by ``decay`` on every prefetch tick, so the hottest symbols follow recent traffic.
+    """
+
+    def __init__(self, decay: float = 0.5, max_symbols: int = 10_000):
+        self.decay_factor = decay
+        self.max_symbols = max_symbols
+        self._counts: Dict[str, float] = {}
+
+    def record(self, symbol: str):
+        """
+        Record one access to a symbol.
+        """
+        count = self._counts.get(symbol)
+        if count is not None:
+            self._counts[symbol] = count + 1
+        elif len(self._counts) < self.max_symbols:
+            self._counts[symbol] = 1
+
+    def hottest(self, n: int, min_count: float = 0) -> List[str]:
+        """
+        Get up to ``n`` symbols with the highest counts of at least ``min_count``.
+        """
+        top = heapq.nlargest(n, self._counts.items(), key=lambda item: item[1])
+        return [symbol for symbol, count in top if count >= min_count]
+
+    def decay(self):
+        """
+        Scale all counts down, forgetting symbols that are no longer accessed.
+        """
+        self._counts = {
+            symbol: count * self.decay_factor
+            for symbol, count in self._counts.items()
+            if count * self.decay_factor >= 0.1
+        }
+
+
+class Prefetcher:
+    """
+    Periodically refreshes the cached sources of hot and watchlisted symbols before
+    they expire.
+
+    Every ``interval`` seconds, the watchlist and the ``top_n`` most accessed symbols are
+    checked with ``expiring(symbol, lead_time)``, which returns the sources of the symbol
+    that expire within ``lead_time`` seconds. At most ``max_calls`` of those are
+    refreshed per tick with ``refresh(symbol, source)``, ``concurrency`` at a time, at
+    background priority.
+    """
+
+    def __init__(
+        self,
+        tracker: AccessTracker,
+        expiring: Callable[[str, float], List[str]],
+        refresh: Callable[[str, str], Awaitable[object]],
+        watchlist: Iterable[str] = (),
+        interval: float = 5.0,
+        lead_time: float = 15.0,
+        top_n: int = 50,
+        min_hits: float = 2,
+        concurrency: int = 4,
+        max_calls: int = 20,
+    ):
+        self.tracker = tracker
+        self._expiring = expiring
+        self._refresh = refresh
+        self.watchlist = list(watchlist)
+        self.interval = interval
+        self.lead_time = lead_time
+        self.top_n = top_n
+        self.min_hits = min_hits
+        self.max_calls = max_calls
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.deferred = 0
+
+    def start(self):
+        """
+        Start the prefetch loop in the background.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the prefetch loop.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def tick(self):
+        """
+        Refresh the sources that are about to expire, within the call budget.
+        """
+        self.ticks += 1
+        symbols = dict.fromkeys(self.watchlist + self.tracker.hottest(self.top_n, self.min_hits))
+        self.tracker.decay()
+
+        plan = [(symbol, source) for symbol in symbols for source in self._expiring(symbol, self.lead_time)]
+        self.deferred += max(0, len(plan) - self.max_calls)
+        with priority(BACKGROUND):
+            await asyncio.gather(*(self._refresh_one(symbol, source) for symbol, source in plan[:self.max_calls]))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the counters of the prefetcher.
+        """
+        return {"ticks": self.ticks, "refreshed": self.refreshed, "failed": self.failed, "deferred": self.deferred}
+
+    async def _refresh_one(self, symbol: str, source: str):
+        async with self._semaphore:
+            try:
+                await self._refresh(symbol, source)
+                self.refreshed += 1
+            except Exception as exc:  # pylint: disable=broad-except
+                self.failed += 1
+                logger.warning("Prefetch failed", symbol=symbol, source=source, error=str(exc))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error("Prefetch tick failed", error=str(exc))
+
+
+access_tracker = AccessTracker()
+prefetcher: Prefetcher | None = None
+
+
+def start_prefetcher():
+    """
+    Create and start the prefetcher from the settings, if it is enabled.
+    """
+    global prefetcher  # pylint: disable=global-statement
+    if not settings.PREFETCH_ENABLED:
+        return
+    # Imported here because the stock service records accesses with this module.
+    from app.services import stock_service  # pylint: disable=import-outside-toplevel
+
+    prefetcher = Prefetcher(
+        access_tracker,
+        stock_service.expiring_sources,
+        stock_service.refresh_source,
+        watchlist=[s.strip().upper() for s in settings.PREFETCH_WATCHLIST.split(",") if s.strip()],
+        interval=settings.PREFETCH_INTERVAL,
+        lead_time=settings.PREFETCH_LEAD_TIME,
+        top_n=settings.PREFETCH_TOP_N,
+        min_hits=settings.PREFETCH_MIN_HITS,
+        concurrency=settings.PREFETCH_CONCURRENCY,
+        max_calls=settings.PREFETCH_MAX_CALLS,
+    )
+    prefetcher.start()
+
+
+async def stop_prefetcher():
+    """
+    Stop the prefetcher, if it is running.
+    """
+    global prefetcher  # pylint: disable=global-statement
+    if prefetcher is not None:
+        await prefetcher.stop()
+        prefetcher = None
@@ -0,0 +1,184 @@
+"""
+This module fans out live stock quotes to streaming subscribers.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.dependencies.repo import get_repo
+from app.services.stock_service import get_stock
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+
+class Subscription:
+    """
+    A subscriber's view of a set of symbols.
+
+    Only the latest undelivered snapshot of each symbol is kept, so a slow consumer skips
+    intermediate updates instead of queueing them, and ``next`` returns only the fields
+    that changed since the consumer last received the symbol.
+    """
+
+    def __init__(self, symbols: Iterable[str]):
+        self.symbols = frozenset(symbols)
+        self._pending: Dict[str, dict] = {}
+        self._sent: Dict[str, dict] = {}
+        self._event = asyncio.Event()
+        self.coalesced = 0
+
+    def push(self, symbol: str, snapshot: dict):
+        """
+        Offer a new snapshot of a symbol, replacing one not yet delivered.
+        """
+        if symbol in self._pending:
+            self.coalesced += 1
+        self._pending[symbol] = snapshot
+        self._event.set()
+
+    async def next(self) -> Dict[str, dict]:
+        """
+        Wait for changes.
+
+        Returns:
+            Dict[str, dict]: The changed fields of each changed symbol.
+        """
+        while True:
+            await self._event.wait()
+            self._event.clear()
+            pending, self._pending = self._pending, {}
+            changes = {}
+            for symbol, snapshot in pending.items():
+                previous = self._sent.get(symbol, {})
+                changed = {k: v for k, v in snapshot.items() if k not in previous or previous[k] != v}
+                if changed:
+                    changes[symbol] = changed
+                    self._sent[symbol] = snapshot
+            if changes:
+                return changes
+
+
+class QuoteHub:
+    """
+    Runs one refresh loop per subscribed symbol and pushes changed snapshots to every
+    subscriber of the symbol.
+
+    A symbol's loop starts with its first subscriber and stops when its last subscriber
+    leaves, however many clients there are.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[dict]], interval: float):
+        self._fetch = fetch
+        self.interval = interval
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._loops: Dict[str, asyncio.Task] = {}
+        self._latest: Dict[str, dict] = {}
+
+    @property
+    def symbols(self) -> Set[str]:
+        """
+        The symbols that currently have a refresh loop.
+        """
+        return set(self._loops)
+
+    @asynccontextmanager
+    async def subscription(self, symbols: Iterable[str]) -> AsyncIterator[Subscription]:
+        """
+        Subscribe to a set of symbols for the duration of the context.
+        """
+        subscription = self.subscribe(symbols)
+        try:
+            yield subscription
+        finally:
+            self.unsubscribe(subscription)
+
+    def subscribe(self, symbols: Iterable[str]) -> Subscription:
+        """
+        Subscribe to a set of symbols, starting their refresh loops if needed.
+        """
+        subscription = Subscription(symbols)
+        for symbol in subscription.symbols:
+            self._subscribers.setdefault(symbol, set()).add(subscription)
+            if symbol in self._latest:
+                subscription.push(symbol, self._latest[symbol])
+            if symbol not in self._loops:
+                self._loops[symbol] = asyncio.create_task(self._poll(symbol))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """
+        Remove a subscription, stopping loops that no longer have subscribers.
+        """
+        for symbol in subscription.symbols:
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[symbol]
+                self._latest.pop(symbol, None)
+                loop = self._loops.pop(symbol, None)
+                if loop is not None:
+                    loop.cancel()
+
+    async def close(self):
+        """
+        Stop all refresh loops.
+        """
+        loops = list(self._loops.values())
+        self._loops.clear()
+        self._subscribers.clear()
+        self._latest.clear()
+        for loop in loops:
+            loop.cancel()
+        await asyncio.gather(*loops, return_exceptions=True)
+
+    async def _poll(self, symbol: str):
+        while True:
+            try:
+                snapshot = {**await self._fetch(symbol), "error": None}
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Quote refresh failed", symbol=symbol, error=str(exc))
+                snapshot = {**self._latest.get(symbol, {}), "error": getattr(exc, "detail", str(exc))}
+            if snapshot != self._latest.get(symbol):
+                self._latest[symbol] = snapshot
+                for subscription in self._subscribers.get(symbol, ()):
+                    subscription.push(symbol, snapshot)
+            await asyncio.sleep(self.interval)
+
+
+async def fetch_quote(symbol: str) -> dict:
+    """
+    Get the current stock data of a symbol as a JSON-compatible snapshot.
+    """
+    stock = await get_stock(symbol, get_repo())
+    return stock.model_dump(mode="json")
+
+
+quote_hub: Optional[QuoteHub] = None
+
+
+def get_quote_hub() -> QuoteHub:
+    """
+    Get the process-wide quote hub, creating it on first use.
+    """
+    global quote_hub  # pylint: disable=global-statement
+    if quote_hub is None:
+        quote_hub = QuoteHub(fetch_quote, settings.STREAM_INTERVAL)
+    return quote_hub
+
+
+async def close_quote_hub():
+    """
+    Stop the refresh loops of the quote hub.
+    """
+    global quote_hub  # pylint: disable=global-statement
+    if quote_hub is not None:
+        await quote_hub.close()
+        quote_hub = None
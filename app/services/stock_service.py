@@ -2,26 +2,107 @@
 This module contains the business logic for fetching and managing stock data.
 """
 import asyncio
-from typing import Dict
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
 from datetime import date, timedelta
 
 import cachetools
-from bs4 import BeautifulSoup
+import httpx
 from fastapi import Depends
 
+from app.core.cache import SWRCache
+from app.core.cache_backends import CacheEntry, create_cache_backend
 from app.core.config import get_settings
-from app.core.errors import ExternalAPIError
-from app.core.http_client import get_client
+from app.core import market_calendar
+from app.core.errors import DeadlineExceededError, ExternalAPIError, NoDataError, UpstreamUnavailableError
+from app.core.executor import get_parse_executor
+from app.core import http_client
+from app.core.http_cache import parse_cache_control
 from app.core.logging_config import get_logger
-from app.models.stock import Stock
+from app.core.metrics import UPSTREAM_DEADLINE_MISSES
+from app.core.rate_limit import BACKGROUND, priority
+from app.core.serialization import RenderedJSON, dumps
+from app.models.stock import QuoteSnapshot, Stock
 from app.dependencies.repo import get_repo
 from app.repositories.base_repo import StockRepoProtocol
+from app.services import portfolio
+from app.services.ledger import ledger
+from app.services.prefetch import access_tracker
+from app.services.performance_parser import (
+    parse_performance,
+    parse_performance_stream,
+    read_performance_slice,
+)
 
 settings = get_settings()
-_cache = cachetools.TTLCache(maxsize=1024, ttl=settings.CACHE_TTL)
+# Polygon open-close data changes once a day, the MarketWatch performance table more often.
+# Symbols an upstream has no data for are remembered briefly, so they cost no calls.
+polygon_cache = SWRCache(
+    "polygon",
+    settings.POLYGON_CACHE_TTL,
+    settings.POLYGON_CACHE_STALE_TTL,
+    backend=create_cache_backend("polygon", settings.CACHE_MAXSIZE, settings.POLYGON_CACHE_TTL),
+    serve_expired_on=(UpstreamUnavailableError,),
+    negative_ttl=settings.NEGATIVE_CACHE_TTL,
+    negative_on=(NoDataError,),
+)
+# Grouped-daily bars lack the pre-market and after-hours prices, so they are kept apart
+# from the open-close results that single-stock requests use.
+polygon_grouped_cache = SWRCache(
+    "polygon_grouped",
+    settings.POLYGON_CACHE_TTL,
+    settings.POLYGON_CACHE_STALE_TTL,
+    backend=create_cache_backend("polygon_grouped", settings.CACHE_MAXSIZE, settings.POLYGON_CACHE_TTL),
+    serve_expired_on=(UpstreamUnavailableError,),
+)
+marketwatch_cache = SWRCache(
+    "marketwatch",
+    settings.CACHE_TTL,
+    settings.CACHE_STALE_TTL,
+    backend=create_cache_backend("marketwatch", settings.CACHE_MAXSIZE, settings.CACHE_TTL),
+    serve_expired_on=(UpstreamUnavailableError,),
+    negative_ttl=settings.NEGATIVE_CACHE_TTL,
+    negative_on=(NoDataError,),
+)
+
+# MarketWatch pages are parsed while they stream, so the HTTP cache never holds them.
+# The parsed table is kept with the page validators, so an unchanged page costs a 304.
+marketwatch_pages = create_cache_backend("marketwatch_pages", settings.CACHE_MAXSIZE, settings.CACHE_TTL)
+
+
+# The stock fields each upstream source provides, by the name used in ``include=``.
+SOURCE_FIELDS = {
+    "prices": ("afterHours", "close", "from_date", "high", "low", "open", "preMarket", "status", "volume"),
+    "performance": ("performance",),
+}
+ALL_SOURCES = frozenset(SOURCE_FIELDS)
+
+
+@dataclass
+class _StockEntry:
+    """
+    The market data of a symbol, the upstream results it was built from, and the last
+    stock view built from it with its serialized form.
+
+    A source without a result yet is None; its fields keep their last known values
+    until a request that includes it fills them in. ``requested`` holds the sources
+    that requests for the symbol have asked for so far, whether they answered or not.
+    """
+
+    snapshot: QuoteSnapshot
+    sources: Tuple[Optional[Dict], Optional[Dict]]
+    view: Optional[Stock] = None
+    rendered: Optional[RenderedJSON] = None
+    requested: FrozenSet[str] = frozenset()
+
+
+_stocks = cachetools.LRUCache(maxsize=settings.CACHE_MAXSIZE)
 
 POLYGON_URL = settings.POLYGON_URL
 MWATCH_URL = settings.MWATCH_URL
+POLYGON_GROUPED_URL = settings.POLYGON_GROUPED_URL
 
 logger = get_logger(__name__)
 
@@ -34,104 +115,136 @@ async def fetch_polygon(symbol: str) -> Stock:
         symbol (str): The stock symbol.
 
     Raises:
+        NoDataError: If Polygon has no data for the symbol on the last trading session.
         ExternalAPIError: If the API call fails.
 
     Returns:
         Stock: A dictionary containing the stock data from Polygon.
     """
     logger.info("Fetching polygon data", symbol=symbol)
-    last_trade_date = date.today() - timedelta(days=1)
+    last_trade_date = _last_trade_date()
     url = POLYGON_URL.format(symbol=symbol.upper(), key=settings.POLYGON_API_KEY, last_trade_day=last_trade_date.strftime("%Y-%m-%d"))
-    client = get_client()
-    r = await client.get(url)
+    r = await http_client.get(http_client.POLYGON, url)
+    if r.status_code == 404:
+        logger.warning("No data from Polygon", symbol=symbol, date=str(last_trade_date))
+        raise NoDataError("No data from Polygon")
     if r.status_code != 200:
         logger.error("Polygon API error", status_code=r.status_code, url=url)
         raise ExternalAPIError(f"Polygon returned {r.status_code}")
     data = r.json()
     if data.get("status") != "OK":
-        logger.warning("No data from Polygon", symbol=symbol)
-        raise ExternalAPIError("No data from Polygon")
+        logger.warning("No data from Polygon", symbol=symbol, date=str(last_trade_date))
+        raise NoDataError("No data from Polygon")
 
     logger.info("Polygon data fetched", symbol=symbol, result=data)
 
-    def to_float(val):
-        try:
-            return float(val) if val is not None else None
-        except (ValueError, TypeError):
-            return None
-
-    def to_int(val):
-        try:
-            return int(val) if val is not None else None
-        except (ValueError, TypeError):
-            return None
-
-    def to_date(val):
-        try:
-            return date.fromisoformat(val) if val else None
-        except (ValueError, TypeError):
-            return None
-
     return {
-        "afterHours": to_float(data.get("afterHours")),
-        "close": to_float(data.get("close")),
-        "from_date": to_date(data.get("from")),
-        "high": to_float(data.get("high")),
-        "low": to_float(data.get("low")),
-        "open": to_float(data.get("open")),
-        "preMarket": to_float(data.get("preMarket")),
+        "afterHours": _to_float(data.get("afterHours")),
+        "close": _to_float(data.get("close")),
+        "from_date": _to_date(data.get("from")),
+        "high": _to_float(data.get("high")),
+        "low": _to_float(data.get("low")),
+        "open": _to_float(data.get("open")),
+        "preMarket": _to_float(data.get("preMarket")),
         "status": data.get("status"),
-        "volume": to_int(data.get("volume")),
+        "volume": _to_int(data.get("volume")),
     }
 
-async def parse_html_async(html: str):
-    """
-    Parse the performance data from the MarketWatch HTML.
-    """
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, parse_performance, html)
 
-def parse_performance(html: str) -> dict:
+async def fetch_polygon_grouped(symbols: List[str]) -> Dict[str, Dict]:
     """
-    Parse the performance data from the MarketWatch HTML.
+    Fetch daily bars for many symbols with one Polygon grouped-daily call.
+
+    The grouped-daily endpoint returns the whole market for a day, so the cost does not
+    grow with the number of symbols. It carries no pre-market or after-hours prices, so
+    those fields are left out of the results rather than set to None.
 
     Args:
-        html (str): The HTML content of the MarketWatch page.
+        symbols (List[str]): The normalized stock symbols.
+
+    Raises:
+        ExternalAPIError: If the API call fails.
 
     Returns:
-        dict: A dictionary containing the performance data.
+        Dict[str, Dict]: The Polygon data of each symbol found, keyed by symbol.
     """
-    soup = BeautifulSoup(html, "lxml")
-    perf = {}
-
-    # Search for Performance
-    table_container = soup.select_one("div.element--table.performance")
-    if not table_container:
-        return perf
+    logger.info("Fetching polygon grouped data", symbols=len(symbols))
+    last_trade_date = _last_trade_date()
+    url = POLYGON_GROUPED_URL.format(
+        key=settings.POLYGON_API_KEY, last_trade_day=last_trade_date.strftime("%Y-%m-%d")
+    )
+    r = await http_client.get(http_client.POLYGON, url)
+    if r.status_code != 200:
+        logger.error("Polygon API error", status_code=r.status_code, url=url)
+        raise ExternalAPIError(f"Polygon returned {r.status_code}")
+    data = r.json()
+    if data.get("status") != "OK":
+        logger.warning("No grouped data from Polygon", date=str(last_trade_date))
+        raise ExternalAPIError("No data from Polygon")
 
-    # Iterate over the rows in the table
-    rows = table_container.find_all("tr", class_="table__row")
-    for row in rows:
-        cells = row.find_all("td", class_="table__cell")
-        if len(cells) != 2:
+    wanted = set(symbols)
+    results = {}
+    for bar in data.get("results") or []:
+        symbol = bar.get("T")
+        if symbol not in wanted:
             continue
-        label = cells[0].get_text(strip=True)
-        value_elem = cells[1].find("li", class_="content__item value ignore-color")
-        if value_elem:
-            value = value_elem.get_text(strip=True)
-            perf[label] = value
+        results[symbol] = {
+            "close": _to_float(bar.get("c")),
+            "from_date": last_trade_date,
+            "high": _to_float(bar.get("h")),
+            "low": _to_float(bar.get("l")),
+            "open": _to_float(bar.get("o")),
+            "status": "OK",
+            "volume": _to_int(bar.get("v")),
+        }
+    logger.info("Polygon grouped data fetched", requested=len(symbols), found=len(results))
+    return results
+
+
+def _last_trade_date() -> date:
+    return market_calendar.last_session(settle=timedelta(minutes=settings.MARKET_SETTLE_MINUTES))
+
+
+def _to_float(val):
+    try:
+        return float(val) if val is not None else None
+    except (ValueError, TypeError):
+        return None
+
 
-    return perf
+def _to_int(val):
+    try:
+        return int(val) if val is not None else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _to_date(val):
+    try:
+        return date.fromisoformat(val) if val else None
+    except (ValueError, TypeError):
+        return None
+
+
+async def parse_html_async(html: str):
+    """
+    Parse the performance data from the MarketWatch HTML with the parse executor.
+    """
+    return await get_parse_executor().run(parse_performance, html)
 
 
 async def fetch_marketwatch(symbol: str) -> Dict:
     """
     Fetch stock performance data from MarketWatch.
 
+    A page fetched before is requested with its ``ETag`` and ``Last-Modified``
+    validators; when it has not changed, the table parsed from it then is returned.
+
     Args:
         symbol (str): The stock symbol.
 
     Raises:
+        NoDataError: If MarketWatch has no page for the symbol.
         ExternalAPIError: If the API call fails.
 
     Returns:
@@ -147,47 +260,560 @@ async def fetch_marketwatch(symbol: str) -> Dict:
         ),
         "Accept-Language": "en-US,en;q=0.9",
     }
-    client = get_client()
-    r = await client.get(url, headers=headers)
-    if r.status_code != 200:
-        logger.error("Marketwatch API error", status_code=r.status_code, url=url)
-        raise ExternalAPIError(f"Marketwatch returned {r.status_code}")
-    html = r.text
-    performance = await parse_html_async(html)
+    page = await marketwatch_pages.get_async(url)
+    if page is not None:
+        if page.value["etag"] is not None:
+            headers["If-None-Match"] = page.value["etag"]
+        if page.value["last_modified"] is not None:
+            headers["If-Modified-Since"] = page.value["last_modified"]
+    # Stream the page and stop reading once the performance table has been parsed.
+    async with http_client.stream(http_client.MARKETWATCH, url, headers=headers) as r:
+        if r.status_code == 304 and page is not None:
+            logger.info("Marketwatch page not modified", symbol=symbol)
+            return {"performance": page.value["performance"]}
+        if r.status_code == 404:
+            raise NoDataError("No data from Marketwatch")
+        if r.status_code != 200:
+            logger.error("Marketwatch API error", status_code=r.status_code, url=url)
+            raise ExternalAPIError(f"Marketwatch returned {r.status_code}")
+        executor = get_parse_executor()
+        if executor.inline:
+            performance = await parse_performance_stream(r.aiter_bytes())
+        else:
+            # Only the table markup is sent to the worker, not the whole page.
+            table = await read_performance_slice(r.aiter_bytes())
+            html = table.decode(r.encoding or "utf-8", errors="replace") if table else ""
+            performance = await parse_html_async(html) if html else {}
+    etag, last_modified = r.headers.get("etag"), r.headers.get("last-modified")
+    if (etag or last_modified) and "no-store" not in parse_cache_control(r.headers.get("cache-control")):
+        await marketwatch_pages.set_async(
+            url, CacheEntry({"etag": etag, "last_modified": last_modified, "performance": performance}, time.time())
+        )
     logger.info("Marketwatch data fetched", symbol=symbol, performance=performance)
     return {"performance": performance}
 
 
-async def get_stock(symbol: str, repo: StockRepoProtocol = Depends(get_repo)) -> Stock:
+def normalize_symbol(symbol: str) -> str:
+    """
+    Normalize a ticker symbol for use as a cache and repository key.
+
+    Args:
+        symbol (str): The raw stock symbol.
+
+    Returns:
+        str: The stripped, upper-cased symbol.
+    """
+    return symbol.strip().upper()
+
+
+def select_sources(
+    include: Optional[Iterable[str]] = None, fields: Optional[Iterable[str]] = None
+) -> Tuple[FrozenSet[str], Optional[List[str]]]:
+    """
+    Work out which upstream sources a request needs, and which fields it returns.
+
+    Args:
+        include (Iterable[str], optional): Source names from ``SOURCE_FIELDS``. Defaults
+            to the sources of ``fields``, or all sources.
+        fields (Iterable[str], optional): Stock fields to return. Defaults to all fields.
+
+    Raises:
+        ValueError: If a source or field name is unknown, or ``include`` names none.
+
+    Returns:
+        Tuple[FrozenSet[str], Optional[List[str]]]: The sources to fetch, and the fields
+        to return with ``symbol`` first, or None for the whole stock.
+    """
+    sources = set()
+    for name in include or ():
+        if name not in SOURCE_FIELDS:
+            raise ValueError(f"Unknown source '{name}', expected one of: {', '.join(SOURCE_FIELDS)}")
+        sources.add(name)
+    if include is not None and not sources:
+        raise ValueError(f"No source to include, expected some of: {', '.join(SOURCE_FIELDS)}")
+    if fields is None:
+        return frozenset(sources) if include is not None else ALL_SOURCES, None
+
+    selected = ["symbol"]
+    for field in fields:
+        if field not in Stock.model_fields:
+            raise ValueError(f"Unknown field '{field}'")
+        if field not in selected:
+            selected.append(field)
+        sources.update(name for name, provided in SOURCE_FIELDS.items() if field in provided)
+    return frozenset(sources), selected
+
+
+async def get_stock(
+    symbol: str, repo: StockRepoProtocol = Depends(get_repo), sources: FrozenSet[str] = ALL_SOURCES
+) -> Stock:
     """
     Get stock data from cache or by fetching from external APIs.
 
+    Polygon and MarketWatch results are cached separately; concurrent misses for the
+    same symbol are coalesced into one shared fetch per source. Sources that are not
+    requested are never fetched: their cached results are used if there are any, and
+    their fields keep the last known values otherwise.
+
     Args:
         symbol (str): The stock symbol.
+        sources (FrozenSet[str]): The sources to fetch, from ``SOURCE_FIELDS``.
 
     Returns:
         Stock: The stock object.
     """
-    if symbol in _cache:
-        return _cache[symbol]
+    stock, _ = await get_partial_stock(symbol, repo, sources)
+    return stock
 
-    polygon_coro = fetch_polygon(symbol)
-    mw_coro = fetch_marketwatch(symbol)
-    polygon_data, perf_data = await asyncio.gather(polygon_coro, mw_coro)
 
-    stock = repo.get(symbol) or Stock(symbol=symbol.upper())
-    for k, v in polygon_data.items():
-        setattr(stock, k, v)
-    stock.performance_dict = perf_data.get("performance", {})
+async def get_partial_stock(
+    symbol: str, repo: StockRepoProtocol, sources: FrozenSet[str] = ALL_SOURCES, budget: Optional[float] = None
+) -> Tuple[Stock, Dict[str, Optional[Exception]]]:
+    """
+    Get stock data as ``get_stock`` does, waiting at most ``budget`` seconds for the
+    upstreams.
 
-    _cache[symbol] = stock
-    return stock
+    Sources that have not answered when the budget runs out are left out of the result
+    and keep being fetched in the background, so their results reach the cache for
+    later requests. Sources that failed are left out the same way, with their errors.
+
+    Args:
+        symbol (str): The stock symbol.
+        repo (StockRepoProtocol): The stock repository.
+        sources (FrozenSet[str]): The sources to fetch, from ``SOURCE_FIELDS``.
+        budget (float, optional): Seconds to wait for the upstreams. Defaults to no limit.
+
+    Raises:
+        ExternalAPIError: If none of the requested sources answered: the first error,
+            or ``DeadlineExceededError`` if none failed but none answered in time.
+
+    Returns:
+        Tuple[Stock, Dict[str, Optional[Exception]]]: The stock, and the sources missing
+        from it with their errors, None for those that did not answer in time.
+    """
+    symbol = normalize_symbol(symbol)
+    access_tracker.record(symbol)
+
+    polygon = _lookup(polygon_cache, symbol, fetch_polygon, "prices" in sources)
+    marketwatch = _lookup(marketwatch_cache, symbol, fetch_marketwatch, "performance" in sources)
+    await _wait_within([polygon, marketwatch], budget)
+    (polygon_data, perf_data), missing = _settle({"prices": polygon, "performance": marketwatch})
+    error = _unavailable(missing, sources)
+    if error is not None:
+        raise error
+    stored = await _load_stored([symbol], repo)
+    return _merge_stock(symbol, polygon_data, perf_data, stored.get(symbol), repo, sources), missing
+
+
+def _lookup(cache: SWRCache, symbol: str, fetch, wanted: bool) -> asyncio.Future:
+    if wanted:
+        return asyncio.ensure_future(cache.get(symbol, fetch))
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(cache.peek(symbol))
+    return future
+
+
+async def _wait_within(futures: Iterable[asyncio.Future], budget: Optional[float]):
+    """
+    Wait for upstream lookups until they are done or the budget runs out.
+
+    Lookups still running afterwards are not cancelled: they finish in the background
+    and store their results in the cache.
+    """
+    futures = [future for future in futures if not future.done()]
+    if not futures:
+        return
+    _, pending = await asyncio.wait(futures, timeout=budget)
+    for future in pending:
+        future.add_done_callback(_finished_late)
+
+
+def _finished_late(future: asyncio.Future):
+    # Errors are stored in the negative cache or logged by the cache already.
+    if not future.cancelled():
+        future.exception()
+
+
+def _settle(lookups: Dict[str, asyncio.Future]) -> Tuple[List[Optional[Dict]], Dict[str, Optional[Exception]]]:
+    """
+    Get the results of lookups keyed by source, None for those still running or failed,
+    and those sources with their errors, None for the ones still running.
+
+    Upstream errors are results of the batch lookups and raised by the others; both are
+    treated alike.
+
+    Raises:
+        Exception: An error of a lookup that is not an upstream error.
+    """
+    results, missing = [], {}
+    for source, future in lookups.items():
+        if not future.done():
+            UPSTREAM_DEADLINE_MISSES.inc(source)
+            results.append(None)
+            missing[source] = None
+            continue
+        result = future.exception() or future.result()
+        if isinstance(result, (ExternalAPIError, httpx.HTTPError)):
+            results.append(None)
+            missing[source] = result
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            results.append(result)
+    return results, missing
+
+
+def _unavailable(missing: Dict[str, Optional[Exception]], sources: FrozenSet[str]) -> Optional[Exception]:
+    """
+    Get the error to report when none of the requested sources answered, or None.
+    """
+    if not missing or len(missing) < len(sources):
+        return None
+    return next((error for error in missing.values() if error is not None), None) or DeadlineExceededError()
+
+
+async def get_stocks(
+    symbols: List[str], repo: StockRepoProtocol, sources: FrozenSet[str] = ALL_SOURCES
+) -> Dict[str, Union[Stock, Exception]]:
+    """
+    Get stock data for many symbols in one pass.
+
+    Cached data is used first. Polygon misses are fetched with one grouped-daily call
+    when there are at least ``BATCH_GROUPED_MIN`` of them; its bars are cached apart
+    from the open-close results, which they would strip of the pre-market and
+    after-hours prices. MarketWatch misses are
+    fetched with at most ``BATCH_CONCURRENCY`` scrapes running at once. Upstream calls
+    of a batch queue behind interactive requests at the rate limiters. Sources that
+    are not requested are taken from the cache only, as in ``get_stock``.
+
+    Args:
+        symbols (List[str]): The stock symbols.
+        repo (StockRepoProtocol): The stock repository.
+        sources (FrozenSet[str]): The sources to fetch, from ``SOURCE_FIELDS``.
+
+    Returns:
+        Dict[str, Union[Stock, Exception]]: The stock, or the error that prevented
+        fetching it, for each normalized symbol in request order.
+    """
+    results, _ = await get_partial_stocks(symbols, repo, sources)
+    return results
+
+
+async def get_partial_stocks(
+    symbols: List[str], repo: StockRepoProtocol, sources: FrozenSet[str] = ALL_SOURCES, budget: Optional[float] = None
+) -> Tuple[Dict[str, Union[Stock, Exception]], Dict[str, Dict[str, Optional[Exception]]]]:
+    """
+    Get stock data for many symbols as ``get_stocks`` does, waiting at most ``budget``
+    seconds for the upstreams.
+
+    As in ``get_partial_stock``, sources that failed or have not answered in time are
+    left out, and the latter finish in the background; a symbol with none of its
+    sources is reported with the first error, or as a ``DeadlineExceededError``.
+
+    Returns:
+        Tuple[Dict[str, Union[Stock, Exception]], Dict[str, Dict[str, Optional[Exception]]]]:
+        The stock or error of each symbol, and the sources missing from the stocks that
+        lack any, with their errors.
+    """
+    symbols = list(dict.fromkeys(normalize_symbol(s) for s in symbols if s.strip()))
+    with priority(BACKGROUND):
+        return await _get_stocks(symbols, repo, sources, budget)
+
+
+async def _get_stocks(
+    symbols: List[str], repo: StockRepoProtocol, sources: FrozenSet[str], budget: Optional[float]
+) -> Tuple[Dict[str, Union[Stock, Exception]], Dict[str, Dict[str, Optional[Exception]]]]:
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def fetch_one(symbol, cache, fetch):
+        async with semaphore:
+            try:
+                return await cache.get(symbol, fetch)
+            except (ExternalAPIError, httpx.HTTPError) as exc:
+                return exc
+
+    async def fetch_grouped(missing):
+        try:
+            found = await polygon_grouped_cache.get_many(missing, fetch_polygon_grouped)
+        except (ExternalAPIError, httpx.HTTPError) as exc:
+            return {s: exc for s in missing}
+        return {s: found.get(s, NoDataError("No data from Polygon")) for s in missing}
+
+    async def grouped_result(grouped, symbol):
+        return (await grouped)[symbol]
+
+    def polygon_lookups():
+        if "prices" not in sources:
+            return [_lookup(polygon_cache, s, fetch_polygon, False) for s in symbols]
+        missing = [s for s in symbols if s not in polygon_cache]
+        if len(missing) < settings.BATCH_GROUPED_MIN:
+            return [asyncio.ensure_future(fetch_one(s, polygon_cache, fetch_polygon)) for s in symbols]
+        # Symbols with open-close results cached keep them; the others share one call.
+        grouped, in_group = asyncio.ensure_future(fetch_grouped(missing)), set(missing)
+        return [
+            asyncio.ensure_future(
+                grouped_result(grouped, s) if s in in_group else fetch_one(s, polygon_cache, fetch_polygon)
+            )
+            for s in symbols
+        ]
+
+    def marketwatch_lookups():
+        if "performance" not in sources:
+            return [_lookup(marketwatch_cache, s, fetch_marketwatch, False) for s in symbols]
+        return [asyncio.ensure_future(fetch_one(s, marketwatch_cache, fetch_marketwatch)) for s in symbols]
+
+    polygon_futures, mw_futures = polygon_lookups(), marketwatch_lookups()
+    await _wait_within(polygon_futures + mw_futures, budget)
+
+    settled = {}
+    for symbol, polygon, marketwatch in zip(symbols, polygon_futures, mw_futures):
+        settled[symbol] = _settle({"prices": polygon, "performance": marketwatch})
+    stored = await _load_stored(symbols, repo)
+
+    results, missing_sources = {}, {}
+    for symbol, ((polygon_data, perf_data), missing) in settled.items():
+        error = _unavailable(missing, sources)
+        if error is not None:
+            results[symbol] = error
+        else:
+            results[symbol] = _merge_stock(symbol, polygon_data, perf_data, stored.get(symbol), repo, sources)
+            if missing:
+                missing_sources[symbol] = missing
+    return results, missing_sources
+
+
+async def _load_stored(symbols: Iterable[str], repo: StockRepoProtocol) -> Dict[str, Stock]:
+    """
+    Read the stored stocks of the symbols without an entry in a worker thread, and
+    hand their amounts to the ledger, so building their views reads none.
+    """
+    unseen = [symbol for symbol in symbols if symbol not in _stocks]
+    if not unseen:
+        return {}
+    loaded_at = time.monotonic()
+    stored = await asyncio.to_thread(repo.get_many, unseen)
+    for symbol in unseen:
+        ledger.loaded(symbol, stored[symbol].amount if symbol in stored else 0, loaded_at)
+    return stored
+
+
+def _merge_stock(
+    symbol: str,
+    polygon_data: Optional[Dict],
+    perf_data: Optional[Dict],
+    stored: Optional[Stock],
+    repo: StockRepoProtocol,
+    requested: FrozenSet[str] = ALL_SOURCES,
+) -> Stock:
+    """
+    Apply fetched upstream data to the market data of a symbol, and get its stock view.
+
+    A source given as None, because it was not requested or did not answer, leaves its
+    fields and its last result as they are. ``stored`` is the stock in the repository,
+    read by the caller off the event loop; it is the base of a symbol without an entry.
+    A symbol that is neither stored nor has any upstream data yet, as with
+    ``fields=amount``, gets an empty stock that is not saved.
+    """
+    entry = _stocks.get(symbol)
+    if entry is not None:
+        polygon_data = entry.sources[0] if polygon_data is None else polygon_data
+        perf_data = entry.sources[1] if perf_data is None else perf_data
+        requested = requested | entry.requested
+    if entry is None or entry.sources[0] is not polygon_data or entry.sources[1] is not perf_data:
+        if entry is not None:
+            base = entry.snapshot
+        else:
+            if stored is None and polygon_data is None and perf_data is None:
+                return Stock(symbol=symbol)
+            base = QuoteSnapshot.from_stock(stored) if stored is not None else QuoteSnapshot(symbol=symbol)
+        snapshot = apply_sources(base, polygon_data, perf_data)
+        entry = _stocks[symbol] = _StockEntry(snapshot, (polygon_data, perf_data), requested=requested)
+        return _stock_view(entry, repo, persist=True)
+    # Same cached upstream results as last time: only the amount can have changed.
+    entry.requested = requested
+    return _stock_view(entry, repo)
+
+
+def apply_sources(base: QuoteSnapshot, polygon_data: Optional[Dict], perf_data: Optional[Dict]) -> QuoteSnapshot:
+    """
+    Get market data updated with the results of ``fetch_polygon`` and ``fetch_marketwatch``.
+
+    A Polygon result for another session than the market data's replaces all prices:
+    those it does not carry, such as the pre-market and after-hours prices missing
+    from grouped-daily bars, are cleared rather than kept from the earlier session.
+
+    Args:
+        base (QuoteSnapshot): The current market data of the symbol.
+        polygon_data (Dict, optional): The Polygon result, or None to keep the prices.
+        perf_data (Dict, optional): The MarketWatch result, or None to keep the performance.
+
+    Returns:
+        QuoteSnapshot: The updated market data.
+    """
+    update = dict(polygon_data or {})
+    if "from_date" in update and update["from_date"] != base.from_date:
+        update.update((name, None) for name in SOURCE_FIELDS["prices"] if name not in update)
+    if perf_data is not None:
+        update["performance"] = json.dumps(perf_data.get("performance", {}))
+    return base.model_copy(update=update)
+
+
+def _stock_view(entry: _StockEntry, repo: StockRepoProtocol, persist: bool = False) -> Stock:
+    """
+    Get the stock of an entry with the current amount held.
+
+    The view is built once per market data and amount, and callers get a copy of it,
+    so changing a returned stock never changes what other readers see. The amount is
+    read from the ledger's memory. Only market data is persisted; amounts are written
+    by ``update_amount`` alone.
+    """
+    amount = ledger.get(entry.snapshot.symbol, repo)
+    if entry.view is None or entry.view.amount != amount:
+        entry.view = entry.snapshot.to_stock(amount)
+        entry.rendered = None
+        persist = True
+    if persist:
+        repo.upsert_quote(entry.view)
+        portfolio.observe(entry.view)
+    return entry.view.model_copy()
+
+
+def render_stock(
+    stock: Stock, fields: Optional[List[str]] = None, missing: Optional[Dict[str, Optional[Exception]]] = None
+) -> RenderedJSON:
+    """
+    Get the serialized JSON of a stock, reusing it until the stock changes.
+
+    Args:
+        stock (Stock): A stock returned by ``get_stock`` or ``update_amount``.
+        fields (List[str], optional): The fields to serialize, from ``select_sources``.
+            Defaults to all fields.
+        missing (Dict[str, Optional[Exception]], optional): Sources that failed, with
+            their errors, or missed the request budget, with None. Their fields are
+            null, they are listed under ``missing``, and the errors under ``errors``.
+
+    Returns:
+        RenderedJSON: The response body and its entity tag.
+    """
+    if missing:
+        body = stock.model_dump(mode="json", include=set(fields) if fields is not None else None)
+        for source in missing:
+            body.update((name, None) for name in SOURCE_FIELDS[source] if name in body)
+        body["missing"] = list(missing)
+        errors = {source: _error_detail(error) for source, error in missing.items() if error is not None}
+        if errors:
+            body["errors"] = errors
+        return RenderedJSON.from_data(body)
+    if fields is not None:
+        return RenderedJSON.from_data(stock.model_dump(mode="json", include=set(fields)))
+    entry = _stocks.get(stock.symbol)
+    if entry is None or entry.view != stock:
+        return RenderedJSON.from_data(stock.model_dump(mode="json"))
+    if entry.rendered is None:
+        entry.rendered = RenderedJSON.from_data(stock.model_dump(mode="json"))
+    return entry.rendered
+
+
+def render_batch(
+    results: Dict[str, Union[Stock, Exception]],
+    fields: Optional[List[str]] = None,
+    missing: Optional[Dict[str, Dict[str, Optional[Exception]]]] = None,
+) -> RenderedJSON:
+    """
+    Serialize the results of ``get_stocks`` as a batch response body.
+
+    The serialized body of each stock is reused, so only the envelope is encoded.
+
+    Args:
+        results (Dict[str, Union[Stock, Exception]]): The stock or error of each symbol.
+        fields (List[str], optional): The fields of each stock to serialize.
+        missing (Dict[str, Dict[str, Optional[Exception]]], optional): The sources
+            missing from each stock with their errors, from ``get_partial_stocks``.
+
+    Returns:
+        RenderedJSON: The body, shaped like ``BatchResponse``, and its entity tag.
+    """
+    missing = missing or {}
+    items = []
+    for symbol, result in results.items():
+        if isinstance(result, Exception):
+            error = dumps(_error_detail(result))
+            items.append(b'{"symbol":' + dumps(symbol) + b',"stock":null,"error":' + error + b"}")
+        else:
+            stock = render_stock(result, fields, missing.get(symbol)).body
+            items.append(b'{"symbol":' + dumps(symbol) + b',"stock":' + stock + b',"error":null}')
+    return RenderedJSON.from_bytes(b'{"results":[' + b",".join(items) + b"]}")
+
+
+def _error_detail(error: Exception) -> str:
+    return getattr(error, "detail", str(error))
+
+
+def _sources() -> Dict[str, tuple]:
+    return {
+        "polygon": (polygon_cache, fetch_polygon),
+        "marketwatch": (marketwatch_cache, fetch_marketwatch),
+    }
+
+
+def expiring_sources(symbol: str, within: float) -> List[str]:
+    """
+    Get the sources of a symbol that are not cached or stop being fresh within a time.
+
+    A source that the requests for the symbol have left out so far is not included,
+    so price-only traffic does not cause MarketWatch scrapes. A source that was asked
+    for is included even if it has never answered in time.
+
+    Args:
+        symbol (str): The normalized stock symbol.
+        within (float): The time window, in seconds.
+
+    Returns:
+        List[str]: The names of the sources to refresh.
+    """
+    entry = _stocks.get(symbol)
+    expiring = []
+    for (name, (cache, _)), source in zip(_sources().items(), SOURCE_FIELDS):
+        if entry is not None and source not in entry.requested:
+            continue
+        remaining = cache.ttl_remaining(symbol)
+        if remaining is None or remaining <= within:
+            expiring.append(name)
+    return expiring
+
+
+async def refresh_source(symbol: str, source: str):
+    """
+    Fetch one source of a symbol through its cache, replacing the cached value.
+
+    Args:
+        symbol (str): The normalized stock symbol.
+        source (str): The source name, ``"polygon"`` or ``"marketwatch"``.
+    """
+    cache, fetch = _sources()[source]
+    await cache.refresh(symbol, fetch)
+
+
+def clear_caches():
+    """
+    Drop all cached upstream results and stocks.
+    """
+    polygon_cache.clear()
+    polygon_grouped_cache.clear()
+    marketwatch_cache.clear()
+    marketwatch_pages.clear()
+    _stocks.clear()
+    ledger.clear()
 
 
 async def update_amount(symbol: str, delta: int, repo: StockRepoProtocol = Depends(get_repo)) -> Stock:
     """
     Update the amount of a stock.
 
+    The change is applied atomically in the repository, so concurrent updates of the
+    same symbol are all counted, from this process or others, and the amount survives
+    quote refreshes.
+
     Args:
         symbol (str): The stock symbol.
         delta (int): The change in amount.
@@ -195,7 +821,14 @@ async def update_amount(symbol: str, delta: int, repo: StockRepoProtocol = Depen
     Returns:
         Stock: The updated stock object.
     """
+    symbol = normalize_symbol(symbol)
     stock = await get_stock(symbol, repo)
-    stock.amount += delta
-    _cache[symbol] = stock
+    amount = await asyncio.to_thread(ledger.add, symbol, delta, repo)
+    entry = _stocks.get(symbol)
+    if entry is not None:
+        return _stock_view(entry, repo)
+    # The entry was evicted meanwhile; the repository holds the amount either way.
+    stock = QuoteSnapshot.from_stock(stock).to_stock(amount)
+    repo.upsert_quote(stock)
+    portfolio.observe(stock)
     return stock
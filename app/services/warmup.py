@@ -0,0 +1,207 @@
+"""
+This module contains the startup warm-up, and the readiness state it drives.
+"""
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core import http_client
+from app.core.config import get_settings
+from app.core.executor import get_parse_executor
+from app.core.logging_config import get_logger
+from app.dependencies.repo import get_repo
+from app.services import stock_service
+from app.services.performance_parser import parse_performance
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# The smallest page the performance parser finds a table in.
+WARMUP_PAGE = (
+    '<div class="element element--table performance"><table><tr class="table__row">'
+    '<td class="table__cell">1 Week</td>'
+    '<td class="table__cell"><li class="content__item value ignore-color">+1%</li></td>'
+    "</tr></table></div>"
+)
+
+
+@dataclass
+class ComponentStatus:
+    """
+    The warm-up state of one component: ``pending``, ``ok`` or ``error``.
+    """
+
+    state: str = "pending"
+    duration_ms: Optional[float] = None
+    detail: Optional[str] = None
+
+
+class Warmup:
+    """
+    Runs the warm-up steps of the components concurrently, and tracks readiness.
+
+    The service is ready once every step has finished, whether or not it succeeded, or
+    once ``deadline`` seconds have passed since ``start``. Steps still running at the
+    deadline carry on in the background and their status is updated when they finish.
+
+    Each step is a coroutine function returning an optional detail for the status.
+    """
+
+    def __init__(self, steps: Dict[str, Callable[[], Awaitable[Optional[str]]]], deadline: float):
+        self._steps = steps
+        self.deadline = deadline
+        self.components = {name: ComponentStatus() for name in steps}
+        self.finished = False
+        self._started_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether the warm-up has finished or its deadline has passed.
+        """
+        if self.finished:
+            return True
+        return self._started_at is not None and time.perf_counter() - self._started_at >= self.deadline
+
+    def start(self):
+        """
+        Start the warm-up in the background.
+        """
+        if self._task is None:
+            self._started_at = time.perf_counter()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Cancel the steps that are still running.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def wait(self):
+        """
+        Wait for every step to finish.
+        """
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the readiness, the elapsed time and the status of each component.
+        """
+        elapsed = time.perf_counter() - self._started_at if self._started_at is not None else 0.0
+        if self.finished:
+            state = "done"
+        elif self.ready:
+            state = "deadline passed"
+        else:
+            state = "running"
+        return {
+            "state": state,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "deadline_ms": self.deadline * 1000,
+            "components": {name: asdict(status) for name, status in self.components.items()},
+        }
+
+    async def _run(self):
+        await asyncio.gather(*(self._run_step(name, step) for name, step in self._steps.items()))
+        self.finished = True
+        logger.info("Warm-up finished", **{name: s.state for name, s in self.components.items()})
+
+    async def _run_step(self, name: str, step: Callable[[], Awaitable[Optional[str]]]):
+        status = self.components[name]
+        started = time.perf_counter()
+        try:
+            status.detail = await step()
+            status.state = "ok"
+        except Exception as exc:  # pylint: disable=broad-except
+            status.state, status.detail = "error", str(exc) or type(exc).__name__
+            logger.warning("Warm-up step failed", component=name, error=status.detail)
+        status.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def warm_database() -> str:
+    """
+    Open a database connection and check it, if the repository is SQLite.
+    """
+    engine = getattr(get_repo(), "engine", None)
+    if engine is None:
+        return "in-memory"
+    # Imported here so the in-memory backend does not load the database module.
+    # pylint: disable=import-outside-toplevel
+    from app.core.database import check_database
+
+    await asyncio.to_thread(check_database, engine)
+    return "connected"
+
+
+async def warm_upstreams() -> str:
+    """
+    Open connections to every upstream.
+    """
+    results = await asyncio.gather(
+        *(http_client.preconnect(upstream, settings.WARMUP_CONNECTIONS) for upstream in http_client.UPSTREAMS),
+        return_exceptions=True,
+    )
+    failed = [f"{upstream}: {exc!r}" for upstream, exc in zip(http_client.UPSTREAMS, results) if exc is not None]
+    if failed:
+        raise RuntimeError("; ".join(failed))
+    return f"{settings.WARMUP_CONNECTIONS} per upstream"
+
+
+async def warm_parser() -> str:
+    """
+    Run the performance parser once, in a worker if the executor has any.
+    """
+    if await get_parse_executor().run(parse_performance, WARMUP_PAGE) != {"1 Week": "+1%"}:
+        raise RuntimeError("Unexpected parser output")
+    return get_parse_executor().mode
+
+
+async def warm_cache() -> str:
+    """
+    Fetch the ``WARMUP_SYMBOLS`` into the caches.
+    """
+    symbols = [s for s in settings.WARMUP_SYMBOLS.split(",") if s.strip()]
+    if not symbols:
+        return "no symbols"
+    results = await stock_service.get_stocks(symbols, get_repo())
+    loaded = sum(not isinstance(result, Exception) for result in results.values())
+    if not loaded:
+        raise RuntimeError(f"None of {len(results)} symbols could be loaded")
+    return f"{loaded}/{len(results)} symbols"
+
+
+warmup: Warmup | None = None
+
+
+def start_warmup():
+    """
+    Create and start the warm-up from the settings, if it is enabled.
+    """
+    global warmup  # pylint: disable=global-statement
+    if not settings.WARMUP_ENABLED:
+        return
+    warmup = Warmup(
+        {"database": warm_database, "upstreams": warm_upstreams, "parser": warm_parser, "cache": warm_cache},
+        settings.WARMUP_DEADLINE,
+    )
+    warmup.start()
+
+
+async def stop_warmup():
+    """
+    Stop the warm-up, if it is running.
+    """
+    global warmup  # pylint: disable=global-statement
+    if warmup is not None:
+        await warmup.stop()
+        warmup = None
@@ -0,0 +1,151 @@
+"""
+In-process load test of the stock API against simulated upstreams.
+
+Each scenario drives ``GET /stock/{symbol}`` with concurrent clients through httpx's ASGI
+transport, while the upstream clients are routed to the simulators of
+``benchmarks.upstream_sim``. Throughput, latency percentiles and status codes are
+reported per scenario and saved as JSON, so runs can be compared with ``--baseline``.
+
+Scenarios:
+    cold      Every request asks for a symbol that is not cached.
+    warm      Requests cycle over a few symbols that were fetched beforehand.
+    degraded  Uncached symbols while both upstreams are slow and fail often.
+
+Usage:
+    python -m benchmarks.bench_load [--requests N] [--concurrency C] [--scenario NAME ...]
+        [--page-size CHARS] [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, List
+
+import httpx
+
+from app.dependencies import repo as repo_dependency
+from app.main import create_app
+from app.repositories.stock_repo import StockRepo
+from app.services import stock_service
+from benchmarks import upstream_sim
+from benchmarks.common import compare_results, latency_summary, quiet_logging, save_results
+from benchmarks.upstream_sim import UpstreamProfile
+
+
+@dataclass
+class Scenario:
+    """
+    A load scenario: upstream behaviour and the symbols requested.
+    """
+
+    name: str
+    polygon: UpstreamProfile
+    marketwatch: UpstreamProfile
+    warm_symbols: int = 0
+
+
+def scenarios(page_size: int) -> Dict[str, Scenario]:
+    """
+    Build the scenarios with MarketWatch pages of ``page_size`` characters.
+    """
+    polygon = UpstreamProfile(latency=0.03, jitter=0.01)
+    marketwatch = UpstreamProfile(latency=0.08, jitter=0.03, page_size=page_size, chunk_delay=0.001)
+    return {
+        "cold": Scenario("cold", polygon, marketwatch),
+        "warm": Scenario("warm", polygon, marketwatch, warm_symbols=20),
+        "degraded": Scenario(
+            "degraded",
+            replace(polygon, latency=0.2, jitter=0.1, error_rate=0.3),
+            replace(marketwatch, latency=0.4, jitter=0.2, error_rate=0.3),
+        ),
+    }
+
+
+async def run_scenario(scenario: Scenario, requests: int, concurrency: int, seed: int) -> Dict:
+    """
+    Run one scenario and summarize it.
+
+    Returns:
+        Dict: Throughput, latency percentiles, status counts and upstream traffic.
+    """
+    simulators = upstream_sim.install(scenario.polygon, scenario.marketwatch, seed)
+    stock_service.clear_caches()
+    repo_dependency._repo = StockRepo()  # pylint: disable=protected-access
+    app = create_app()
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    if scenario.warm_symbols:
+        symbols = itertools.cycle([f"SYM{i:04d}" for i in range(scenario.warm_symbols)])
+    else:
+        symbols = (f"SYM{i:04d}" for i in itertools.count())
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for i in range(scenario.warm_symbols):
+            await client.get(f"/stock/SYM{i:04d}")
+        upstream_requests = {name: sim.stats.requests for name, sim in simulators.items()}
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.get(f"/stock/{next(symbols)}")
+                latencies.append(time.perf_counter() - start)
+                key = str(response.status_code)
+                statuses[key] = statuses.get(key, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    await upstream_sim.uninstall()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency": latency_summary(latencies),
+        "statuses": statuses,
+        "upstream_requests": {
+            name: sim.stats.requests - upstream_requests[name] for name, sim in simulators.items()
+        },
+        "upstream_errors": {name: sim.stats.errors for name, sim in simulators.items()},
+        "marketwatch_kb_read": round(simulators["marketwatch"].stats.bytes_sent / 1024),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--scenario", action="append", choices=["cold", "warm", "degraded"])
+    parser.add_argument("--page-size", type=int, default=400_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file; defaults to benchmarks/results/")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    quiet_logging()
+    available = scenarios(args.page_size)
+    results = {}
+    print(f"{'scenario':<10}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+    for name in args.scenario or list(available):
+        result = await run_scenario(available[name], args.requests, args.concurrency, args.seed)
+        results[name] = result
+        latency = result["latency"]
+        print(
+            f"{name:<10}{result['throughput_rps']:>8.0f}{latency['p50_ms']:>9.1f}"
+            f"{latency['p95_ms']:>9.1f}{latency['p99_ms']:>9.1f}  {result['statuses']}"
+        )
+
+    path = save_results("load", results, args.output)
+    print(f"\nsaved {path}")
+    if args.baseline:
+        compare_results(args.baseline, results, ["throughput_rps", "latency.p50_ms", "latency.p99_ms"])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Requests-per-second comparison of the pure ASGI LoggingMiddleware against the
+BaseHTTPMiddleware implementation it replaced, on /healthz and on a cached /stock path.
+
+The application is driven in-process with httpx's ASGI transport and log output is
+discarded, so the numbers measure the application and middleware only. The settings
+are read from the environment or .env as usual.
+
+Usage:
+    python -m benchmarks.bench_middleware [--requests N] [--concurrency C]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+
+import httpx
+import structlog.contextvars
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.logging_middleware import LoggingMiddleware
+from app.main import create_app
+from app.services import stock_service
+from benchmarks.common import quiet_logging
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    """
+    The previous implementation, based on BaseHTTPMiddleware and time.time().
+    """
+
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        status_code = 500
+        request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+        structlog.contextvars.bind_contextvars(request_id=request_id)
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            response.headers["X-Request-ID"] = request_id
+        finally:
+            process_time = (time.time() - start_time) * 1000
+            level = logging.INFO if status_code < 500 else logging.ERROR
+            structlog.get_logger().log(level, "request completed", status_code=status_code, duration=process_time)
+        return response
+
+
+def build_app(middleware_class):
+    """
+    Create the application with the given logging middleware.
+    """
+    app = create_app()
+    app.user_middleware = [
+        Middleware(middleware_class) if m.cls is LoggingMiddleware else m for m in app.user_middleware
+    ]
+    return app
+
+
+async def drive(app, path: str, requests: int, concurrency: int) -> float:
+    """
+    Send ``requests`` GETs to ``path`` with ``concurrency`` clients and return the rate.
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        assert (await client.get(path)).status_code == 200
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                await client.get(path)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+async def fake_polygon(_symbol):
+    return {"close": 100.0, "open": 99.0, "high": 101.0, "low": 98.0, "volume": 1000, "status": "OK"}
+
+
+async def fake_marketwatch(_symbol):
+    return {"performance": {"5 Day": "+1.00%", "1 Month": "-2.00%"}}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    quiet_logging()
+    stock_service.fetch_polygon = fake_polygon
+    stock_service.fetch_marketwatch = fake_marketwatch
+
+    print(f"{'path':<14}{'BaseHTTPMiddleware':>20}{'pure ASGI':>12}{'change':>9}")
+    for path in ["/healthz", "/stock/IBM"]:
+        before = await drive(build_app(LegacyLoggingMiddleware), path, args.requests, args.concurrency)
+        after = await drive(build_app(LoggingMiddleware), path, args.requests, args.concurrency)
+        print(f"{path:<14}{before:>16.0f} rps{after:>8.0f} rps{(after / before - 1) * 100:>+8.1f}%")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
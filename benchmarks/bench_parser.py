@@ -0,0 +1,119 @@
+"""
+Benchmark of the MarketWatch performance parser against the BeautifulSoup implementation
+it replaced, on the sample pages in ``benchmarks/samples``.
+
+Results are saved as JSON, so runs can be compared with ``--baseline``.
+
+Usage:
+    python -m benchmarks.bench_parser [--repeat N] [--chunk-size BYTES] [--output FILE]
+        [--baseline FILE]
+"""
+
+import argparse
+import asyncio
+import time
+
+from bs4 import BeautifulSoup
+
+from app.services.performance_parser import parse_performance, parse_performance_stream
+from benchmarks.common import compare_results, save_results
+from benchmarks.sample_pages import load_samples
+
+
+def parse_performance_bs4(html: str) -> dict:
+    """
+    The previous implementation: a full BeautifulSoup/lxml parse of the page.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    perf = {}
+    table_container = soup.select_one("div.element--table.performance")
+    if not table_container:
+        return perf
+    rows = table_container.find_all("tr", class_="table__row")
+    for row in rows:
+        cells = row.find_all("td", class_="table__cell")
+        if len(cells) != 2:
+            continue
+        label = cells[0].get_text(strip=True)
+        value_elem = cells[1].find("li", class_="content__item value ignore-color")
+        if value_elem:
+            perf[label] = value_elem.get_text(strip=True)
+    return perf
+
+
+class CountingChunks:
+    """
+    Async iterator over fixed-size chunks of a body that counts the bytes handed out.
+    """
+
+    def __init__(self, body: bytes, chunk_size: int):
+        self._body = body
+        self._chunk_size = chunk_size
+        self.consumed = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        if self.consumed >= len(self._body):
+            raise StopAsyncIteration
+        chunk = self._body[self.consumed:self.consumed + self._chunk_size]
+        self.consumed += len(chunk)
+        return chunk
+
+
+def timed(fn, repeat: int) -> dict:
+    """
+    Best and median wall time of ``repeat`` calls, in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {"best_ms": round(times[0], 3), "median_ms": round(times[len(times) // 2], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=16 * 1024)
+    parser.add_argument("--output", help="Result file; defaults to benchmarks/results/")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'page':<10}{'size KB':>9}{'bs4 ms':>9}{'lxml ms':>9}{'stream ms':>11}{'read KB':>9}")
+    for name, html in load_samples().items():
+        body = html.encode("utf-8")
+        expected = parse_performance_bs4(html)
+        assert parse_performance(body) == expected, f"{name}: parsers disagree"
+
+        def stream():
+            chunks = CountingChunks(body, args.chunk_size)
+            assert asyncio.run(parse_performance_stream(chunks)) == expected
+            return chunks.consumed
+
+        consumed = stream()
+        result = results[name] = {
+            "size_kb": round(len(body) / 1024),
+            "bs4": timed(lambda: parse_performance_bs4(html), args.repeat),
+            "lxml": timed(lambda: parse_performance(body), args.repeat),
+            "stream": timed(stream, args.repeat),
+            "stream_read_kb": round(consumed / 1024),
+        }
+        print(
+            f"{name:<10}{result['size_kb']:>9}{result['bs4']['best_ms']:>9.2f}"
+            f"{result['lxml']['best_ms']:>9.2f}{result['stream']['best_ms']:>11.2f}"
+            f"{result['stream_read_kb']:>9}"
+        )
+
+    path = save_results("parser", results, args.output)
+    print(f"\nsaved {path}")
+    if args.baseline:
+        compare_results(args.baseline, results, ["lxml.best_ms", "stream.best_ms"])
+
+
+if __name__ == "__main__":
+    main()
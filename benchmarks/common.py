@@ -0,0 +1,126 @@
+"""
+This module contains helpers shared by the benchmarks: quiet logging, latency
+percentiles, and saving and comparing result files.
+"""
+
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def quiet_logging():
+    """
+    Keep the logging work of the application but discard its output.
+    """
+    devnull = open(os.devnull, "w", encoding="utf-8")  # pylint: disable=consider-using-with
+    for handler in logging.getLogger().handlers:
+        handler.setStream(devnull)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Get a nearest-rank percentile of already sorted values.
+    """
+    if not sorted_values:
+        return float("nan")
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def latency_summary(latencies: Iterable[float]) -> Dict[str, float]:
+    """
+    Summarize latencies in seconds as mean, p50, p95, p99 and max in milliseconds.
+    """
+    values = sorted(latencies)
+    if not values:
+        return {}
+    return {
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+
+def environment() -> Dict[str, str]:
+    """
+    Describe the machine and revision a benchmark ran on.
+    """
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = "unknown"
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def save_results(name: str, results: Dict, output: Optional[str] = None) -> Path:
+    """
+    Save benchmark results with a description of the environment.
+
+    Args:
+        name (str): The benchmark name, used in the default file name.
+        results (Dict): The results, keyed by case.
+        output (str, optional): The file to write. Defaults to a timestamped file in
+            ``benchmarks/results``.
+
+    Returns:
+        Path: The written file.
+    """
+    env = environment()
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = env["time"].replace(":", "").replace("-", "")
+        path = RESULTS_DIR / f"{name}-{stamp}-{env['revision']}.json"
+    else:
+        path = Path(output)
+    path.write_text(json.dumps({"benchmark": name, "environment": env, "results": results}, indent=2))
+    return path
+
+
+def compare_results(baseline_path: str, results: Dict[str, Dict], metrics: List[str]):
+    """
+    Print the change of selected metrics against a saved baseline.
+
+    Args:
+        baseline_path (str): A file written by ``save_results``.
+        results (Dict[str, Dict]): The current results, keyed by case.
+        metrics (List[str]): The metric names to compare.
+    """
+    baseline = json.loads(Path(baseline_path).read_text())
+    revision = baseline["environment"].get("revision", "?")
+    print(f"\nchange against {baseline_path} ({revision})")
+    for case, current in results.items():
+        previous = baseline["results"].get(case)
+        if previous is None:
+            continue
+        changes = []
+        for metric in metrics:
+            old, new = _lookup(previous, metric), _lookup(current, metric)
+            if old and new is not None:
+                changes.append(f"{metric} {old:g} -> {new:g} ({(new / old - 1) * 100:+.1f}%)")
+        print(f"  {case}: " + ", ".join(changes))
+
+
+def _lookup(data: Dict, dotted: str):
+    for part in dotted.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
@@ -0,0 +1,98 @@
+"""
+This module generates and loads MarketWatch-like quote pages for benchmarks.
+
+Pages saved in ``benchmarks/samples`` are used as they are, so real pages can be dropped
+in next to the generated ones.
+"""
+
+import random
+from pathlib import Path
+from typing import Dict
+
+SAMPLES_DIR = Path(__file__).parent / "samples"
+
+PERIODS = ["5 Day", "1 Month", "3 Month", "YTD", "1 Year"]
+
+
+def performance_table(rng: random.Random) -> str:
+    """
+    Build the performance table block of a quote page.
+    """
+    rows = "".join(
+        f"""
+        <tr class="table__row">
+            <td class="table__cell">{period}</td>
+            <td class="table__cell">
+                <ul class="content u-flex">
+                    <li class="content__item value ignore-color">{rng.uniform(-30, 30):+.2f}%</li>
+                </ul>
+            </td>
+        </tr>"""
+        for period in PERIODS
+    )
+    return f"""
+    <div class="element element--table performance">
+        <header class="header header--secondary"><h2 class="title">Performance</h2></header>
+        <table class="table table--primary no-heading c2"><tbody>{rows}
+        </tbody></table>
+    </div>"""
+
+
+def filler(rng: random.Random, size: int) -> str:
+    """
+    Build roughly ``size`` characters of markup, scripts and text.
+    """
+    parts = []
+    total = 0
+    while total < size:
+        kind = rng.random()
+        if kind < 0.2:
+            part = "<script>window.__STATE__=" + "{" + ",".join(
+                f'"k{i}":{rng.random():.6f}' for i in range(rng.randint(50, 400))
+            ) + "};</script>"
+        elif kind < 0.6:
+            part = "<div class=\"article__content\"><a class=\"link\" href=\"/story/{0}\">".format(
+                rng.randint(1, 10 ** 6)
+            ) + " ".join("word%d" % rng.randint(0, 999) for _ in range(rng.randint(10, 60))) + "</a></div>"
+        else:
+            part = "<ul class=\"list list--kv\">" + "".join(
+                f"<li class=\"kv__item\"><small class=\"label\">L{i}</small>"
+                f"<span class=\"primary\">{rng.uniform(0, 500):.2f}</span></li>"
+                for i in range(rng.randint(5, 20))
+            ) + "</ul>"
+        parts.append(part)
+        total += len(part)
+    return "".join(parts)
+
+
+def generate_page(size: int, table_position: float = 0.6, seed: int = 0) -> str:
+    """
+    Generate a quote page of about ``size`` characters with the performance table at
+    ``table_position`` (0 = top, 1 = bottom) of the page.
+    """
+    rng = random.Random(seed)
+    before = int(size * table_position)
+    return (
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\"><title>Quote</title>"
+        + filler(rng, before // 4)
+        + "</head><body><main class=\"content-region\">"
+        + filler(rng, before - before // 4)
+        + performance_table(rng)
+        + filler(rng, size - before)
+        + "</main></body></html>"
+    )
+
+
+def load_samples() -> Dict[str, str]:
+    """
+    Load the saved sample pages, generating the default set on first use.
+    """
+    if not any(SAMPLES_DIR.glob("*.html")):
+        SAMPLES_DIR.mkdir(exist_ok=True)
+        for name, size in [("small", 150_000), ("medium", 400_000), ("large", 900_000)]:
+            page = generate_page(size, seed=size)
+            (SAMPLES_DIR / f"{name}.html").write_text(page, encoding="utf-8")
+    return {
+        path.stem: path.read_text(encoding="utf-8")
+        for path in sorted(SAMPLES_DIR.glob("*.html"))
+    }
@@ -0,0 +1,198 @@
+"""
+This module contains an offline simulator of the Polygon and MarketWatch upstreams.
+
+The simulators are httpx transports, installed as the upstream clients of
+``app.core.http_client``, so requests go through the real retry, circuit breaker and
+rate-limit code without touching the network. Latency, jitter, error rate and page size
+are configurable, and a seed makes runs repeatable.
+"""
+
+import asyncio
+import json
+import random
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict
+
+import httpx
+
+from app.core import http_client
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import get_settings
+from benchmarks.sample_pages import generate_page
+
+settings = get_settings()
+
+
+@dataclass
+class UpstreamProfile:
+    """
+    Behaviour of a simulated upstream.
+
+    Attributes:
+        latency (float): Mean time to the response headers, in seconds.
+        jitter (float): Maximum random deviation from ``latency``, in seconds.
+        error_rate (float): Fraction of requests answered with ``error_status``.
+        error_status (int): Status code of failed requests.
+        page_size (int): Approximate size of MarketWatch pages, in characters.
+        chunk_size (int): Size of the streamed body chunks, in bytes.
+        chunk_delay (float): Time between body chunks, in seconds.
+    """
+
+    latency: float = 0.02
+    jitter: float = 0.005
+    error_rate: float = 0.0
+    error_status: int = 503
+    page_size: int = 400_000
+    chunk_size: int = 16 * 1024
+    chunk_delay: float = 0.0
+
+
+@dataclass
+class SimulatorStats:
+    """
+    Requests served by a simulated upstream.
+    """
+
+    requests: int = 0
+    errors: int = 0
+    bytes_sent: int = 0
+    statuses: Dict[int, int] = field(default_factory=dict)
+
+
+class SimulatedUpstream(httpx.AsyncBaseTransport):
+    """
+    Base transport that delays, fails and streams responses according to a profile.
+    """
+
+    def __init__(self, profile: UpstreamProfile, seed: int = 0):
+        self.profile = profile
+        self.stats = SimulatorStats()
+        self._rng = random.Random(seed)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        profile = self.profile
+        self.stats.requests += 1
+        delay = profile.latency + self._rng.uniform(-profile.jitter, profile.jitter)
+        await asyncio.sleep(max(0.0, delay))
+        if self._rng.random() < profile.error_rate:
+            self.stats.errors += 1
+            return self._respond(profile.error_status, b"simulated failure")
+        return self.respond(request)
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        """
+        Build the successful response to a request.
+        """
+        raise NotImplementedError
+
+    def _respond(self, status_code: int, body: bytes, content_type: str = "text/plain") -> httpx.Response:
+        self.stats.statuses[status_code] = self.stats.statuses.get(status_code, 0) + 1
+        return httpx.Response(
+            status_code,
+            headers={"Content-Type": content_type},
+            stream=_ChunkedBody(body, self.profile.chunk_size, self.profile.chunk_delay, self.stats),
+        )
+
+
+class PolygonSimulator(SimulatedUpstream):
+    """
+    Answers Polygon open-close and grouped-daily requests with generated bars.
+    """
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        parts = request.url.path.strip("/").split("/")
+        if "grouped" in parts:
+            day = parts[-1]
+            symbols = [f"SYM{i:04d}" for i in range(2000)]
+            body = {"status": "OK", "results": [self._bar(symbol, day, grouped=True) for symbol in symbols]}
+        else:
+            # /v1/open-close/{symbol}/{date}
+            body = self._bar(parts[-2], parts[-1], grouped=False)
+        return self._respond(200, json.dumps(body).encode(), "application/json")
+
+    @staticmethod
+    def _bar(symbol: str, day: str, grouped: bool) -> dict:
+        rng = random.Random(symbol)
+        close = round(rng.uniform(5, 500), 2)
+        if grouped:
+            return {"T": symbol, "o": close * 0.99, "h": close * 1.01, "l": close * 0.98, "c": close, "v": 10_000}
+        return {
+            "status": "OK",
+            "from": day,
+            "symbol": symbol,
+            "open": close * 0.99,
+            "high": close * 1.01,
+            "low": close * 0.98,
+            "close": close,
+            "volume": 10_000,
+            "afterHours": close,
+            "preMarket": close,
+        }
+
+
+class MarketWatchSimulator(SimulatedUpstream):
+    """
+    Answers MarketWatch quote page requests with generated pages of ``page_size``.
+    """
+
+    def __init__(self, profile: UpstreamProfile, seed: int = 0):
+        super().__init__(profile, seed)
+        # Pages differ only by their values, so a few variants are generated up front.
+        self._pages = [generate_page(profile.page_size, seed=seed + i).encode("utf-8") for i in range(4)]
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        symbol = request.url.path.rstrip("/").rsplit("/", 1)[-1]
+        page = self._pages[sum(map(ord, symbol)) % len(self._pages)]
+        return self._respond(200, page, "text/html; charset=utf-8")
+
+
+class _ChunkedBody(httpx.AsyncByteStream):
+    def __init__(self, body: bytes, chunk_size: int, chunk_delay: float, stats: SimulatorStats):
+        self._body = body
+        self._chunk_size = chunk_size
+        self._chunk_delay = chunk_delay
+        self._stats = stats
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for start in range(0, len(self._body), self._chunk_size):
+            if self._chunk_delay:
+                await asyncio.sleep(self._chunk_delay)
+            chunk = self._body[start:start + self._chunk_size]
+            self._stats.bytes_sent += len(chunk)
+            yield chunk
+
+
+def install(polygon: UpstreamProfile, marketwatch: UpstreamProfile, seed: int = 0) -> Dict[str, SimulatedUpstream]:
+    """
+    Route the upstream clients of ``app.core.http_client`` to simulators.
+
+    The circuit breakers are replaced with fresh ones so scenarios do not inherit the
+    state of a previous run.
+
+    Args:
+        polygon (UpstreamProfile): The behaviour of the Polygon simulator.
+        marketwatch (UpstreamProfile): The behaviour of the MarketWatch simulator.
+        seed (int): Seed of the latency and error draws.
+
+    Returns:
+        Dict[str, SimulatedUpstream]: The simulators, keyed by upstream name.
+    """
+    simulators = {
+        http_client.POLYGON: PolygonSimulator(polygon, seed),
+        http_client.MARKETWATCH: MarketWatchSimulator(marketwatch, seed),
+    }
+    for upstream, transport in simulators.items():
+        http_client.clients[upstream] = httpx.AsyncClient(transport=transport)
+        http_client.breakers[upstream] = CircuitBreaker(
+            upstream,
+            failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+            recovery_time=settings.BREAKER_RECOVERY_TIME,
+        )
+    return simulators
+
+
+async def uninstall():
+    """
+    Close the simulated upstream clients.
+    """
+    await http_client.close_clients()
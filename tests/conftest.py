@@ -0,0 +1,86 @@
+import inspect
+from typing import Any, Dict, List
+
+import pytest
+
+from app.core import database
+from app.dependencies import repo as repo_dependency
+from app.dependencies.repo import get_repo
+from app.main import app
+from app.repositories.stock_repo import StockRepo
+from app.services import portfolio, stock_service
+
+DEFAULT_ANSWERS = {
+    "polygon": {"close": 12.0, "volume": 100, "status": "OK"},
+    "marketwatch": {"performance": {"1 Week": "+1%"}},
+    "grouped": lambda symbols: {symbol: {"close": 12.0, "status": "OK"} for symbol in symbols},
+}
+_FETCHES = {"polygon": "fetch_polygon", "marketwatch": "fetch_marketwatch", "grouped": "fetch_polygon_grouped"}
+
+
+@pytest.fixture(autouse=True)
+def isolated_database(tmp_path, monkeypatch):
+    """
+    Point the application database at a new file, so no rows carry over between tests.
+    """
+    monkeypatch.setattr(database.settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'stocks.db'}")
+    monkeypatch.setattr(database, "engine", None)
+    monkeypatch.setattr(repo_dependency, "_repo", None)
+    yield
+    if database.engine is not None:
+        database.engine.dispose()
+
+
+class Upstreams:
+    """
+    Fake Polygon and MarketWatch fetches, the calls made to them, and the in-memory
+    repository the app serves.
+
+    An answer is a result, an exception to raise, or a function of the symbol (the
+    symbols for ``grouped``) returning either, possibly as a coroutine.
+    """
+
+    def __init__(self, answers: Dict[str, Any]):
+        self.answers = dict(answers)
+        self.calls: Dict[str, List] = {source: [] for source in _FETCHES}
+        self.repo = StockRepo()
+
+    def answer(self, source: str, answer: Any):
+        """
+        Replace the answer of a source.
+        """
+        self.answers[source] = answer
+
+    def fetch(self, source: str):
+        async def fetch(arg):
+            self.calls[source].append(list(arg) if source == "grouped" else arg)
+            result = self.answers[source]
+            if callable(result):
+                result = result(arg)
+                if inspect.isawaitable(result):
+                    result = await result
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        return fetch
+
+
+@pytest.fixture
+def upstreams(request, monkeypatch):
+    """
+    Serve the app from fake upstreams and an in-memory repository, with empty caches.
+
+    Parametrize it indirectly with a dict of answers keyed by ``polygon``,
+    ``marketwatch`` or ``grouped`` to replace the ``DEFAULT_ANSWERS``.
+    """
+    fakes = Upstreams({**DEFAULT_ANSWERS, **getattr(request, "param", {})})
+    for source, name in _FETCHES.items():
+        monkeypatch.setattr(stock_service, name, fakes.fetch(source))
+    app.dependency_overrides[get_repo] = lambda: fakes.repo
+    stock_service.clear_caches()
+    portfolio.reset_portfolio()
+    yield fakes
+    app.dependency_overrides.clear()
+    stock_service.clear_caches()
+    portfolio.reset_portfolio()
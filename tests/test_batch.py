@@ -0,0 +1,79 @@
+from datetime import date
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from app.core.errors import ExternalAPIError
+from app.main import app
+from app.models.stock import QuoteSnapshot
+from app.services import stock_service
+
+
+@pytest.fixture(autouse=True)
+def fake_upstreams(upstreams):
+    upstreams.answer("polygon", {"close": 20.0, "status": "OK"})
+    upstreams.answer("grouped", lambda symbols: {s: {"close": 10.0, "status": "OK"} for s in symbols if s != "NOPE"})
+
+    def marketwatch(symbol):
+        if symbol == "BAD":
+            return ExternalAPIError("Marketwatch returned 500")
+        return {"performance": {"1 Week": "+1%"}}
+
+    upstreams.answer("marketwatch", marketwatch)
+    return upstreams.calls
+
+
+@pytest.mark.asyncio
+async def test_batch_uses_grouped_call_and_reports_errors_per_symbol(fake_upstreams):
+    symbols = ["aapl", "IBM", "MSFT", "BAD", "NOPE", "ibm"]
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        resp = await ac.get("/stock", params={"symbols": ",".join(symbols)})
+    assert resp.status_code == 200
+    results = {item["symbol"]: item for item in resp.json()["results"]}
+    assert list(results) == ["AAPL", "IBM", "MSFT", "BAD", "NOPE"]
+    assert results["AAPL"]["stock"]["close"] == 10.0
+    # Prices answered for BAD, so its failed performance is only reported missing.
+    assert results["BAD"]["error"] is None and results["BAD"]["stock"]["missing"] == ["performance"]
+    assert results["BAD"]["stock"]["errors"] == {"performance": "Marketwatch returned 500"}
+    assert results["NOPE"]["stock"]["errors"] == {"prices": "No data from Polygon"}
+    assert fake_upstreams["grouped"] == [["AAPL", "IBM", "MSFT", "BAD", "NOPE"]]
+    assert fake_upstreams["polygon"] == []
+
+
+@pytest.mark.asyncio
+async def test_batch_post_serves_cached_symbols(fake_upstreams):
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = await ac.post("/stock", json={"symbols": ["IBM"]})
+        second = await ac.post("/stock", json={"symbols": ["IBM"]})
+    assert first.status_code == second.status_code == 200
+    assert second.json()["results"][0]["stock"]["close"] == 20.0
+    assert fake_upstreams["polygon"] == ["IBM"]
+    assert fake_upstreams["marketwatch"] == ["IBM"]
+
+
+@pytest.mark.asyncio
+async def test_grouped_bars_do_not_replace_open_close_results(fake_upstreams, upstreams):
+    upstreams.answer("polygon", {"close": 20.0, "afterHours": 21.0, "preMarket": 19.0, "status": "OK"})
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.get("/stock", params={"symbols": "AAPL,IBM,MSFT,TSLA,AMZN"})
+        single = await ac.get("/stock/IBM")
+        batch = await ac.get("/stock", params={"symbols": "IBM,AAPL,MSFT,TSLA,AMZN,NFLX"})
+
+    assert single.json()["afterHours"] == 21.0 and single.json()["preMarket"] == 19.0
+    ibm = batch.json()["results"][0]["stock"]
+    assert ibm["close"] == 20.0 and ibm["afterHours"] == 21.0
+    assert fake_upstreams["grouped"] == [["AAPL", "IBM", "MSFT", "TSLA", "AMZN"], ["NFLX"]]
+
+
+def test_grouped_bars_of_a_new_session_clear_extended_hours_prices():
+    base = QuoteSnapshot(symbol="IBM", close=10.0, preMarket=9.5, afterHours=10.5, from_date=date(2024, 6, 3))
+    bar = {"close": 11.0, "from_date": date(2024, 6, 4), "open": 10.8, "status": "OK"}
+
+    updated = stock_service.apply_sources(base, bar, None)
+    assert (updated.close, updated.preMarket, updated.afterHours) == (11.0, None, None)
+    same_session = stock_service.apply_sources(base, {**bar, "from_date": date(2024, 6, 3)}, None)
+    assert (same_session.close, same_session.preMarket) == (11.0, 9.5)
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.core.cache import SWRCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_swr_cache_serves_fresh_stale_and_miss():
+    clock = FakeClock()
+    cache = SWRCache("test", fresh_ttl=10, stale_ttl=20, clock=clock)
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        return f"{key}-{len(calls)}"
+
+    assert await cache.get("IBM", fetch) == "IBM-1"
+    clock.now += 5
+    assert await cache.get("IBM", fetch) == "IBM-1"
+
+    # Stale: the old value is served right away and refreshed in the background.
+    clock.now += 10
+    assert await cache.get("IBM", fetch) == "IBM-1"
+    await asyncio.sleep(0.01)
+    assert await cache.get("IBM", fetch) == "IBM-2"
+
+    # Past the stale window the caller waits for a new fetch.
+    clock.now += 100
+    assert await cache.get("IBM", fetch) == "IBM-3"
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale"], stats["misses"], stats["size"]) == (2, 1, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_swr_cache_keeps_stale_value_when_refresh_fails():
+    clock = FakeClock()
+    cache = SWRCache("test", fresh_ttl=10, stale_ttl=20, clock=clock)
+    cache.set("IBM", "old")
+    clock.now += 15
+
+    async def failing_fetch(key):
+        raise RuntimeError("upstream down")
+
+    assert await cache.get("IBM", failing_fetch) == "old"
+    await asyncio.sleep(0.01)
+    assert await cache.get("IBM", failing_fetch) == "old"
+
+
+@pytest.mark.asyncio
+async def test_swr_cache_serves_expired_value_while_upstream_unavailable():
+    clock = FakeClock()
+    cache = SWRCache("test", fresh_ttl=10, clock=clock, serve_expired_on=(LookupError,))
+    cache.set("IBM", "old")
+    clock.now += 100
+
+    async def unavailable(key):
+        raise LookupError(key)
+
+    assert await cache.get("IBM", unavailable) == "old"
+    with pytest.raises(LookupError):
+        await cache.get("MSFT", unavailable)
+
+
+@pytest.mark.asyncio
+async def test_swr_cache_remembers_missing_keys_briefly():
+    clock = FakeClock()
+    cache = SWRCache("test", fresh_ttl=10, clock=clock, negative_ttl=30, negative_on=(LookupError,))
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        raise LookupError(key)
+
+    async def fetch_many(keys):
+        calls.append(keys)
+        return {}
+
+    for _ in range(3):
+        with pytest.raises(LookupError):
+            await cache.get("NOPE", fetch)
+    assert await cache.get_many(["NOPE"], fetch_many) == {}
+    assert calls == ["NOPE"] and cache.stats()["negative"] == 3
+
+    clock.now += 31
+    with pytest.raises(LookupError):
+        await cache.get("NOPE", fetch)
+    assert calls == ["NOPE", "NOPE"]
@@ -0,0 +1,108 @@
+import json
+import pickle
+import sqlite3
+from datetime import date
+
+import pytest
+
+from app.core.cache import SWRCache
+from app.core.cache_backends import CacheEntry, MemoryBackend, SQLiteBackend, TwoTierBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_sqlite_backend_bounds_total_bytes(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.db"), "marketwatch", max_bytes=10_000)
+    for i in range(50):
+        backend.set(f"S{i}", CacheEntry("x" * 1000, stored_at=float(i)))
+
+    assert backend.total_bytes() <= 10_000
+    assert backend.evictions > 0
+    # The newest entries are kept.
+    assert backend.get("S49").value == "x" * 1000
+    assert backend.get("S0") is None
+
+
+def test_sqlite_backend_namespaces_are_separate(tmp_path):
+    path = str(tmp_path / "cache.db")
+    polygon = SQLiteBackend(path, "polygon", max_bytes=1 << 20)
+    marketwatch = SQLiteBackend(path, "marketwatch", max_bytes=1 << 20)
+    polygon.set("IBM", CacheEntry({"close": 1.0}, 1.0))
+    assert marketwatch.get("IBM") is None
+    marketwatch.clear()
+    assert polygon.get("IBM").value == {"close": 1.0}
+
+
+def test_sqlite_backend_stores_json_and_counts_bytes(tmp_path):
+    path = str(tmp_path / "cache.db")
+    backend = SQLiteBackend(path, "polygon", max_bytes=1 << 20)
+    value = {"close": 1.0, "from_date": date(2024, 6, 3), "performance": {"1 Week": "+1%"}}
+    backend.set("IBM", CacheEntry(value, 1.0))
+    backend.set("IBM", CacheEntry(value, 2.0))
+    backend.set("MSFT", CacheEntry({"close": 2.0}, 2.0))
+
+    row = sqlite3.connect(path).execute("SELECT value FROM cache_entries WHERE key = 'IBM'").fetchone()
+    assert json.loads(row[0])["from_date"] == {"$date": "2024-06-03"}
+    assert SQLiteBackend(path, "polygon", max_bytes=1 << 20).get("IBM").value == value
+    assert backend.total_bytes() == SQLiteBackend(path, "polygon", max_bytes=1 << 20).total_bytes()
+
+    # Rows that are not JSON, such as pickles, are never loaded.
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE cache_entries SET value = ? WHERE key = 'IBM'", (pickle.dumps(value),))
+    assert backend.get("IBM") is None
+
+
+@pytest.mark.asyncio
+async def test_two_tier_shares_entries_between_workers(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "cache.db")
+
+    def worker_cache():
+        backend = TwoTierBackend(MemoryBackend(16), SQLiteBackend(path, "polygon", 1 << 20), 10, clock)
+        return SWRCache("polygon", fresh_ttl=10, stale_ttl=0, clock=clock, backend=backend)
+
+    first, second = worker_cache(), worker_cache()
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        return {"close": float(len(calls))}
+
+    assert await first.get("IBM", fetch) == {"close": 1.0}
+    assert await second.get("IBM", fetch) == {"close": 1.0}
+    assert calls == ["IBM"]
+
+    # Once expired, a refresh by one worker is picked up by the other.
+    clock.now += 11
+    assert await first.get("IBM", fetch) == {"close": 2.0}
+    assert await second.get("IBM", fetch) == {"close": 2.0}
+    assert calls == ["IBM", "IBM"]
+
+
+@pytest.mark.asyncio
+async def test_membership_checks_do_not_touch_the_shared_tier(tmp_path):
+    shared = SQLiteBackend(str(tmp_path / "cache.db"), "polygon", 1 << 20)
+    cache = SWRCache("polygon", fresh_ttl=10, backend=TwoTierBackend(MemoryBackend(16), shared, 10))
+
+    async def fetch(key):
+        return {"close": 1.0}
+
+    assert "IBM" not in cache and cache.peek("IBM") is None
+    assert (shared.hits, shared.misses) == (0, 0)
+    await cache.get("IBM", fetch)
+    assert "IBM" in cache and shared.get("IBM").value == {"close": 1.0}
+    assert (shared.hits, shared.misses) == (1, 1)
+
+
+def test_memory_backend_counts_only_evictions_that_make_room():
+    backend = MemoryBackend(2)
+    for key in ("AAPL", "IBM", "MSFT"):
+        backend.set(key, CacheEntry({"close": 1.0}, 0.0))
+    backend.clear()
+    assert backend.stats() == {"entries": 0, "evictions": 1}
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from app.core.errors import ExternalAPIError
+from app.main import app
+from app.services import stock_service
+
+
+@pytest.fixture
+def slow_marketwatch(upstreams):
+    release = asyncio.Event()
+
+    async def marketwatch(_symbol):
+        await release.wait()
+        return {"performance": {"1 Week": "+1%"}}
+
+    upstreams.answer("marketwatch", marketwatch)
+    yield release
+    release.set()
+
+
+@pytest.mark.asyncio
+async def test_slow_source_is_marked_missing_and_fills_the_cache(slow_marketwatch):
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        partial = await ac.get("/stock/IBM", headers={"X-Request-Timeout": "0.05"})
+        batch = await ac.get("/stock", params={"symbols": "IBM,MSFT"}, headers={"X-Request-Timeout": "0.05"})
+        slow_marketwatch.set()
+        await asyncio.sleep(0.01)
+        full = await ac.get("/stock/IBM", headers={"X-Request-Timeout": "0.05"})
+        invalid = await ac.get("/stock/IBM", headers={"X-Request-Timeout": "0"})
+
+    body = partial.json()
+    assert partial.status_code == 200
+    assert body["close"] == 12.0 and body["performance"] is None and body["missing"] == ["performance"]
+    assert [item["stock"]["missing"] for item in batch.json()["results"]] == [["performance"], ["performance"]]
+    assert "missing" not in full.json() and json.loads(full.json()["performance"]) == {"1 Week": "+1%"}
+    assert invalid.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_no_source_in_time_is_a_gateway_timeout(slow_marketwatch):
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        single = await ac.get("/stock/IBM", params={"include": "performance"}, headers={"X-Request-Timeout": "0.02"})
+        batch = await ac.get(
+            "/stock", params={"symbols": "IBM", "include": "performance"}, headers={"X-Request-Timeout": "0.02"}
+        )
+
+    assert single.status_code == 504
+    assert batch.json()["results"][0]["error"] == "No upstream answered within the request budget"
+
+
+@pytest.mark.asyncio
+async def test_source_that_missed_the_budget_is_still_refreshed(slow_marketwatch, upstreams):
+    _, missing = await stock_service.get_partial_stock("IBM", upstreams.repo, budget=0.02)
+
+    assert missing == {"performance": None}
+    assert stock_service.expiring_sources("IBM", 15) == ["marketwatch"]
+
+
+@pytest.mark.asyncio
+async def test_failed_source_is_missing_unless_every_source_failed(upstreams):
+    upstreams.answer("marketwatch", ExternalAPIError("Marketwatch returned 500"))
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        partial = await ac.get("/stock/IBM")
+        failed = await ac.get("/stock/MSFT", params={"include": "performance"})
+
+    body = partial.json()
+    assert partial.status_code == 200 and body["close"] == 12.0 and body["performance"] is None
+    assert body["missing"] == ["performance"] and body["errors"] == {"performance": "Marketwatch returned 500"}
+    assert failed.status_code == 502
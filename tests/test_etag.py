@@ -0,0 +1,44 @@
+import json
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from app.core.serialization import RenderedJSON
+from app.main import app
+from app.models.stock import BatchItem, BatchResponse, Stock
+from app.services import stock_service
+
+
+def test_if_none_match_uses_weak_comparison():
+    rendered = RenderedJSON.from_data({"a": 1})
+    assert rendered.matches(rendered.etag)
+    assert rendered.matches(f'"other", W/{rendered.etag}')
+    assert rendered.matches("*")
+    assert not rendered.matches('"other"')
+    assert not rendered.matches(None)
+
+
+def test_batch_body_matches_the_response_model():
+    stock = Stock(symbol="IBM", close=20.0, performance='{"1 Week": "+1%"}')
+    rendered = stock_service.render_batch({"IBM": stock, "BAD": ValueError("boom")})
+    expected = BatchResponse(results=[BatchItem(symbol="IBM", stock=stock), BatchItem(symbol="BAD", error="boom")])
+    assert json.loads(rendered.body) == expected.model_dump(mode="json")
+
+
+@pytest.mark.asyncio
+async def test_stock_etag_revalidates_until_the_amount_changes(upstreams):
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = await ac.get("/stock/IBM")
+        etag = first.headers["etag"]
+        cached = await ac.get("/stock/IBM", headers={"If-None-Match": etag})
+        stock = await stock_service.get_stock("IBM", upstreams.repo)
+        assert stock_service.render_stock(stock) is stock_service.render_stock(stock)
+        updated = await ac.post("/stock/IBM", json={"amount": 1})
+        after = await ac.get("/stock/IBM", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200 and first.json()["close"] == 12.0
+    assert cached.status_code == 304 and cached.content == b"" and cached.headers["etag"] == etag
+    assert updated.status_code == 202 and updated.headers["etag"] != etag
+    assert after.status_code == 200 and after.headers["etag"] == updated.headers["etag"]
@@ -0,0 +1,58 @@
+import pytest
+
+from app.core.executor import ParseExecutor
+from app.services.performance_parser import PerformanceSlicer, parse_performance, read_performance_slice
+from benchmarks.sample_pages import generate_page
+
+
+async def chunked(body, size):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [7, 1024, 1 << 20])
+async def test_slice_parses_like_whole_page(chunk_size):
+    body = generate_page(60_000, seed=3).encode()
+    table = await read_performance_slice(chunked(body, chunk_size))
+    assert table.startswith(b"<div") and table.endswith(b"</div>")
+    assert len(table) < len(body) // 10
+    assert parse_performance(table) == parse_performance(body)
+
+
+def test_slicer_without_table_returns_none():
+    slicer = PerformanceSlicer()
+    assert slicer.feed(b"<html><body><div class='x'></div></body></html>") is False
+    assert slicer.close() is None
+
+
+@pytest.mark.asyncio
+async def test_slice_ignores_quote_style_and_tag_case():
+    html = (
+        "<html><body><DIV Class='element element--table performance'><table><tr class='table__row'>"
+        "<td class='table__cell'>1 Week</td>"
+        "<td class='table__cell'><li class='content__item value ignore-color'>+1%</li></td>"
+        "</tr></table></DIV><div>after</div></body></html>"
+    ).encode()
+    table = await read_performance_slice(chunked(html, 16))
+    assert table is not None and parse_performance(table) == parse_performance(html) == {"1 Week": "+1%"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+async def test_executor_modes_run_parser(mode):
+    html = generate_page(20_000, seed=1)
+    executor = ParseExecutor(mode, workers=1)
+    try:
+        assert await executor.run(parse_performance, html) == parse_performance(html)
+    finally:
+        executor.shutdown()
+    stats = executor.stats()
+    assert stats["mode"] == mode
+    assert stats["submitted"] == stats["completed"] == 1
+    assert stats["pending"] == 0
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        ParseExecutor("gpu")
@@ -0,0 +1,53 @@
+import json
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.services import stock_service
+
+
+def test_select_sources_follows_fields_and_include():
+    assert stock_service.select_sources() == (stock_service.ALL_SOURCES, None)
+    assert stock_service.select_sources(["prices"]) == (frozenset({"prices"}), None)
+    assert stock_service.select_sources(None, ["close", "amount"]) == (frozenset({"prices"}), ["symbol", "close", "amount"])
+    with pytest.raises(ValueError):
+        stock_service.select_sources(["news"])
+    with pytest.raises(ValueError):
+        stock_service.select_sources(None, ["price"])
+    with pytest.raises(ValueError):
+        stock_service.select_sources([])
+
+
+@pytest.mark.asyncio
+async def test_sourceless_requests_do_not_save_unknown_symbols(upstreams):
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        empty = await ac.get("/stock/ZZZNOTREAL", params={"include": ""})
+        amount = await ac.get("/stock/ZZZNOTREAL", params={"fields": "amount"})
+
+    assert empty.status_code == 400
+    assert amount.json() == {"symbol": "ZZZNOTREAL", "amount": 0}
+    assert upstreams.calls["polygon"] == upstreams.calls["marketwatch"] == []
+    assert upstreams.repo.get("ZZZNOTREAL") is None
+
+
+@pytest.mark.asyncio
+async def test_price_only_requests_skip_marketwatch_and_fill_in_later(upstreams):
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        prices = await ac.get("/stock/IBM", params={"include": "prices"})
+        trimmed = await ac.get("/stock/IBM", params={"fields": "close,volume"})
+        full = await ac.get("/stock/IBM")
+        batch = await ac.get("/stock", params={"symbols": "IBM,MSFT", "include": "prices"})
+        bad = await ac.get("/stock/IBM", params={"fields": "price"})
+
+    assert prices.json()["close"] == 12.0 and prices.json()["performance"] is None
+    assert trimmed.json() == {"symbol": "IBM", "close": 12.0, "volume": 100}
+    assert json.loads(full.json()["performance"]) == {"1 Week": "+1%"}
+    # The performance fetched by the full request is reused; MSFT gets none.
+    results = batch.json()["results"]
+    assert results[0]["stock"]["performance"] is not None and results[1]["stock"]["performance"] is None
+    assert upstreams.calls["polygon"] == ["IBM", "MSFT"] and upstreams.calls["marketwatch"] == ["IBM"]
+    assert bad.status_code == 400
@@ -0,0 +1,102 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core import http_client
+from app.core.cache_backends import SQLiteBackend
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.hedging import Hedger
+from app.core.http_cache import CachingTransport
+from app.core.metrics import UPSTREAM_HEDGES
+
+URL = "https://api.polygon.io/v1/open-close/IBM/2025-07-18"
+
+
+def primed(**kwargs) -> Hedger:
+    hedger = Hedger("polygon", percentile=90, min_delay=0.01, min_samples=5, **kwargs)
+    for _ in range(10):
+        hedger.tracker.record(0.01)
+    return hedger
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged_and_loser_cancelled(monkeypatch):
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"attempt": len(calls)})
+
+    hedger = primed()
+    monkeypatch.setitem(http_client.hedgers, http_client.POLYGON, hedger)
+    monkeypatch.setitem(http_client.breakers, http_client.POLYGON, CircuitBreaker("polygon"))
+    fired_before = UPSTREAM_HEDGES.values.get(("polygon", "fired"), 0)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        monkeypatch.setitem(http_client.clients, http_client.POLYGON, client)
+        response = await asyncio.wait_for(http_client.get(http_client.POLYGON, URL), 1)
+
+    assert response.json() == {"attempt": 2} and len(calls) == 2
+    assert (hedger.fired, hedger.won, hedger.denied) == (1, 1, 0)
+    # The cancelled loser's time counts too, as a lower bound of its latency.
+    await asyncio.sleep(0)
+    assert len(hedger.tracker._samples) == 12  # pylint: disable=protected-access
+    assert UPSTREAM_HEDGES.values[("polygon", "fired")] == fired_before + 1
+
+
+@pytest.mark.asyncio
+async def test_losing_response_is_closed_unread_and_not_stored(tmp_path):
+    reads = []
+
+    class Page(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for i in range(100):
+                reads.append(i)
+                yield b"x" * 1024
+
+    upstream = httpx.MockTransport(lambda _: httpx.Response(200, headers={"Cache-Control": "max-age=60"}, stream=Page()))
+    transport = CachingTransport(upstream, SQLiteBackend(str(tmp_path / "http.db"), "test", 1 << 20))
+    hedger = primed()
+    async with httpx.AsyncClient(transport=transport) as client:
+        loser = asyncio.get_running_loop().create_future()
+        loser.set_result(await client.send(client.build_request("GET", "https://upstream.test/page"), stream=True))
+        hedger._discard(loser)  # pylint: disable=protected-access
+        await asyncio.gather(*hedger._closing)  # pylint: disable=protected-access
+
+    assert loser.result().is_closed
+    assert reads == [] and transport.stats()["stored"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_are_not_recorded():
+    hedger = primed()
+
+    async def cached():
+        return httpx.Response(200, extensions={"from_cache": True})
+
+    await hedger.run(cached)
+    assert len(hedger.tracker._samples) == 10  # pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_budget_and_errors_limit_hedges():
+    hedger = primed(budget_ratio=0, budget_burst=1)
+    responses = iter([0.05, 0, 0.05])
+
+    async def send():
+        delay = next(responses)
+        await asyncio.sleep(delay)
+        return httpx.Response(200, text=str(delay))
+
+    assert (await hedger.run(send)).text == "0"
+    # The single token is spent: the next slow request waits without a hedge.
+    assert (await hedger.run(send)).text == "0.05"
+    assert (hedger.fired, hedger.won, hedger.denied) == (1, 1, 1)
+
+    async def failing():
+        raise httpx.ConnectError("down")
+
+    with pytest.raises(httpx.ConnectError):
+        await primed().run(failing)
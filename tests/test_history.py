@@ -0,0 +1,141 @@
+from datetime import date, timedelta
+
+import httpx
+import numpy as np
+import pytest
+import respx
+from httpx import AsyncClient
+
+from app.core import http_client
+from app.main import app
+from app.repositories.history_repo import HistoryStore
+from app.services import history_service, indicators
+
+
+def weekday_bars(start: date, end: date) -> dict:
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    days = [d for d in days if d.weekday() < 5]
+    day_numbers = np.array([(d - date(1970, 1, 1)).days for d in days], dtype="<i8")
+    close = 100 + np.sin(day_numbers / 10.0)
+    return {"day": day_numbers, "open": close, "high": close + 1, "low": close - 1, "close": close,
+            "volume": np.full(len(days), 1000.0)}
+
+
+@pytest.fixture
+def history(monkeypatch, tmp_path):
+    calls = []
+
+    async def fake_fetch(symbol, start, end):
+        calls.append((symbol, start, end))
+        return weekday_bars(start, end)
+
+    monkeypatch.setattr(history_service, "history_store", HistoryStore(str(tmp_path)))
+    monkeypatch.setattr(history_service, "fetch_polygon_range", fake_fetch)
+    monkeypatch.setattr(history_service, "last_complete_day", lambda: date(2024, 12, 31))
+    return calls
+
+
+def test_store_appends_and_merges_in_order(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.write("IBM", weekday_bars(date(2024, 3, 1), date(2024, 3, 31)), (date(2024, 3, 1), date(2024, 3, 31)))
+    before = store.load("IBM")
+    store.write("IBM", weekday_bars(date(2024, 4, 1), date(2024, 4, 30)), (date(2024, 4, 1), date(2024, 4, 30)))
+    store.write("IBM", weekday_bars(date(2024, 2, 1), date(2024, 3, 5)), (date(2024, 2, 1), date(2024, 3, 5)))
+
+    reopened = HistoryStore(str(tmp_path)).load("IBM")
+    assert reopened.covered == (date(2024, 2, 1), date(2024, 4, 30))
+    assert np.all(np.diff(reopened.columns["day"]) > 0)
+    assert len(reopened) == len(weekday_bars(date(2024, 2, 1), date(2024, 4, 30))["day"])
+    # Earlier readers keep the bars they started with.
+    assert len(before) == len(weekday_bars(date(2024, 3, 1), date(2024, 3, 31))["day"])
+
+
+def test_store_does_not_cover_recent_days_without_bars(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    today = date.today()
+    store.write("IBM", weekday_bars(today - timedelta(days=60), today - timedelta(days=30)),
+                (today - timedelta(days=60), today))
+    assert store.load("IBM").covered == (today - timedelta(days=60), today - timedelta(days=7))
+
+    day = (today - timedelta(days=2) - date(1970, 1, 1)).days
+    bar = {name: np.array([day], dtype="<i8") if name == "day" else np.array([1.0]) for name in
+           ("day", "open", "high", "low", "close", "volume")}
+    store.write("IBM", bar, (today - timedelta(days=6), today))
+    assert store.load("IBM").covered[1] == today - timedelta(days=2)
+
+
+@pytest.mark.asyncio
+async def test_recent_range_without_bars_is_fetched_once_per_call(history, monkeypatch):
+    async def no_bars(symbol, start, end):
+        history.append((symbol, start, end))
+        return weekday_bars(start, start - timedelta(days=1))
+
+    today = date.today()
+    monkeypatch.setattr(history_service, "fetch_polygon_range", no_bars)
+    monkeypatch.setattr(history_service, "last_complete_day", lambda: today - timedelta(days=1))
+    start, end = today - timedelta(days=5), today - timedelta(days=1)
+
+    first = await history_service.get_history("IBM", start, end, [])
+    second = await history_service.get_history("IBM", start, end, [])
+    assert first["count"] == second["count"] == 0
+    assert history == [("IBM", start, end)] * 2
+
+
+def test_indicators_match_naive_computation():
+    close = np.random.default_rng(1).uniform(50, 150, 300)
+    parsed = indicators.parse_specs(["returns", "sma_10", "volatility_20"])
+    values = indicators.compute(close, parsed)
+    assert np.isclose(values["returns"][5], close[5] / close[4] - 1)
+    assert np.isclose(values["sma_10"][50], close[41:51].mean())
+    log_returns = np.diff(np.log(close))
+    assert np.isclose(values["volatility_20"][100], log_returns[80:100].std(ddof=1) * np.sqrt(252))
+    assert np.isnan(values["sma_10"][8])
+    with pytest.raises(ValueError):
+        indicators.parse_specs(["macd"])
+
+
+@pytest.mark.asyncio
+async def test_history_fetches_only_missing_days(history):
+    first = await history_service.get_history("IBM", date(2024, 6, 1), date(2024, 6, 30), [])
+    await history_service.get_history("IBM", date(2024, 6, 10), date(2024, 6, 20), [])
+    await history_service.get_history("IBM", date(2024, 6, 1), date(2024, 7, 15), [])
+
+    assert history == [
+        ("IBM", date(2024, 6, 1), date(2024, 6, 30)),
+        ("IBM", date(2024, 7, 1), date(2024, 7, 15)),
+    ]
+    assert first["count"] == 20 and first["dates"][0] == "2024-06-03"
+    again = await history_service.get_history("IBM", date(2024, 6, 1), date(2024, 6, 30), [])
+    assert np.shares_memory(again["close"], history_service.get_history_store().load("IBM").columns["close"])
+
+
+@pytest.mark.asyncio
+async def test_history_endpoint_returns_columns_and_indicators(history):
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        resp = await ac.get(
+            "/stock/ibm/history", params={"from": "2024-06-03", "to": "2024-06-07", "indicators": "sma_20,returns"}
+        )
+        bad = await ac.get("/stock/IBM/history", params={"from": "2024-06-07", "to": "2024-06-03"})
+
+    assert resp.status_code == 200 and resp.headers["etag"]
+    body = resp.json()
+    assert body["dates"] == ["2024-06-03", "2024-06-04", "2024-06-05", "2024-06-06", "2024-06-07"]
+    assert len(body["indicators"]["sma_20"]) == 5 and None not in body["indicators"]["sma_20"]
+    assert history[0][1] < date(2024, 5, 1)
+    assert bad.status_code == 400
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_polygon_range_parses_bars(monkeypatch):
+    monkeypatch.setattr(http_client, "async_client", AsyncClient())
+    respx.get(url__startswith="https://api.polygon.io/v2/aggs/ticker/IBM/range/1/day/2024-01-02/2024-01-03").mock(
+        return_value=httpx.Response(200, json={"status": "OK", "results": [
+            {"t": 1704258000000, "o": 2, "h": 3, "l": 1, "c": 2.5, "v": 10},
+            {"t": 1704171600000, "o": 1, "h": 2, "l": 0.5, "c": 1.5, "v": 20},
+        ]})
+    )
+    bars = await history_service.fetch_polygon_range("IBM", date(2024, 1, 2), date(2024, 1, 3))
+    assert bars["day"].view("datetime64[D]").astype(str).tolist() == ["2024-01-02", "2024-01-03"]
+    assert bars["close"].tolist() == [1.5, 2.5]
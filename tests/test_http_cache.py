@@ -0,0 +1,129 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+
+from app.core import http_client
+from app.core.cache_backends import SQLiteBackend
+from app.core.http_cache import CachingTransport, StoredResponse, cache_key
+from app.services import stock_service
+from benchmarks.sample_pages import generate_page
+
+PAGE = b"<html>" + b"performance " * 2000 + b"</html>"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def upstream():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"', "Cache-Control": "max-age=60"})
+        if request.url.path == "/private":
+            return httpx.Response(200, headers={"Cache-Control": "no-store", "ETag": '"x"'}, content=b"secret")
+        return httpx.Response(
+            200,
+            headers={"ETag": '"v1"', "Cache-Control": "max-age=60", "Content-Encoding": "gzip"},
+            content=gzip.compress(PAGE),
+        )
+
+    return httpx.MockTransport(handler), requests
+
+
+async def settle(transport):
+    await asyncio.gather(*transport._tasks)  # pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_fresh_responses_are_served_then_revalidated_with_a_304(upstream, tmp_path):
+    mock, requests = upstream
+    clock = FakeClock()
+    transport = CachingTransport(mock, SQLiteBackend(str(tmp_path / "http.db"), "test", 1 << 20), clock=clock)
+    async with httpx.AsyncClient(transport=transport) as client:
+        first = await client.get("https://upstream.test/page")
+        await settle(transport)
+        clock.now += 30
+        hit = await client.get("https://upstream.test/page")
+        clock.now += 60
+        revalidated = await client.get("https://upstream.test/page")
+        await settle(transport)
+
+    assert first.content == hit.content == revalidated.content == PAGE
+    assert hit.extensions["from_cache"] and hit.headers["age"] == "30"
+    assert len(requests) == 2 and requests[1].headers["if-none-match"] == '"v1"'
+    assert transport.stats() == {"hits": 1, "revalidated": 1, "misses": 1, "stored": 2}
+
+    # A new process finds the stored response on disk.
+    restarted = CachingTransport(mock, SQLiteBackend(str(tmp_path / "http.db"), "test", 1 << 20), clock=clock)
+    async with httpx.AsyncClient(transport=restarted) as client:
+        assert (await client.get("https://upstream.test/page")).content == PAGE
+    assert len(requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_only_complete_bodies_are_stored_and_no_store_is_not(upstream, tmp_path):
+    mock, requests = upstream
+    transport = CachingTransport(mock, SQLiteBackend(str(tmp_path / "http.db"), "test", 1 << 20))
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with client.stream("GET", "https://upstream.test/page") as response:
+            async for _ in response.aiter_raw(100):
+                break
+        await client.get("https://upstream.test/private")
+        await settle(transport)
+        await client.get("https://upstream.test/page")
+        await settle(transport)
+        await client.get("https://upstream.test/page")
+        await client.get("https://upstream.test/private")
+
+    assert [r.url.path for r in requests] == ["/page", "/private", "/page", "/private"]
+
+
+@pytest.mark.asyncio
+async def test_unchanged_marketwatch_page_costs_a_304():
+    page = generate_page(50_000).encode()
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("if-none-match") == '"p1"':
+            return httpx.Response(304, headers={"ETag": '"p1"'})
+        return httpx.Response(200, headers={"ETag": '"p1"', "Content-Type": "text/html"}, content=page)
+
+    stock_service.clear_caches()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        http_client.clients[http_client.MARKETWATCH] = client
+        try:
+            first = await stock_service.fetch_marketwatch("IBM")
+            second = await stock_service.fetch_marketwatch("IBM")
+        finally:
+            http_client.clients.clear()
+            stock_service.clear_caches()
+
+    assert first == second and first["performance"]
+    assert "if-none-match" not in requests[0].headers and requests[1].headers["if-none-match"] == '"p1"'
+
+
+def test_cache_keys_leave_out_credentials():
+    url = httpx.URL("https://api.polygon.io/v1/open-close/IBM/2024-06-03?adjusted=true&apiKey=SECRET")
+    assert cache_key(url) == "https://api.polygon.io/v1/open-close/IBM/2024-06-03?adjusted=true"
+    assert cache_key(httpx.URL("https://upstream.test/page?token=x")) == "https://upstream.test/page"
+
+
+def test_freshness_follows_expires_and_last_modified():
+    def stored(**headers):
+        return StoredResponse(200, list(headers.items()), b"", {}, 1000.0, 1000.0)
+
+    date = "Tue, 14 Nov 2023 22:13:20 GMT"  # 1_700_000_000
+    assert stored(date=date, expires="Tue, 14 Nov 2023 22:18:20 GMT").freshness_lifetime() == 300
+    assert stored(date=date, **{"last-modified": "Tue, 14 Nov 2023 21:13:20 GMT"}).freshness_lifetime() == 360
+    assert stored(**{"cache-control": "no-cache, max-age=60"}).freshness_lifetime() == 0
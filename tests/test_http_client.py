@@ -0,0 +1,82 @@
+import httpx
+import pytest
+import respx
+
+from app.core import http_client
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.core.errors import UpstreamUnavailableError
+
+URL = "https://api.polygon.io/v1/open-close/IBM/2025-07-18"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(http_client.settings, "HTTP_RETRY_BACKOFF", 0)
+    for name in http_client.UPSTREAMS:
+        monkeypatch.setitem(http_client.breakers, name, CircuitBreaker(name, failure_threshold=3))
+
+
+def test_breaker_opens_and_recovers_through_half_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker("polygon", failure_threshold=2, recovery_time=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_retries_transient_errors():
+    route = respx.get(URL).mock(side_effect=[httpx.ConnectError("down"), httpx.Response(503), httpx.Response(200)])
+    async with httpx.AsyncClient() as client:
+        http_client.clients[http_client.POLYGON] = client
+        try:
+            response = await http_client.get(http_client.POLYGON, URL)
+        finally:
+            http_client.clients.clear()
+    assert response.status_code == 200
+    assert route.call_count == 3
+    assert http_client.breakers[http_client.POLYGON].state == CLOSED
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_open_breaker_fails_fast(monkeypatch):
+    route = respx.get(URL).mock(return_value=httpx.Response(500))
+    acquired = []
+
+    async def acquire(*args, **kwargs):
+        acquired.append(1)
+
+    monkeypatch.setattr(http_client.limiters[http_client.POLYGON], "acquire", acquire)
+    async with httpx.AsyncClient() as client:
+        http_client.clients[http_client.POLYGON] = client
+        try:
+            # Each call counts as one failure, however many times it was retried.
+            for calls in range(1, 4):
+                response = await http_client.get(http_client.POLYGON, URL)
+                assert response.status_code == 500
+                assert http_client.breakers[http_client.POLYGON].failures == calls
+            with pytest.raises(UpstreamUnavailableError):
+                await http_client.get(http_client.POLYGON, URL)
+        finally:
+            http_client.clients.clear()
+    assert route.call_count == 9
+    # The rejected call did not queue for a rate-limit token.
+    assert len(acquired) == 9
+    assert http_client.upstream_states()[http_client.POLYGON]["breaker"]["state"] == OPEN
@@ -0,0 +1,75 @@
+import io
+
+import pytest
+
+from app import ingest
+from app.core.errors import NoDataError
+from app.ingest import Checkpoint
+from app.models.stock import Stock
+from app.repositories.stock_repo import StockRepo
+
+
+@pytest.fixture
+def fetched(upstreams):
+    def polygon(symbol):
+        return NoDataError("No data from Polygon") if symbol == "BAD" else {"close": 10.0, "status": "OK"}
+
+    upstreams.answer("polygon", polygon)
+    return upstreams.calls["polygon"]
+
+
+def test_read_symbols_skips_comments_and_duplicates():
+    lines = ["aapl, msft  # large caps\n", "# ignored\n", "\n", "tsla\n", "AAPL\n"]
+    assert ingest.read_symbols(lines) == ["AAPL", "MSFT", "TSLA"]
+
+
+@pytest.mark.asyncio
+async def test_ingest_writes_batches_and_resumes_failed_symbols(fetched, tmp_path):
+    repo = StockRepo()
+    repo.upsert(Stock(symbol="AAPL", amount=5))
+    checkpoint = Checkpoint(str(tmp_path / "ingest.checkpoint"))
+
+    stats = await ingest.ingest(
+        ["AAPL", "MSFT", "BAD"], repo, checkpoint, concurrency=2, batch_size=1, progress_interval=0, out=io.StringIO()
+    )
+
+    assert (stats.ok, stats.failed, stats.written) == (2, 1, 2)
+    assert "BAD" in stats.errors
+    assert checkpoint.load() == {"AAPL", "MSFT"}
+    aapl = repo.get("AAPL")
+    assert aapl.amount == 5 and aapl.close == 10.0 and aapl.performance == '{"1 Week": "+1%"}'
+    assert repo.get("BAD") is None
+
+    fetched.clear()
+    stats = await ingest.ingest(["AAPL", "MSFT", "BAD"], repo, checkpoint, progress_interval=0)
+    assert fetched == ["BAD"] and stats.skipped == 2 and stats.failed == 1
+
+
+def test_write_batch_keeps_amounts_changed_meanwhile():
+    repo = StockRepo()
+    repo.upsert(Stock(symbol="AAPL", close=1.0, amount=5))
+    get_many = repo.get_many
+
+    def get_many_then_buy(symbols):
+        stored = get_many(symbols)
+        repo.add_amount("AAPL", 3)
+        return stored
+
+    repo.get_many = get_many_then_buy
+    ingest.write_batch(repo, [("AAPL", {"close": 10.0}, None)])
+
+    aapl = repo.get("AAPL")
+    assert (aapl.close, aapl.amount) == (10.0, 8)
+
+
+@pytest.mark.asyncio
+async def test_ingest_removes_checkpoint_when_complete(fetched, tmp_path):
+    repo = StockRepo()
+    checkpoint = Checkpoint(str(tmp_path / "ingest.checkpoint"))
+
+    stats = await ingest.ingest(
+        ["AAPL", "MSFT"], repo, checkpoint, sources=frozenset({"prices"}), rate=1000, progress_interval=0
+    )
+
+    assert stats.written == 2 and not checkpoint.path.exists()
+    assert repo.get("MSFT").close == 10.0 and repo.get("MSFT").performance is None
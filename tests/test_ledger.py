@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.repositories.stock_repo import StockRepo
+from app.services import stock_service
+from app.services.ledger import PositionLedger
+
+
+@pytest.fixture
+def quotes(upstreams):
+    closes = iter(range(1, 1000))
+    upstreams.answer("polygon", lambda _symbol: {"close": float(next(closes)), "status": "OK"})
+    return upstreams
+
+
+def test_threaded_increments_are_not_lost():
+    ledger = PositionLedger()
+    repo = StockRepo()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: ledger.add("IBM", 1, repo), range(2000)))
+    assert ledger.get("IBM", repo) == 2000
+
+
+def test_amounts_changed_by_another_worker_show_up():
+    repo = StockRepo()
+    first, second = PositionLedger(refresh_interval=0), PositionLedger(refresh_interval=0)
+    assert first.get("IBM", repo) == second.get("IBM", repo) == 0
+
+    first.add("IBM", 3, repo)
+    second.add("IBM", 2, repo)
+
+    assert first.get("IBM", repo) == second.get("IBM", repo) == repo.get("IBM").amount == 5
+
+
+@pytest.mark.asyncio
+async def test_reads_on_the_loop_are_served_from_memory():
+    repo = StockRepo()
+    ledger = PositionLedger(refresh_interval=0)
+    ledger.loaded("IBM", 1, time.monotonic())
+    repo.add_amount("IBM", 5)
+    threads = []
+    get = repo.get
+    repo.get = lambda symbol: threads.append(threading.current_thread()) or get(symbol)
+
+    assert ledger.get("IBM", repo) == 1
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if ledger.get("IBM", repo) == 5:
+            break
+    assert ledger.get("IBM", repo) == 5
+    assert threads and threading.main_thread() not in threads
+
+
+@pytest.mark.asyncio
+async def test_returned_stocks_are_copies(quotes):
+    repo = StockRepo()
+    stock = await stock_service.get_stock("IBM", repo)
+    stock.amount = 99
+
+    assert (await stock_service.get_stock("IBM", repo)).amount == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_survive_quote_refresh(quotes):
+    repo = StockRepo()
+    before = await stock_service.get_stock("IBM", repo)
+    await asyncio.gather(*(stock_service.update_amount("IBM", 1, repo) for _ in range(50)))
+
+    await stock_service.refresh_source("IBM", "polygon")
+    after = await stock_service.get_stock("IBM", repo)
+
+    assert before.amount == 0
+    assert after.amount == 50 and after.close != before.close
+    assert repo.get("IBM").amount == 50
+
+
+@pytest.mark.asyncio
+async def test_concurrent_posts_are_all_applied(quotes):
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        start = (await ac.get("/stock/MSFT")).json()["amount"]
+        await asyncio.gather(*(ac.post("/stock/MSFT", json={"amount": 2}) for _ in range(20)))
+        final = (await ac.get("/stock/MSFT")).json()["amount"]
+    assert final == start + 40
@@ -0,0 +1,16 @@
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_echoed_or_generated():
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        echoed = await ac.get("/healthz", headers={"X-Request-ID": "abc-123"})
+        generated = await ac.get("/healthz")
+    assert echoed.headers["x-request-id"] == "abc-123"
+    assert len(generated.headers["x-request-id"]) == 36
+    assert echoed.headers.get_list("x-request-id") == ["abc-123"]
@@ -0,0 +1,31 @@
+from datetime import date, datetime, timedelta
+
+from app.core import market_calendar
+from app.core.market_calendar import EXCHANGE_TZ
+
+
+def test_nyse_holidays_and_early_closes():
+    # Published NYSE schedule for 2024.
+    holidays = [date(2024, 1, 1), date(2024, 1, 15), date(2024, 2, 19), date(2024, 3, 29), date(2024, 5, 27),
+                date(2024, 6, 19), date(2024, 7, 4), date(2024, 9, 2), date(2024, 11, 28), date(2024, 12, 25)]
+    assert all(market_calendar.is_holiday(day) for day in holidays)
+    assert all(market_calendar.is_early_close(d) for d in (date(2024, 7, 3), date(2024, 11, 29), date(2024, 12, 24)))
+    # Observed days: Independence Day 2021 on a Sunday, New Year's Day 2022 on a Saturday.
+    assert market_calendar.is_holiday(date(2021, 7, 5))
+    assert market_calendar.is_trading_day(date(2021, 12, 31))
+    assert not market_calendar.is_early_close(date(2020, 7, 2))
+    assert market_calendar.session_close(date(2024, 11, 29)).hour == 13
+
+
+def test_last_session_skips_weekends_holidays_and_open_sessions():
+    settle = timedelta(minutes=30)
+
+    def at(*args):
+        return market_calendar.last_session(datetime(*args, tzinfo=EXCHANGE_TZ), settle)
+
+    assert at(2024, 7, 8, 10, 0) == date(2024, 7, 5)  # Monday morning
+    assert at(2024, 7, 7, 12, 0) == date(2024, 7, 5)  # Sunday
+    assert at(2024, 7, 5, 16, 45) == date(2024, 7, 5)  # After the close has settled
+    assert at(2024, 7, 5, 16, 15) == date(2024, 7, 3)  # Independence Day before it
+    assert at(2024, 11, 29, 13, 30) == date(2024, 11, 29)  # Early close
+    assert at(2025, 1, 10, 9, 0) == date(2025, 1, 8)  # Day of mourning
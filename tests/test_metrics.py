@@ -0,0 +1,53 @@
+import httpx
+import pytest
+from fastapi.routing import APIRoute
+from httpx import AsyncClient
+
+from app.core.metrics import Registry
+from app.core.metrics_middleware import route_template
+from app.main import app
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency.", ["upstream"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, "polygon")
+    histogram.observe(0.5, "polygon")
+    histogram.observe(3, "polygon")
+    registry.counter("responses_total", "Responses.", ["status"]).inc("200")
+
+    text = registry.render()
+
+    assert 'latency_seconds_bucket{upstream="polygon",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{upstream="polygon",le="1"} 2' in text
+    assert 'latency_seconds_bucket{upstream="polygon",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{upstream="polygon"} 3' in text
+    assert 'responses_total{status="200"} 1' in text
+    assert "# TYPE latency_seconds histogram" in text
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_routes_and_caches():
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.get("/healthz")
+        await ac.get("/no-such-path")
+        response = await ac.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'http_requests_total{route="/healthz",method="GET",status="200"}' in text
+    assert 'http_requests_total{route="unmatched",method="GET",status="404"}' in text
+    assert 'http_requests_in_flight{route="/metrics"} 1' in text
+    assert 'cache_requests_total{cache="polygon",result="hits"}' in text
+    assert 'upstream_circuit_state{upstream="marketwatch",state="closed"} 1' in text
+
+
+def test_routes_are_read_from_the_scope_without_matching(monkeypatch):
+    def no_matching(*args):
+        raise AssertionError("routes were matched")
+
+    monkeypatch.setattr(APIRoute, "matches", no_matching)
+    assert route_template({"route": APIRoute("/stock/{symbol}", lambda: None)}) == "/stock/{symbol}"
+    assert route_template({"app": app}) == "unmatched"
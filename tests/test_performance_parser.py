@@ -0,0 +1,60 @@
+import pytest
+
+from app.services.performance_parser import PerformanceParser, parse_performance, parse_performance_stream
+from benchmarks.bench_parser import parse_performance_bs4
+from benchmarks.sample_pages import generate_page
+
+PAGE = """
+<html><body>
+<div class="element--table other"><table>
+    <tr class="table__row"><td class="table__cell">Ignored</td>
+    <td class="table__cell"><li class="content__item value ignore-color">0%</li></td></tr>
+</table></div>
+<div class="element element--table performance">
+    <table>
+        <tr class="table__row">
+            <td class="table__cell"> 1 <b>Week</b> </td>
+            <td class="table__cell"><ul><li class="content__item value ignore-color"> +2% </li></ul></td>
+        </tr>
+        <tr class="table__row"><td class="table__cell">Only one cell</td></tr>
+        <tr class="table__row">
+            <td class="table__cell">1 Month</td>
+            <td class="table__cell"><li class="content__item value">-1%</li></td>
+        </tr>
+        <tr class="table__row">
+            <td class="table__cell">YTD</td>
+            <td class="table__cell"><li class="content__item value ignore-color">-3.5%</li></td>
+        </tr>
+    </table>
+</div>
+<p>trailing content</p>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize("html", [PAGE, "", "<html><body><p>no table</p></body></html>", generate_page(50_000)])
+def test_matches_beautifulsoup_output(html):
+    assert parse_performance(html) == parse_performance_bs4(html)
+
+
+def test_stops_once_table_closes():
+    parser = PerformanceParser()
+    body = PAGE.encode()
+    end = body.index(b"<p>trailing")
+    assert parser.feed(body[:end]) is True
+    assert parser.close() == {"1Week": "+2%", "YTD": "-3.5%"}
+
+
+@pytest.mark.asyncio
+async def test_stream_reads_only_up_to_table():
+    body = PAGE.encode()
+    chunks = [body[i:i + 64] for i in range(0, len(body), 64)]
+    consumed = []
+
+    async def aiter():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    assert await parse_performance_stream(aiter()) == {"1Week": "+2%", "YTD": "-3.5%"}
+    assert len(consumed) < len(chunks)
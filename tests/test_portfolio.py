@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import numpy as np
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.models.stock import Stock
+from app.services import portfolio
+from app.services.portfolio import Portfolio
+
+
+@pytest.fixture
+def repo(upstreams):
+    upstreams.repo.upsert(Stock(symbol="IBM", close=100.0, open=90.0, amount=2))
+    upstreams.repo.upsert(Stock(symbol="MSFT", close=50.0, open=50.0, amount=4))
+    upstreams.repo.upsert(Stock(symbol="NONE", close=10.0, amount=0))
+    return upstreams.repo
+
+
+def test_incremental_totals_match_full_recomputation():
+    rng = np.random.default_rng(0)
+    stocks = [Stock(symbol=f"S{i}", close=float(rng.uniform(1, 100)), open=float(rng.uniform(1, 100)),
+                    amount=int(rng.integers(1, 100))) for i in range(3000)]
+    book = Portfolio(capacity=16)
+    book.load(stocks)
+    for i in rng.integers(0, 3000, 500):
+        stocks[i] = Stock(symbol=f"S{i}", close=float(rng.uniform(1, 100)), open=stocks[i].open,
+                          amount=int(rng.integers(0, 100)))
+        book.update(stocks[i])
+
+    assert np.isclose(book.total_value, sum(s.amount * s.close for s in stocks))
+    assert np.isclose(book.total_change, sum(s.amount * (s.close - s.open) for s in stocks))
+
+
+def test_position_closed_while_loading_stays_closed():
+    book = Portfolio()
+    book.update(Stock(symbol="IBM", close=10.0, amount=0))
+    book.load([Stock(symbol="IBM", close=10.0, amount=5)])
+
+    assert book.total_value == 0.0
+    assert json.loads(book.render().body)["positions"] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("upstreams", [{"polygon": {"close": 12.0, "open": 10.0, "status": "OK"}}], indirect=True)
+async def test_portfolio_endpoint_values_positions_and_follows_updates(repo):
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = await ac.get("/portfolio")
+        unchanged = await ac.get("/portfolio", headers={"If-None-Match": first.headers["etag"]})
+        await ac.post("/stock/IBM", json={"amount": 1})
+        after = await ac.get("/portfolio")
+
+    body = first.json()
+    assert body["total_value"] == 400.0 and body["day_change"] == 20.0
+    assert body["symbols"] == ["IBM", "MSFT"] and body["exposure"] == [0.5, 0.5]
+    assert unchanged.status_code == 304
+    # IBM was refreshed to close 12, open 10 and bought once more: 3 * 12 + 4 * 50.
+    updated = after.json()
+    assert updated["total_value"] == 236.0 and updated["day_change"] == 6.0
+
+
+@pytest.mark.asyncio
+async def test_reset_while_loading_loads_again(repo):
+    release = threading.Event()
+    get_held = repo.get_held
+    loads = []
+
+    def slow_get_held():
+        loads.append(1)
+        if len(loads) == 1:
+            release.wait(5)
+        return get_held()
+
+    repo.get_held = slow_get_held
+    waiting = asyncio.ensure_future(portfolio.get_portfolio(repo))
+    await asyncio.sleep(0.01)
+    portfolio.reset_portfolio()
+    release.set()
+
+    book = await waiting
+    assert book is portfolio.portfolio and book.total_value == 400.0 and len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_positions_are_reloaded_in_the_background(repo, monkeypatch):
+    first = await portfolio.get_portfolio(repo)
+    monkeypatch.setattr(portfolio.settings, "POSITION_REFRESH_INTERVAL", 0.0)
+    repo.upsert(Stock(symbol="AAPL", close=1.0, amount=3))
+
+    assert await portfolio.get_portfolio(repo) is first
+    portfolio.observe(Stock(symbol="MSFT", close=50.0, amount=0))
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if portfolio.portfolio is not first:
+            break
+    # AAPL was bought by another worker; MSFT was sold here while the load ran.
+    assert json.loads(portfolio.portfolio.render().body)["symbols"] == ["IBM", "AAPL"]
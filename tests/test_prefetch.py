@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.services import stock_service
+from app.services.prefetch import AccessTracker, Prefetcher
+
+
+def test_tracker_ranks_and_forgets_symbols():
+    tracker = AccessTracker(decay=0.5)
+    for symbol, hits in [("AAPL", 5), ("IBM", 3), ("MSFT", 1)]:
+        for _ in range(hits):
+            tracker.record(symbol)
+    assert tracker.hottest(2) == ["AAPL", "IBM"]
+    assert tracker.hottest(10, min_count=2) == ["AAPL", "IBM"]
+    for _ in range(4):
+        tracker.decay()
+    assert tracker.hottest(10) == ["AAPL", "IBM"]
+
+
+@pytest.mark.asyncio
+async def test_tick_refreshes_expiring_sources_within_budget():
+    tracker = AccessTracker()
+    for _ in range(3):
+        tracker.record("AAPL")
+    tracker.record("COLD")
+    refreshed = []
+    running = 0
+    peak = 0
+
+    def expiring(symbol, within):
+        assert within == 15
+        return ["polygon", "marketwatch"] if symbol != "IBM" else []
+
+    async def refresh(symbol, source):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        refreshed.append((symbol, source))
+
+    prefetcher = Prefetcher(
+        tracker, expiring, refresh, watchlist=["IBM", "TSLA"], lead_time=15, concurrency=2, max_calls=3
+    )
+    await prefetcher.tick()
+
+    assert refreshed == [("TSLA", "polygon"), ("TSLA", "marketwatch"), ("AAPL", "polygon")]
+    assert peak == 2
+    assert prefetcher.stats()["deferred"] == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_source_goes_through_cache(upstreams):
+    assert stock_service.expiring_sources("IBM", 15) == ["polygon", "marketwatch"]
+    await stock_service.refresh_source("IBM", "polygon")
+    assert stock_service.expiring_sources("IBM", 15) == ["marketwatch"]
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import quote_stream
+from app.services.quote_stream import QuoteHub, Subscription
+
+
+class FakeQuotes:
+    def __init__(self):
+        self.prices = {}
+        self.calls = {}
+
+    async def fetch(self, symbol):
+        self.calls[symbol] = self.calls.get(symbol, 0) + 1
+        return {"symbol": symbol, "close": self.prices.get(symbol, 1.0), "volume": 100}
+
+
+@pytest.mark.asyncio
+async def test_one_loop_per_symbol_and_changed_fields_only():
+    quotes = FakeQuotes()
+    hub = QuoteHub(quotes.fetch, interval=0.01)
+    async with hub.subscription(["IBM"]) as first, hub.subscription(["IBM", "AAPL"]) as second:
+        assert hub.symbols == {"IBM", "AAPL"}
+        assert (await first.next())["IBM"] == {"symbol": "IBM", "close": 1.0, "volume": 100, "error": None}
+
+        quotes.prices["IBM"] = 2.0
+        assert await asyncio.wait_for(first.next(), 1) == {"IBM": {"close": 2.0}}
+        changes = await second.next()
+        assert changes["IBM"]["close"] == 2.0
+
+    assert hub.symbols == set()
+    await asyncio.sleep(0.05)
+    calls = dict(quotes.calls)
+    await asyncio.sleep(0.05)
+    assert quotes.calls == calls
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_gets_latest_snapshot_only():
+    subscription = Subscription(["IBM"])
+    for close in (1.0, 2.0, 3.0):
+        subscription.push("IBM", {"close": close})
+    assert await subscription.next() == {"IBM": {"close": 3.0}}
+    assert subscription.coalesced == 2
+
+    subscription.push("IBM", {"close": 3.0})
+    subscription.push("MSFT", {"close": 1.0})
+    assert await subscription.next() == {"MSFT": {"close": 1.0}}
+
+
+def test_websocket_streams_quotes(monkeypatch):
+    quotes = FakeQuotes()
+    monkeypatch.setattr(quote_stream, "fetch_quote", quotes.fetch)
+    monkeypatch.setattr(quote_stream, "quote_hub", None)
+    with TestClient(app) as client:
+        with client.websocket_connect("/stream/stocks/ws?symbols=ibm") as websocket:
+            assert websocket.receive_json()["IBM"]["close"] == 1.0
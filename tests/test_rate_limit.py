@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from app.core.errors import UpstreamThrottledError
+from app.core.rate_limit import BACKGROUND, INTERACTIVE, TokenBucket, priority
+
+
+@pytest.mark.asyncio
+async def test_interactive_callers_are_served_before_background():
+    bucket = TokenBucket("polygon", rate=100, burst=1, max_wait=5)
+    await bucket.acquire()
+    order = []
+
+    async def call(name, prio):
+        await bucket.acquire(priority=prio)
+        order.append(name)
+
+    background = [asyncio.create_task(call(f"bg{i}", BACKGROUND)) for i in range(2)]
+    await asyncio.sleep(0)
+    interactive = [asyncio.create_task(call(f"ui{i}", INTERACTIVE)) for i in range(2)]
+    await asyncio.gather(*background, *interactive)
+
+    assert order == ["ui0", "ui1", "bg0", "bg1"]
+    stats = bucket.stats()
+    assert stats["waits"] == {"interactive": 2, "background": 2}
+    assert stats["wait_seconds"]["background"] > stats["wait_seconds"]["interactive"]
+
+
+@pytest.mark.asyncio
+async def test_callers_past_deadline_are_throttled():
+    bucket = TokenBucket("marketwatch", rate=1, burst=1, max_wait=0.05)
+    await bucket.acquire()
+    with priority(BACKGROUND):
+        with pytest.raises(UpstreamThrottledError):
+            await bucket.acquire()
+    assert bucket.stats()["throttled"] == 1
+    assert bucket.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_zero_rate_disables_limit():
+    bucket = TokenBucket("polygon", rate=0, burst=1, max_wait=0)
+    for _ in range(100):
+        await bucket.acquire()
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+from app.services import stock_service
+
+
+@pytest.mark.asyncio
+async def test_singleflight_shares_result_and_survives_cancelled_waiter():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "value"
+
+    waiters = [asyncio.create_task(flight.do("IBM", fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    waiters[0].cancel()
+    release.set()
+
+    results = await asyncio.gather(*waiters[1:])
+    assert results == ["value"] * 4
+    assert calls == 1
+    assert "IBM" not in flight
+
+
+@pytest.mark.asyncio
+async def test_singleflight_propagates_errors_to_every_waiter():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.do("IBM", fetch) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_get_stock_coalesces_case_variants(upstreams):
+    async def slow(answer):
+        await asyncio.sleep(0.01)
+        return answer
+
+    upstreams.answer("polygon", lambda _symbol: slow({"close": 1.0}))
+    upstreams.answer("marketwatch", lambda _symbol: slow({"performance": {}}))
+
+    stocks = await asyncio.gather(
+        *(stock_service.get_stock(s, upstreams.repo) for s in ["ibm", "IBM", " Ibm "] * 10)
+    )
+    assert {s.symbol for s in stocks} == {"IBM"}
+    assert len(upstreams.calls["polygon"]) == 1
+    assert len(upstreams.calls["marketwatch"]) == 1
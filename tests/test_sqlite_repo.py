@@ -0,0 +1,95 @@
+import asyncio
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from app.core.database import create_db_engine
+from app.main import app
+from app.models.stock import Stock
+from app.repositories.sqlite_repo import SQLiteStockRepo
+
+
+@pytest.fixture
+def repo(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'stocks.db'}")
+    yield SQLiteStockRepo(engine, flush_max=1000)
+    engine.dispose()
+
+
+def test_upserts_are_coalesced_until_flush(repo):
+    repo.upsert(Stock(symbol="ibm", amount=1))
+    repo.upsert(Stock(symbol="IBM", amount=2))
+    assert repo.get("IBM").amount == 2
+
+    assert repo.flush() == 1
+    assert repo.flush() == 0
+    fresh = SQLiteStockRepo(repo.engine)
+    assert fresh.get("ibm").amount == 2
+
+
+def test_bulk_get_and_upsert(repo):
+    repo.upsert_many([Stock(symbol=s, close=float(i)) for i, s in enumerate(["AAPL", "IBM", "MSFT"])])
+    repo.upsert(Stock(symbol="TSLA", close=9.0))
+
+    stocks = repo.get_many(["aapl", "MSFT", "TSLA", "NOPE"])
+    assert {s: stock.close for s, stock in stocks.items()} == {"AAPL": 0.0, "MSFT": 2.0, "TSLA": 9.0}
+
+
+def test_bulk_upsert_replaces_older_pending_writes(repo):
+    repo.upsert(Stock(symbol="IBM", close=1.0))
+    repo.upsert_many([Stock(symbol="IBM", close=2.0)])
+
+    assert repo.get("IBM").close == 2.0
+    assert repo.flush() == 0
+    assert SQLiteStockRepo(repo.engine).get("IBM").close == 2.0
+
+
+def test_amount_changes_are_atomic_and_kept_by_quote_writes(repo):
+    other = SQLiteStockRepo(repo.engine)
+    assert repo.add_amount("ibm", 3) == 3
+    assert other.add_amount("IBM", 2) == 5
+    with pytest.raises(ValueError):
+        repo.add_amount("IBM", -6)
+
+    repo.upsert_quote(Stock(symbol="IBM", close=7.0, amount=0))
+    assert repo.get("IBM").amount == 5
+    assert other.add_amount("IBM", -1) == 4
+    repo.flush()
+    other.upsert_quotes([Stock(symbol="IBM", close=8.0, amount=0)])
+
+    stored = SQLiteStockRepo(repo.engine).get("IBM")
+    assert (stored.close, stored.amount) == (8.0, 4)
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_wakes_the_flusher_instead_of_writing_inline(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'stocks.db'}")
+    repo = SQLiteStockRepo(engine, flush_interval=60.0, flush_max=2)
+    repo.start()
+    try:
+        repo.upsert(Stock(symbol="IBM", close=1.0))
+        repo.upsert_quote(Stock(symbol="MSFT", close=2.0))
+        assert SQLiteStockRepo(engine).get("IBM") is None
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if SQLiteStockRepo(engine).get("MSFT") is not None:
+                break
+        assert SQLiteStockRepo(engine).get("IBM").close == 1.0
+    finally:
+        await repo.stop()
+        engine.dispose()
+
+
+def test_wal_mode_enabled(repo):
+    with repo.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+
+@pytest.mark.asyncio
+async def test_readyz_reports_database_status():
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        resp = await ac.get("/readyz")
+    assert resp.status_code == 200
+    assert resp.json()["database"] == "ok"
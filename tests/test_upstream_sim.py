@@ -0,0 +1,40 @@
+import json
+
+import pytest
+import pytest_asyncio
+
+from app.core import http_client
+from app.repositories.stock_repo import StockRepo
+from app.services import stock_service
+from benchmarks import upstream_sim
+from benchmarks.common import latency_summary
+from benchmarks.upstream_sim import UpstreamProfile
+
+
+@pytest_asyncio.fixture
+async def simulators(monkeypatch):
+    monkeypatch.setattr(http_client.settings, "HTTP_RETRY_BACKOFF", 0)
+    for name in http_client.UPSTREAMS:
+        monkeypatch.setitem(http_client.breakers, name, http_client.breakers[name])
+    stock_service.clear_caches()
+    yield upstream_sim.install(
+        UpstreamProfile(latency=0, jitter=0), UpstreamProfile(latency=0, jitter=0, page_size=50_000)
+    )
+    await upstream_sim.uninstall()
+    stock_service.clear_caches()
+
+
+@pytest.mark.asyncio
+async def test_get_stock_against_simulated_upstreams(simulators):
+    stock = await stock_service.get_stock("SYM0001", StockRepo())
+
+    assert stock.close is not None
+    assert set(json.loads(stock.performance)) == {"5 Day", "1 Month", "3 Month", "YTD", "1 Year"}
+    assert simulators["marketwatch"].stats.bytes_sent < len(simulators["marketwatch"]._pages[0])
+
+
+def test_latency_summary_percentiles():
+    summary = latency_summary([i / 1000 for i in range(1, 101)])
+    assert summary["p50_ms"] == 50
+    assert summary["p95_ms"] == 95
+    assert summary["p99_ms"] == 99
@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.services import warmup
+from app.services.warmup import Warmup
+
+
+@pytest.mark.asyncio
+async def test_warmup_reports_components_and_becomes_ready_at_deadline():
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return "late"
+
+    async def broken():
+        raise RuntimeError("no route to host")
+
+    run = Warmup({"parser": warmup.warm_parser, "upstreams": broken, "cache": slow}, deadline=0.05)
+    assert not run.ready
+    run.start()
+    await asyncio.sleep(0.01)
+    components = run.snapshot()["components"]
+    assert not run.ready
+    assert components["parser"]["state"] == "ok" and components["parser"]["duration_ms"] is not None
+    assert components["upstreams"] == {"state": "error", "duration_ms": components["upstreams"]["duration_ms"],
+                                       "detail": "no route to host"}
+    assert components["cache"]["state"] == "pending"
+
+    await asyncio.sleep(0.05)
+    assert run.ready and run.snapshot()["state"] == "deadline passed"
+    release.set()
+    await run.wait()
+    assert run.snapshot()["state"] == "done" and run.components["cache"].detail == "late"
+
+
+@pytest.mark.asyncio
+async def test_readyz_waits_for_warmup(monkeypatch):
+    release = asyncio.Event()
+    monkeypatch.setattr(warmup, "warmup", Warmup({"cache": release.wait}, deadline=60))
+    warmup.warmup.start()
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        starting = await ac.get("/readyz")
+        release.set()
+        await warmup.warmup.wait()
+        ready = await ac.get("/readyz")
+
+    assert starting.status_code == 503 and starting.json()["status"] == "starting"
+    assert starting.json()["warmup"]["components"]["cache"]["state"] == "pending"
+    assert ready.status_code == 200 and ready.json()["warmup"]["state"] == "done"